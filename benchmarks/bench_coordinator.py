@@ -0,0 +1,322 @@
+"""Benchmark the Tarif EDF coordinator update cycle against a local replay server.
+
+The integration is driven against an aiohttp server replaying the files in
+``benchmarks/fixtures`` in place of data.gouv.fr, api-couleur-tempo.fr and
+open-dpe.fr. The clock is frozen so every run sees the same data.
+
+For each contract type and scenario one JSON object per line is printed
+(keys sorted, durations in milliseconds), so two runs can be diffed:
+
+    python benchmarks/bench_coordinator.py > bench_output.txt
+
+Scenarios:
+  cold          first update with empty caches and storage
+  warm          updates once every cache is populated
+  undetermined  Tempo only: tomorrow's colour is still unpublished, one update
+                per simulated minute from 10:55 to 12:55
+
+Requires Home Assistant to be installed (``pip install homeassistant``).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+import json
+from pathlib import Path
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+from aiohttp import web
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+sys.path.insert(0, str(ROOT))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.helpers import device_registry as dr, entity_registry as er  # noqa: E402
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+from custom_components.tarif_edf import const  # noqa: E402
+from custom_components.tarif_edf import sources as sources_module  # noqa: E402
+from custom_components.tarif_edf.coordinator import TarifEdfDataUpdateCoordinator  # noqa: E402
+from custom_components.tarif_edf.engine import get_engine  # noqa: E402
+
+TIME_ZONE = "Europe/Paris"
+START = datetime(2025, 1, 15, 14, 0, tzinfo=ZoneInfo(TIME_ZONE))
+UNDETERMINED_START = datetime(2025, 1, 15, 10, 55, tzinfo=ZoneInfo(TIME_ZONE))
+WARM_TICKS = 50
+UNDETERMINED_TICKS = 120
+LAG_PROBE_INTERVAL = 0.001
+
+
+class FrozenClock:
+    """Horloge contrôlée par le benchmark à la place de dt_util.now()."""
+
+    def __init__(self, now: datetime) -> None:
+        self.now = now
+        self._original_now = dt_util.now
+
+    def __call__(self, time_zone=None) -> datetime:
+        return self.now if time_zone is None else self.now.astimezone(time_zone)
+
+    def install(self) -> None:
+        dt_util.now = self
+
+    def uninstall(self) -> None:
+        dt_util.now = self._original_now
+
+
+class ReplayServer:
+    """Serveur HTTP local rejouant les réponses enregistrées."""
+
+    def __init__(self) -> None:
+        self.requests: Counter[str] = Counter()
+        self.undetermined_days: set[str] = set()
+        self._days = {
+            day["dateJour"]: day
+            for path in sorted((FIXTURES / "jours_tempo").glob("*.json"))
+            for day in json.loads(path.read_text())
+        }
+        self._runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/tarif/{contract_type}", self._tarif)
+        app.router.add_get("/jourTempo/{day}", self._jour_tempo)
+        app.router.add_get("/joursTempo", self._jours_tempo)
+        app.router.add_get("/forecast", self._forecast)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _tarif(self, request: web.Request) -> web.Response:
+        self.requests["tarif"] += 1
+        path = FIXTURES / "tarif" / f"{request.match_info['contract_type']}.csv"
+        etag = f'"{path.stat().st_mtime_ns}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        return web.Response(body=path.read_bytes(), headers={"ETag": etag}, content_type="text/csv")
+
+    async def _jour_tempo(self, request: web.Request) -> web.Response:
+        self.requests["jour_tempo"] += 1
+        day = request.match_info["day"]
+        if day in self.undetermined_days or day not in self._days:
+            return web.json_response({"dateJour": day, "codeJour": 0, "periode": ""})
+        return web.json_response(self._days[day])
+
+    async def _jours_tempo(self, request: web.Request) -> web.Response:
+        self.requests["jours_tempo"] += 1
+        periode = request.query.get("periode")
+        return web.json_response([
+            day for day in self._days.values()
+            if day["periode"] == periode and day["dateJour"] not in self.undetermined_days
+        ])
+
+    async def _forecast(self, request: web.Request) -> web.Response:
+        self.requests["prevision"] += 1
+        return web.Response(body=(FIXTURES / "prevision.json").read_bytes(), content_type="application/json")
+
+    def install_urls(self) -> None:
+        """Redirige les URLs de l'intégration vers ce serveur."""
+        for contract_type in const.TARIF_URLS:
+            const.TARIF_URLS[contract_type] = f"{self.base_url}/tarif/{contract_type}"
+        sources_module.TEMPO_COLOR_API_URL = f"{self.base_url}/jourTempo"
+        sources_module.TEMPO_FORECAST_API_URL = f"{self.base_url}/forecast"
+        sources_module.TEMPO_HISTORY_API_URL = f"{self.base_url}/joursTempo"
+
+
+class LoopLagProbe:
+    """Mesure le temps pendant lequel la boucle d'événements est bloquée."""
+
+    def __init__(self) -> None:
+        self.samples: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LAG_PROBE_INTERVAL
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self.samples.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class ExecutorCounter:
+    """Compte les tâches envoyées à l'executor et leur durée."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.jobs = 0
+        self.seconds = 0.0
+        original = hass.async_add_executor_job
+
+        def _counted(target, *args):
+            def _timed():
+                started = time.perf_counter()
+                try:
+                    return target(*args)
+                finally:
+                    self.seconds += time.perf_counter() - started
+            self.jobs += 1
+            return original(_timed)
+
+        hass.async_add_executor_job = _counted
+
+    def reset(self) -> None:
+        self.jobs = 0
+        self.seconds = 0.0
+
+
+async def async_create_hass(config_dir: str) -> HomeAssistant:
+    try:
+        hass = HomeAssistant(config_dir)
+    except TypeError:
+        # Versions antérieures à 2024.2
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+    if hasattr(hass.config, "async_set_time_zone"):
+        await hass.config.async_set_time_zone(TIME_ZONE)
+    else:
+        hass.config.set_time_zone(TIME_ZONE)
+    # async_setup_entry migre les unique_id du registre des entités
+    await dr.async_load(hass)
+    await er.async_load(hass)
+    return hass
+
+
+def make_entry(contract_type: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        entry_id=f"bench_{contract_type}",
+        title=f"Option {contract_type.upper()}, 6kVA",
+        data={"contract_type": contract_type, "contract_power": "6"},
+        options={},
+    )
+
+
+async def async_measure(
+    coordinator: TarifEdfDataUpdateCoordinator,
+    server: ReplayServer,
+    executor: ExecutorCounter,
+    clock: FrozenClock,
+    ticks: int,
+    step: timedelta,
+) -> dict:
+    probe = LoopLagProbe()
+    latencies = []
+    server.requests.clear()
+    executor.reset()
+
+    tracemalloc.start()
+    probe.start()
+    for _ in range(ticks):
+        started = time.perf_counter()
+        await coordinator.async_refresh()
+        latencies.append((time.perf_counter() - started) * 1000)
+        clock.now += step
+    await probe.stop()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ticks": ticks,
+        "success": coordinator.last_update_success,
+        "latency_ms_mean": round(statistics.fmean(latencies), 3),
+        "latency_ms_p95": round(sorted(latencies)[int(0.95 * (len(latencies) - 1))], 3),
+        "latency_ms_max": round(max(latencies), 3),
+        "loop_blocked_ms_total": round(sum(probe.samples) * 1000, 3),
+        "loop_blocked_ms_max": round(max(probe.samples, default=0.0) * 1000, 3),
+        "executor_jobs": executor.jobs,
+        "executor_ms": round(executor.seconds * 1000, 3),
+        "alloc_peak_kib": round(peak / 1024, 1),
+        "requests": dict(sorted(server.requests.items())),
+    }
+
+
+async def async_run_scenario(contract_type: str, scenario: str) -> dict:
+    server = ReplayServer()
+    await server.start()
+    server.install_urls()
+
+    start = UNDETERMINED_START if scenario == "undetermined" else START
+    clock = FrozenClock(start)
+    clock.install()
+    if scenario == "undetermined":
+        server.undetermined_days.add((start.date() + timedelta(days=1)).isoformat())
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_create_hass(config_dir)
+        executor = ExecutorCounter(hass)
+        entry = make_entry(contract_type)
+        coordinator = await get_engine(hass).async_acquire(entry)
+        try:
+            if scenario == "cold":
+                result = await async_measure(coordinator, server, executor, clock, 1, timedelta(0))
+            elif scenario == "warm":
+                await coordinator.async_refresh()
+                result = await async_measure(coordinator, server, executor, clock, WARM_TICKS, timedelta(minutes=1))
+            else:
+                result = await async_measure(
+                    coordinator, server, executor, clock, UNDETERMINED_TICKS, timedelta(minutes=1)
+                )
+        finally:
+            get_engine(hass).async_release(entry.entry_id)
+            clock.uninstall()
+            await hass.async_stop(force=True)
+            await server.stop()
+
+    return {"contract_type": contract_type, "scenario": scenario, **result}
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    lines = []
+    for contract_type in args.contract_types:
+        for scenario in args.scenarios:
+            if scenario == "undetermined" and contract_type != const.CONTRACT_TYPE_TEMPO:
+                continue
+            result = await async_run_scenario(contract_type, scenario)
+            lines.append(json.dumps(result, sort_keys=True))
+            print(lines[-1], flush=True)
+
+    if args.output:
+        Path(args.output).write_text("\n".join(lines) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--contract-types",
+        nargs="+",
+        default=[const.CONTRACT_TYPE_BASE, const.CONTRACT_TYPE_HPHC, const.CONTRACT_TYPE_TEMPO],
+    )
+    parser.add_argument("--scenarios", nargs="+", default=["cold", "warm", "undetermined"])
+    parser.add_argument("--output", help="also write the JSON lines to this file")
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Stress the shared engine with a growing number of config entries.
+
+For each fleet size, entries mixing every contract type, several subscribed
+powers and several off-peak ranges are set up offline, with the integration's
+replay data source serving ``benchmarks/fixtures``, then one simulated day is
+run through the engine: every wake-up it asks for (network rounds, HP/HC
+switches, Tempo day start, colour publication) is replayed in order with a
+frozen clock.
+
+Entries are set up concurrently, as Home Assistant does. Timings are taken
+without ``tracemalloc``, which slows every allocation down: memory is
+measured in a second, setup-only pass. Garbage collector passes are timed
+as well, so that loop lag caused by a full collection can be told apart from
+the integration's own work.
+
+One JSON object per line is printed for each fleet size (keys sorted,
+durations in milliseconds):
+
+    python benchmarks/bench_fleet.py > bench_fleet_output.txt
+
+Entries of the same contract type, power and off-peak ranges share one
+coordinator: ``coordinators`` counts the distinct ones, and the network
+requests of a round are made once for all of them.
+
+Requires Home Assistant to be installed (``pip install homeassistant``).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+import gc
+import json
+from pathlib import Path
+import statistics
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from bench_coordinator import (
+    FIXTURES,
+    START,
+    FrozenClock,
+    LoopLagProbe,
+    async_create_hass,
+)
+
+from custom_components.tarif_edf import const
+from custom_components.tarif_edf import engine as engine_module
+from custom_components.tarif_edf.coordinator import TarifEdfDataUpdateCoordinator
+from custom_components.tarif_edf.engine import get_engine
+from custom_components.tarif_edf.metrics import get_metrics
+from custom_components.tarif_edf.sources import ReplayDataSource, set_data_source
+
+DEFAULT_SIZES = [1, 10, 50, 100, 250, 500]
+SIMULATED_DURATION = timedelta(days=1)
+MAX_ROUNDS = 10000
+POWERS = ["6", "9", "12"]
+OFF_PEAK_RANGES = [None, "22:00-06:00", "23:00-07:00", "12:00-14:00,02:00-06:00"]
+
+
+class WakeRecorder:
+    """Remplace async_track_point_in_time : le benchmark rejoue lui-même les échéances."""
+
+    def __init__(self) -> None:
+        self.when: datetime | None = None
+        self._original = engine_module.async_track_point_in_time
+
+    def __call__(self, hass, action, point_in_time: datetime):
+        self.when = point_in_time
+
+        def _cancel() -> None:
+            if self.when is point_in_time:
+                self.when = None
+
+        return _cancel
+
+    def install(self) -> None:
+        engine_module.async_track_point_in_time = self
+
+    def uninstall(self) -> None:
+        engine_module.async_track_point_in_time = self._original
+
+
+class GcPauseRecorder:
+    """Mesure la durée des passes du ramasse-miettes."""
+
+    def __init__(self) -> None:
+        self.samples: list[float] = []
+        self._started: float | None = None
+
+    def __call__(self, phase: str, info: dict) -> None:
+        if phase == "start":
+            self._started = time.perf_counter()
+        elif self._started is not None:
+            self.samples.append(time.perf_counter() - self._started)
+            self._started = None
+
+    def install(self) -> None:
+        gc.callbacks.append(self)
+
+    def uninstall(self) -> None:
+        gc.callbacks.remove(self)
+
+
+def make_entry(index: int) -> SimpleNamespace:
+    contract_type = (const.CONTRACT_TYPE_BASE, const.CONTRACT_TYPE_HPHC, const.CONTRACT_TYPE_TEMPO)[index % 3]
+    power = POWERS[index // 3 % len(POWERS)]
+    options = {}
+    if contract_type == const.CONTRACT_TYPE_HPHC:
+        off_peak_ranges = OFF_PEAK_RANGES[index // 9 % len(OFF_PEAK_RANGES)]
+        if off_peak_ranges is not None:
+            options["off_peak_hours_ranges"] = off_peak_ranges
+    return SimpleNamespace(
+        entry_id=f"bench_fleet_{index}",
+        title=f"Option {contract_type.upper()}, {power}kVA",
+        data={"contract_type": contract_type, "contract_power": power},
+        options=options,
+    )
+
+
+def add_listeners(coordinator: TarifEdfDataUpdateCoordinator, notifications: Counter) -> None:
+    """Un auditeur par clé d'état, comme un capteur par champ."""
+    keys = [*coordinator.data.as_dict(), const.STATE_KEY_TIMELINE, const.STATE_KEY_LAST_UPDATE]
+    for key in keys:
+        coordinator.async_add_listener(lambda: notifications.update(("notified",)), frozenset({key}))
+
+
+def count_requests(hass) -> Counter[str]:
+    return Counter({endpoint: metrics.requests for endpoint, metrics in get_metrics(hass).endpoints.items()})
+
+
+async def async_setup_entry(engine, entry: SimpleNamespace, notifications: Counter) -> None:
+    """Même enchaînement que async_setup_entry."""
+    coordinator = await engine.async_acquire(entry)
+    if not coordinator.async_restore():
+        await coordinator.async_refresh()
+    add_listeners(coordinator, notifications)
+
+
+async def async_settle() -> None:
+    """Laisse s'exécuter les rappels en attente (reprogrammation du moteur)."""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+async def async_run_fleet(size: int) -> dict:
+    clock = FrozenClock(START)
+    clock.install()
+    wakes = WakeRecorder()
+    wakes.install()
+    gc_pauses = GcPauseRecorder()
+    gc_pauses.install()
+    notifications: Counter[str] = Counter()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_create_hass(config_dir)
+        set_data_source(hass, ReplayDataSource(hass, str(FIXTURES)))
+        engine = get_engine(hass)
+        probe = LoopLagProbe()
+        entries = [make_entry(index) for index in range(size)]
+        try:
+            probe.start()
+            gc_pauses.samples.clear()
+            started = time.perf_counter()
+            # Comme Home Assistant, les entrées sont mises en place en parallèle
+            await asyncio.gather(*(async_setup_entry(engine, entry, notifications) for entry in entries))
+            await async_settle()
+            setup_ms = (time.perf_counter() - started) * 1000
+            coordinators = len(engine.coordinators)
+            setup_lag = list(probe.samples)
+            setup_gc_pauses = list(gc_pauses.samples)
+            setup_requests = count_requests(hass)
+            notifications.clear()
+
+            probe.samples.clear()
+            gc_pauses.samples.clear()
+            rounds = []
+            end = START + SIMULATED_DURATION
+            while wakes.when is not None and wakes.when <= end and len(rounds) < MAX_ROUNDS:
+                clock.now = wakes.when
+                started = time.perf_counter()
+                await engine.async_run(clock.now)
+                await async_settle()
+                rounds.append((time.perf_counter() - started) * 1000)
+            await probe.stop()
+            requests = count_requests(hass) - setup_requests
+        finally:
+            for entry in entries:
+                engine.async_release(entry.entry_id)
+            await async_settle()
+            gc_pauses.uninstall()
+            wakes.uninstall()
+            clock.uninstall()
+            await hass.async_stop(force=True)
+
+    return {
+        "entries": size,
+        "coordinators": coordinators,
+        "setup_ms": round(setup_ms, 3),
+        "setup_loop_lag_ms_max": round(max(setup_lag, default=0.0) * 1000, 3),
+        "setup_gc_pause_ms_max": round(max(setup_gc_pauses, default=0.0) * 1000, 3),
+        "rounds": len(rounds),
+        "round_ms_mean": round(statistics.fmean(rounds), 3) if rounds else None,
+        "round_ms_max": round(max(rounds, default=0.0), 3),
+        "loop_lag_ms_max": round(max(probe.samples, default=0.0) * 1000, 3),
+        "gc_pause_ms_max": round(max(gc_pauses.samples, default=0.0) * 1000, 3),
+        "notifications_per_entry": round(notifications["notified"] / size, 2),
+        "requests": dict(sorted(requests.items())),
+    }
+
+
+async def async_measure_memory(size: int) -> dict:
+    """Mémoire allouée par la mise en place des entrées, mesurée à part."""
+    clock = FrozenClock(START)
+    clock.install()
+    wakes = WakeRecorder()
+    wakes.install()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_create_hass(config_dir)
+        set_data_source(hass, ReplayDataSource(hass, str(FIXTURES)))
+        engine = get_engine(hass)
+        entries = [make_entry(index) for index in range(size)]
+        try:
+            tracemalloc.start()
+            await asyncio.gather(*(async_setup_entry(engine, entry, Counter()) for entry in entries))
+            await async_settle()
+            memory, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            for entry in entries:
+                engine.async_release(entry.entry_id)
+            await async_settle()
+            wakes.uninstall()
+            clock.uninstall()
+            await hass.async_stop(force=True)
+
+    return {
+        "memory_kib": round(memory / 1024, 1),
+        "memory_kib_per_entry": round(memory / 1024 / size, 1),
+    }
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    lines = []
+    for size in args.sizes:
+        result = await async_run_fleet(size)
+        result.update(await async_measure_memory(size))
+        lines.append(json.dumps(result, sort_keys=True))
+        print(lines[-1], flush=True)
+
+    if args.output:
+        Path(args.output).write_text("\n".join(lines) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--output", help="also write the JSON lines to this file")
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Measure the import time and config entry setup time of the integration.
+
+Import: the integration package and its sensor platform are imported in a
+fresh interpreter in which the Home Assistant modules already loaded at boot
+have been imported first, so only the integration's own cost is measured.
+The best of several runs is kept, with the list of modules it pulls in
+beyond the integration itself and the integration modules left for first
+use (network and parsing code).
+
+Setup: ``async_setup_entry`` is run for each contract type offline, with
+the integration's replay data source serving ``benchmarks/fixtures`` and a
+frozen clock, first
+with empty storage (``cold``: the first update is awaited), then again in
+the same configuration directory (``restored``: entities are created from
+the stored state and the first network round is only scheduled).
+
+One JSON object per line is printed (keys sorted, durations in
+milliseconds), so two runs can be diffed:
+
+    python benchmarks/bench_startup.py > bench_startup_output.txt
+
+Requires Home Assistant to be installed (``pip install homeassistant``).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from bench_coordinator import (
+    FIXTURES,
+    ROOT,
+    START,
+    FrozenClock,
+    async_create_hass,
+)
+from bench_fleet import WakeRecorder, count_requests
+
+from custom_components import tarif_edf
+from custom_components.tarif_edf import const, sensor
+from custom_components.tarif_edf.sources import ReplayDataSource, set_data_source
+
+IMPORT_RUNS = 5
+
+# Modules déjà chargés par Home Assistant au démarrage, hors de l'intégration
+BOOT_MODULES = [
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.exceptions",
+    "homeassistant.components.sensor",
+    "homeassistant.helpers.aiohttp_client",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.device_registry",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.event",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+    "homeassistant.util.dt",
+]
+
+IMPORT_SCRIPT = """
+import importlib, json, sys, time
+sys.path.insert(0, {root!r})
+for name in {boot_modules!r}:
+    importlib.import_module(name)
+before = set(sys.modules)
+started = time.perf_counter()
+import custom_components.tarif_edf
+import custom_components.tarif_edf.sensor
+elapsed = time.perf_counter() - started
+loaded = sorted(set(sys.modules) - before)
+print(json.dumps({{"seconds": elapsed, "modules": loaded}}))
+"""
+
+
+def measure_import() -> dict:
+    script = IMPORT_SCRIPT.format(root=str(ROOT), boot_modules=BOOT_MODULES)
+    runs = []
+    for _ in range(IMPORT_RUNS):
+        output = subprocess.run(
+            [sys.executable, "-c", script], check=True, capture_output=True, text=True
+        ).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+
+    best = min(runs, key=lambda run: run["seconds"])
+    own = [name for name in best["modules"] if name.startswith("custom_components")]
+    package = ROOT / "custom_components" / "tarif_edf"
+    return {
+        "phase": "import",
+        "import_ms_min": round(best["seconds"] * 1000, 3),
+        "import_ms_max": round(max(run["seconds"] for run in runs) * 1000, 3),
+        "integration_modules": len(own),
+        "deferred_modules": sorted(
+            path.stem for path in package.glob("*.py")
+            if path.stem != "__init__" and f"custom_components.tarif_edf.{path.stem}" not in own
+        ),
+        "other_modules": sorted(
+            name for name in best["modules"] if name not in own and not name.startswith("custom_components")
+        ),
+    }
+
+
+class BenchEntry(SimpleNamespace):
+    """Entrée minimale suffisant à async_setup_entry."""
+
+    def __init__(self, contract_type: str) -> None:
+        super().__init__(
+            entry_id=f"bench_startup_{contract_type}",
+            title=f"Option {contract_type.upper()}, 6kVA",
+            data={"contract_type": contract_type, "contract_power": "6"},
+            options={},
+            unloads=[],
+        )
+
+    def async_on_unload(self, func) -> None:
+        self.unloads.append(func)
+
+    def add_update_listener(self, listener):
+        return lambda: None
+
+
+async def async_setup_once(config_dir: str, contract_type: str) -> dict:
+    hass = await async_create_hass(config_dir)
+    set_data_source(hass, ReplayDataSource(hass, str(FIXTURES)))
+    entry = BenchEntry(contract_type)
+    entities = []
+
+    async def _forward_entry_setups(config_entry, platforms) -> None:
+        await sensor.async_setup_entry(hass, config_entry, lambda new_entities, update=False: entities.extend(new_entities))
+
+    async def _unload_platforms(config_entry, platforms) -> bool:
+        return True
+
+    hass.config_entries = SimpleNamespace(
+        async_forward_entry_setups=_forward_entry_setups,
+        async_unload_platforms=_unload_platforms,
+    )
+    try:
+        started = time.perf_counter()
+        await tarif_edf.async_setup_entry(hass, entry)
+        setup_ms = (time.perf_counter() - started) * 1000
+        requests = dict(sorted(count_requests(hass).items()))
+
+        # Laisser s'exécuter les tâches en attente, puis enregistrer l'état pour le démarrage suivant
+        await hass.async_block_till_done()
+        await tarif_edf.async_unload_entry(hass, entry)
+        for unload in entry.unloads:
+            unload()
+    finally:
+        await hass.async_stop(force=True)
+
+    return {
+        "setup_ms": round(setup_ms, 3),
+        "entities": len(entities),
+        "requests_during_setup": requests,
+    }
+
+
+async def async_measure_setup(contract_type: str) -> list[dict]:
+    clock = FrozenClock(START)
+    clock.install()
+    # Les échéances du moteur ne sont pas rejouées : seule la mise en place est mesurée
+    wakes = WakeRecorder()
+    wakes.install()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as config_dir:
+            for scenario in ("cold", "restored"):
+                result = await async_setup_once(config_dir, contract_type)
+                results.append({"phase": "setup", "contract_type": contract_type, "scenario": scenario, **result})
+    finally:
+        wakes.uninstall()
+        clock.uninstall()
+    return results
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    lines = [json.dumps(measure_import(), sort_keys=True)]
+    print(lines[-1], flush=True)
+    for contract_type in args.contract_types:
+        for result in await async_measure_setup(contract_type):
+            lines.append(json.dumps(result, sort_keys=True))
+            print(lines[-1], flush=True)
+
+    if args.output:
+        Path(args.output).write_text("\n".join(lines) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--contract-types",
+        nargs="+",
+        default=[const.CONTRACT_TYPE_BASE, const.CONTRACT_TYPE_HPHC, const.CONTRACT_TYPE_TEMPO],
+    )
+    parser.add_argument("--output", help="also write the JSON lines to this file")
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Count the sensor state writes and recorder rows over one simulated day.
+
+For each contract type, one config entry is set up offline with the
+integration's replay data source serving ``benchmarks/fixtures``, its
+sensors are added through an entity platform, writing to the real state
+machine, then one simulated day is run through the shared engine with a
+frozen clock: every wake-up it asks for (network rounds, HP/HC switches,
+Tempo day start, colour publication) is replayed in order.
+
+Two counts are measured:
+
+- ``state_writes``: ``async_write_ha_state`` calls;
+- ``state_changed_events``: ``state_changed`` events fired by the state
+  machine. The recorder stores one ``states`` row per event, so this is the
+  row count for sensors that are not excluded. The recorder itself is not
+  run.
+
+The ``baseline`` scenario replays the same day with the behaviour before
+sensors compared their state: every entity is written at every one-minute
+refresh, and the value and forecast sensors carry the ``updated_at``
+attribute (time of the last refresh) they had then. It is an emulation of
+that behaviour on the current code, not a run of the old code.
+
+One JSON object per line is printed for each contract type and scenario
+(keys sorted):
+
+    python benchmarks/bench_state_writes.py > bench_state_writes_output.txt
+
+Requires Home Assistant to be installed (``pip install homeassistant``).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+import json
+import logging
+from pathlib import Path
+import tempfile
+from types import SimpleNamespace
+
+from bench_coordinator import (
+    FIXTURES,
+    START,
+    FrozenClock,
+    async_create_hass,
+)
+from bench_fleet import WakeRecorder, async_settle
+from bench_startup import BenchEntry
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.helpers import entity as entity_helper
+from homeassistant.helpers.entity_platform import EntityPlatform
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+from custom_components import tarif_edf
+from custom_components.tarif_edf import const, sensor
+from custom_components.tarif_edf.engine import get_engine
+from custom_components.tarif_edf.sources import ReplayDataSource, set_data_source
+
+SIMULATED_DURATION = timedelta(days=1)
+# Cadence de mise à jour de chaque entrée avant le moteur partagé
+BASELINE_UPDATE_INTERVAL = timedelta(minutes=1)
+MAX_ROUNDS = 10000
+SCENARIOS = ["baseline", "current"]
+# Capteurs qui portaient l'attribut updated_at avant la comparaison des états
+UPDATED_AT_SENSORS = (sensor.TarifEdfSensor, sensor.TarifEdfForecastSensor)
+
+
+def install_updated_at(refreshed_at: list[datetime]) -> list[tuple[type, property]]:
+    """Ajoute l'attribut updated_at, daté de la dernière mise à jour par minute."""
+    originals = []
+    for sensor_class in UPDATED_AT_SENSORS:
+        original = sensor_class.extra_state_attributes
+        originals.append((sensor_class, original))
+        sensor_class.extra_state_attributes = property(
+            lambda entity, original=original: {**original.fget(entity), "updated_at": refreshed_at[0]}
+        )
+    return originals
+
+
+def uninstall_updated_at(originals: list[tuple[type, property]]) -> None:
+    for sensor_class, original in originals:
+        sensor_class.extra_state_attributes = original
+
+
+async def async_count_writes(contract_type: str, off_peak_hours_ranges: str | None, scenario: str) -> dict:
+    clock = FrozenClock(START)
+    clock.install()
+    wakes = WakeRecorder()
+    wakes.install()
+    writes: Counter[str] = Counter()
+    state_changes: Counter[str] = Counter()
+    entry = BenchEntry(contract_type)
+    if off_peak_hours_ranges is not None:
+        entry.options = {"off_peak_hours_ranges": off_peak_hours_ranges}
+    entities = []
+    refreshed_at = [START]
+    originals = install_updated_at(refreshed_at) if scenario == "baseline" else []
+
+    async def _forward_entry_setups(config_entry, platforms) -> None:
+        await sensor.async_setup_entry(hass, config_entry, lambda new_entities, update=False: entities.extend(new_entities))
+        platform = EntityPlatform(
+            hass=hass,
+            logger=logging.getLogger(__name__),
+            domain="sensor",
+            platform_name=const.DOMAIN,
+            platform=None,
+            scan_interval=timedelta(seconds=30),
+            entity_namespace=None,
+        )
+        for entity in entities:
+            # Chaque écriture est comptée puis transmise à la machine d'états
+            write = entity.async_write_ha_state
+
+            def _counted_write(write=write, unique_id=entity.unique_id) -> None:
+                writes.update((unique_id,))
+                write()
+
+            entity.async_write_ha_state = _counted_write
+            if scenario == "baseline":
+                # Avant la comparaison des états : écriture à chaque notification
+                entity._handle_coordinator_update = _counted_write
+        await platform.async_add_entities(entities)
+
+    async def _unload_platforms(config_entry, platforms) -> bool:
+        return True
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = await async_create_hass(config_dir)
+        # Fait par Home Assistant au démarrage, avant la création des entités
+        entity_helper.async_setup(hass)
+        set_data_source(hass, ReplayDataSource(hass, str(FIXTURES)))
+        hass.config_entries = SimpleNamespace(
+            async_forward_entry_setups=_forward_entry_setups,
+            async_unload_platforms=_unload_platforms,
+        )
+        hass.bus.async_listen(
+            EVENT_STATE_CHANGED, lambda event: state_changes.update((event.data["entity_id"],))
+        )
+        try:
+            await tarif_edf.async_setup_entry(hass, entry)
+            await async_settle()
+            coordinator = hass.data[const.DOMAIN][entry.entry_id]["coordinator"]
+            # L'état initial des capteurs n'est pas compté
+            writes.clear()
+            state_changes.clear()
+
+            rounds = 0
+            end = START + SIMULATED_DURATION
+            tick = START + BASELINE_UPDATE_INTERVAL
+            while rounds < MAX_ROUNDS:
+                if wakes.when is not None and wakes.when <= end and (scenario != "baseline" or wakes.when <= tick):
+                    clock.now = wakes.when
+                    await get_engine(hass).async_run(clock.now)
+                    rounds += 1
+                elif scenario == "baseline" and tick <= end:
+                    # Mise à jour par minute : toutes les entités sont notifiées
+                    clock.now = refreshed_at[0] = tick
+                    DataUpdateCoordinator.async_update_listeners(coordinator)
+                    tick += BASELINE_UPDATE_INTERVAL
+                else:
+                    break
+                await async_settle()
+
+            await tarif_edf.async_unload_entry(hass, entry)
+            for unload in entry.unloads:
+                unload()
+        finally:
+            uninstall_updated_at(originals)
+            wakes.uninstall()
+            clock.uninstall()
+            await hass.async_stop(force=True)
+
+    return {
+        "contract_type": contract_type,
+        "off_peak_hours_ranges": off_peak_hours_ranges,
+        "scenario": scenario,
+        "entities": len(entities),
+        "rounds": rounds,
+        "state_writes": sum(writes.values()),
+        "state_writes_max_per_entity": max(writes.values(), default=0),
+        "state_changed_events": sum(state_changes.values()),
+        "state_changed_events_max_per_entity": max(state_changes.values(), default=0),
+    }
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    lines = []
+    for contract_type in args.contract_types:
+        off_peak_hours_ranges = None if contract_type == const.CONTRACT_TYPE_BASE else args.off_peak_hours_ranges
+        for scenario in args.scenarios:
+            result = await async_count_writes(contract_type, off_peak_hours_ranges, scenario)
+            lines.append(json.dumps(result, sort_keys=True))
+            print(lines[-1], flush=True)
+
+    if args.output:
+        Path(args.output).write_text("\n".join(lines) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--contract-types",
+        nargs="+",
+        default=[const.CONTRACT_TYPE_BASE, const.CONTRACT_TYPE_HPHC, const.CONTRACT_TYPE_TEMPO],
+    )
+    parser.add_argument("--off-peak-hours-ranges", default="22:00-06:00")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--output", help="also write the JSON lines to this file")
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
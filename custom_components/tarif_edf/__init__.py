@@ -1,38 +1,113 @@
 """The Tarif EDF integration."""
 from __future__ import annotations
 
+import functools
+from typing import Any
+
+import voluptuous as vol
+
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.storage import Store
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.typing import ConfigType
 
-from datetime import timedelta
-
-from .coordinator import TarifEdfDataUpdateCoordinator
+from .engine import get_engine
 
 from .const import (
+    CONF_DATA_SOURCE,
+    CONF_PATH,
+    CONF_PUBLISH_PATH,
+    CONF_TEMPO_HEDGE_COMPARE,
+    CONF_TEMPO_HEDGE_DELAY,
+    CONF_TEMPO_PROVIDERS,
+    DATA_SOURCE_HTTP,
+    DATA_SOURCES,
+    DEFAULT_TEMPO_HEDGE_COMPARE,
+    DEFAULT_TEMPO_HEDGE_DELAY,
     DOMAIN,
+    DOMAIN_CONFIG_KEY,
     PLATFORMS,
-    DEFAULT_REFRESH_INTERVAL,
-    STORAGE_VERSION,
-    STORAGE_KEY,
+    TEMPO_PROVIDERS,
+)
+from .sensor import get_migrated_unique_id
+from .services import async_setup_services
+from .storage import TarifEdfStore
+
+
+def _validate_data_source(config: dict) -> dict:
+    """Un miroir ou un enregistrement doit indiquer son emplacement."""
+    if config[CONF_DATA_SOURCE] != DATA_SOURCE_HTTP and CONF_PATH not in config:
+        raise vol.Invalid(f"'{CONF_PATH}' est requis pour la source '{config[CONF_DATA_SOURCE]}'")
+    return config
+
+
+# Les entrées se configurent depuis l'interface ; seules l'origine des
+# fichiers distants et les fournisseurs des couleurs Tempo, communs à
+# toutes les entrées, se règlent en YAML
+CONFIG_SCHEMA = vol.Schema(
+    {
+        vol.Optional(DOMAIN): vol.All(
+            vol.Schema(
+                {
+                    vol.Optional(CONF_DATA_SOURCE, default=DATA_SOURCE_HTTP): vol.In(DATA_SOURCES),
+                    vol.Optional(CONF_PATH): cv.string,
+                    vol.Optional(CONF_PUBLISH_PATH): cv.string,
+                    vol.Optional(CONF_TEMPO_PROVIDERS): vol.All(
+                        cv.ensure_list, vol.Length(min=1), [vol.In(TEMPO_PROVIDERS)]
+                    ),
+                    vol.Optional(CONF_TEMPO_HEDGE_DELAY, default=DEFAULT_TEMPO_HEDGE_DELAY): vol.All(
+                        vol.Coerce(float), vol.Range(min=0)
+                    ),
+                    vol.Optional(CONF_TEMPO_HEDGE_COMPARE, default=DEFAULT_TEMPO_HEDGE_COMPARE): cv.boolean,
+                }
+            ),
+            _validate_data_source,
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
 )
 
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Tarif EDF services."""
+    # La source de données et le résolveur Tempo sont créés au premier appel
+    # réseau depuis cette configuration ; le code réseau est alors importé dans l'executor
+    hass.data.setdefault(DOMAIN, {})[DOMAIN_CONFIG_KEY] = config.get(DOMAIN, {})
+    async_setup_services(hass)
+
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Tarif EDF from a config entry."""
     hass.data.setdefault(DOMAIN, {})
 
-    coordinator = TarifEdfDataUpdateCoordinator(hass, entry)
+    await async_migrate_unique_ids(hass, entry)
+
+    # Les entrées de même contrat, puissance et plages heures creuses partagent un coordinator
+    engine = get_engine(hass)
+    coordinator = await engine.async_acquire(entry)
 
-    await coordinator.async_config_entry_first_refresh()
+    # Démarrage depuis le dernier état enregistré : le réseau n'est attendu
+    # que s'il n'y a encore rien à afficher
+    if not coordinator.async_restore():
+        await coordinator.async_refresh()
 
-    if not coordinator.last_update_success:
-        raise ConfigEntryNotReady
+        if not coordinator.last_update_success:
+            engine.async_release(entry.entry_id)
+            raise ConfigEntryNotReady from coordinator.last_exception
+    elif coordinator.last_update_success_time is None:
+        # État restauré, pas encore mis à jour : une tournée d'appels réseau est faite dès que possible
+        engine.async_request_refresh()
 
     hass.data[DOMAIN][entry.entry_id] = {
         "coordinator": coordinator,
     }
 
+    # Les échéances (appels réseau, changements de tarif) sont traitées par le moteur partagé
+    entry.async_on_unload(functools.partial(engine.async_release, entry.entry_id))
     entry.async_on_unload(entry.add_update_listener(update_listener))
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
@@ -40,22 +115,38 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+async def async_migrate_unique_ids(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Migrate the sensor unique_ids to the ones scoped to the entry."""
+    # Les anciens unique_id ne dépendaient que du nom du capteur : deux entrées
+    # de même contrat se disputaient les mêmes identifiants
+
+    @callback
+    def _async_migrate(entity_entry: er.RegistryEntry) -> dict[str, Any] | None:
+        unique_id = get_migrated_unique_id(entry.entry_id, entity_entry.unique_id)
+        if unique_id is None:
+            return None
+        return {"new_unique_id": unique_id}
+
+    await er.async_migrate_entries(hass, entry.entry_id, _async_migrate)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         hass.data[DOMAIN].pop(entry.entry_id)
+        await get_engine(hass).async_flush_store()
 
     return unload_ok
 
 
 async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Handle removal of an entry - clean up stored data."""
-    store = Store(hass, STORAGE_VERSION, f"{STORAGE_KEY}_{entry.entry_id}")
+    # Ancien stockage par entrée, repris dans l'état partagé au premier démarrage
+    store = TarifEdfStore(hass, entry.entry_id)
     await store.async_remove()
 
 
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry):
     """Handle options update."""
-    hass.data[DOMAIN][entry.entry_id]['coordinator'].update_interval = timedelta(days=entry.options.get("refresh_interval", DEFAULT_REFRESH_INTERVAL))
-
-    return True
+    # De nouvelles plages heures creuses peuvent rattacher l'entrée à un autre coordinator
+    await hass.config_entries.async_reload(entry.entry_id)
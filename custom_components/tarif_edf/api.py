@@ -0,0 +1,160 @@
+"""HTTP client for the Tarif EDF integration."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import json
+import random
+import time
+from typing import Any
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import (
+    DOMAIN,
+    HTTP_TIMEOUT,
+    REQUEST_BACKOFF_KEY,
+    REQUEST_BACKOFF_JITTER,
+)
+from .metrics import get_metrics
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/51.0.2704.103 Safari/537.36"
+
+
+class TarifEdfApiError(HomeAssistantError):
+    """Error to indicate a remote endpoint returned an unexpected response."""
+
+
+@dataclass
+class FetchResponse:
+    """Réponse HTTP entièrement lue ; la connexion est déjà rendue au pool."""
+
+    url: str
+    status: int
+    headers: Mapping[str, str]
+    content: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise TarifEdfApiError(f"{self.url} a répondu {self.status}")
+
+
+async def async_fetch(
+    hass: HomeAssistant,
+    endpoint: str,
+    url: str,
+    headers: dict[str, str] | None = None,
+    timeout: float = HTTP_TIMEOUT,
+) -> FetchResponse:
+    """Télécharge `url` via la session aiohttp partagée de Home Assistant.
+
+    La session mutualise les connexions (keep-alive) entre tous les appels,
+    et le contexte `async with` garantit la libération de la réponse. La durée
+    et le statut de chaque requête sont comptés pour le point d'accès `endpoint`.
+    """
+    session = async_get_clientsession(hass)
+    started = time.perf_counter()
+    status = None
+    try:
+        async with session.get(
+            url,
+            headers={"User-Agent": USER_AGENT, **(headers or {})},
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            content = await response.read()
+            status = response.status
+            return FetchResponse(url, response.status, response.headers, content)
+    finally:
+        get_metrics(hass).record_request(endpoint, (time.perf_counter() - started) * 1000, status)
+
+
+class SingleFlight:
+    """Regroupe les appels concurrents portant sur une même clé en un seul."""
+
+    def __init__(self) -> None:
+        """Initialize the in-flight calls registry."""
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def async_run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = asyncio.ensure_future(func())
+
+            def _forget(done: asyncio.Future) -> None:
+                if self._calls.get(key) is done:
+                    del self._calls[key]
+
+            call.add_done_callback(_forget)
+        # L'annulation d'un appelant ne doit pas annuler la requête des autres
+        return await asyncio.shield(call)
+
+
+@dataclass
+class _BackoffState:
+    attempts: int = 0
+    retry_at: datetime | None = None
+
+
+class RequestBackoff:
+    """Cache négatif : mémorise, par point d'accès et par clé, quand réessayer.
+
+    Chaque échec (ou réponse inexploitable) double le délai avant la tentative
+    suivante, dans la limite d'un maximum, avec une part d'aléa pour éviter
+    que toutes les instances ne réessaient au même instant.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the backoff registry."""
+        self._states: dict[tuple[str, str], _BackoffState] = {}
+
+    def retry_at(self, endpoint: str, key: str) -> datetime | None:
+        state = self._states.get((endpoint, key))
+        return None if state is None else state.retry_at
+
+    def is_allowed(self, endpoint: str, key: str, now: datetime) -> bool:
+        retry_at = self.retry_at(endpoint, key)
+        return retry_at is None or now >= retry_at
+
+    def defer(
+        self,
+        endpoint: str,
+        key: str,
+        now: datetime,
+        base: timedelta,
+        maximum: timedelta,
+    ) -> datetime:
+        """Repousse la prochaine tentative selon le nombre d'échecs consécutifs."""
+        state = self._states.setdefault((endpoint, key), _BackoffState())
+        # Plusieurs appelants peuvent partager le même résultat : un seul report par fenêtre
+        if state.retry_at is not None and now < state.retry_at:
+            return state.retry_at
+
+        delay = min(maximum, base * (2 ** state.attempts))
+        delay *= random.uniform(1 - REQUEST_BACKOFF_JITTER, 1 + REQUEST_BACKOFF_JITTER)
+        state.attempts += 1
+        state.retry_at = now + delay
+        return state.retry_at
+
+    def defer_until(self, endpoint: str, key: str, retry_at: datetime) -> None:
+        """Repousse la prochaine tentative à un instant fixe, sans compter d'échec."""
+        self._states[(endpoint, key)] = _BackoffState(retry_at=retry_at)
+
+    def reset(self, endpoint: str, key: str) -> None:
+        self._states.pop((endpoint, key), None)
+
+
+def get_request_backoff(hass: HomeAssistant) -> RequestBackoff:
+    """Retourne le cache négatif partagé par toutes les entrées."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if REQUEST_BACKOFF_KEY not in domain_data:
+        domain_data[REQUEST_BACKOFF_KEY] = RequestBackoff()
+    return domain_data[REQUEST_BACKOFF_KEY]
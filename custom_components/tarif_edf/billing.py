@@ -0,0 +1,246 @@
+"""Bill computation over hourly consumption for the Tarif EDF integration."""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+from .const import CONTRACT_TYPE_BASE, CONTRACT_TYPE_TEMPO, HOURS_PER_YEAR
+from .schedule import OffPeakSchedule
+from .tarif import TarifTable, TarifVersion, get_variable_price_key
+from .tempo import get_tempo_billing_day
+
+
+@dataclass
+class ConsumptionProfile:
+    """Consommation regroupée par jour, période (hp/hc) et couleur Tempo."""
+
+    contract_type: str
+    energy: dict[tuple[date, str | None, str | None], float] = field(default_factory=dict)
+    hours: dict[date, int] = field(default_factory=dict)
+    unpriced_energy: float = 0.0
+    unpriced_hours: int = 0
+
+
+def aggregate_consumption(
+    contract_type: str,
+    schedule: OffPeakSchedule,
+    get_color: Callable[[date], str | None],
+    consumption: Iterable[tuple[datetime, float]],
+) -> ConsumptionProfile:
+    """Regroupe une consommation horaire selon ce qui détermine son prix.
+
+    La couleur Tempo est cherchée une fois par jour de facturation et la part
+    d'heures creuses une fois par heure de la journée. Le profil obtenu ne
+    dépend pas de la puissance souscrite : il peut être valorisé pour chaque
+    puissance sans reparcourir les heures.
+    """
+    profile = ConsumptionProfile(contract_type)
+    fractions = schedule.hourly_off_peak_fractions
+    colors: dict[date, str | None] = {}
+
+    for hour_start, kwh in consumption:
+        if not kwh:
+            continue
+        local = dt_util.as_local(hour_start)
+
+        color = None
+        if contract_type == CONTRACT_TYPE_TEMPO:
+            billing_day = get_tempo_billing_day(local)
+            if billing_day not in colors:
+                colors[billing_day] = get_color(billing_day)
+            color = colors[billing_day]
+            if color is None:
+                profile.unpriced_energy += kwh
+                profile.unpriced_hours += 1
+                continue
+
+        day = local.date()
+        profile.hours[day] = profile.hours.get(day, 0) + 1
+        if contract_type == CONTRACT_TYPE_BASE:
+            parts = ((None, kwh),)
+        else:
+            off_peak = fractions[local.hour]
+            parts = (('hc', kwh * off_peak), ('hp', kwh * (1 - off_peak)))
+
+        for period, part in parts:
+            if part:
+                key = (day, period, color)
+                profile.energy[key] = profile.energy.get(key, 0.0) + part
+
+    return profile
+
+
+def count_hours_per_day(start: datetime, end: datetime) -> dict[date, int]:
+    """Nombre d'heures de la période pour chaque jour local."""
+    hours: dict[date, int] = {}
+    # Parcours en UTC pour compter correctement les heures les jours de changement d'heure
+    hour = dt_util.as_utc(start)
+    utc_end = dt_util.as_utc(end)
+    while hour < utc_end:
+        day = dt_util.as_local(hour).date()
+        hours[day] = hours.get(day, 0) + 1
+        hour += timedelta(hours=1)
+    return hours
+
+
+def price_consumption(
+    power: str,
+    table: TarifTable,
+    profile: ConsumptionProfile,
+    period_hours: dict[date, int],
+) -> dict[str, Any]:
+    """Valorise un profil de consommation pour une puissance souscrite."""
+    contract_type = profile.contract_type
+    versions: dict[date, TarifVersion | None] = {}
+
+    def version_on(day: date) -> TarifVersion | None:
+        if day not in versions:
+            versions[day] = table.at(power, day)
+        return versions[day]
+
+    breakdown: dict[str, dict[str, float]] = {}
+    energy = 0.0
+    variable_cost = 0.0
+    unpriced_energy = profile.unpriced_energy
+    unpriced_hours = profile.unpriced_hours
+
+    for (day, period, color), kwh in profile.energy.items():
+        version = version_on(day)
+        if version is None:
+            unpriced_energy += kwh
+            continue
+        price = version.prices[get_variable_price_key(contract_type, period, color)]
+        label = '_'.join(value for value in (period, color) if value) or 'base'
+        totals = breakdown.setdefault(label, {'energy_kwh': 0.0, 'cost': 0.0})
+        totals['energy_kwh'] += kwh
+        totals['cost'] += kwh * price
+        energy += kwh
+        variable_cost += kwh * price
+
+    unpriced_hours += sum(hours for day, hours in profile.hours.items() if version_on(day) is None)
+
+    subscription_cost = 0.0
+    for day, hours in period_hours.items():
+        version = version_on(day)
+        if version is not None:
+            subscription_cost += hours * version.prices[f"{contract_type}_fixe_ttc"] / HOURS_PER_YEAR
+
+    return {
+        'contract_type': contract_type,
+        'contract_power': power,
+        'energy_kwh': round(energy, 3),
+        'variable_cost': round(variable_cost, 2),
+        'subscription_cost': round(subscription_cost, 2),
+        'total_cost': round(variable_cost + subscription_cost, 2),
+        'currency': 'EUR',
+        'breakdown': {
+            label: {key: round(value, 3 if key == 'energy_kwh' else 2) for key, value in totals.items()}
+            for label, totals in sorted(breakdown.items())
+        },
+        'unpriced_energy_kwh': round(unpriced_energy, 3),
+        'unpriced_hours': unpriced_hours,
+    }
+
+
+def compute_cost(
+    contract_type: str,
+    power: str,
+    table: TarifTable,
+    schedule: OffPeakSchedule,
+    get_color: Callable[[date], str | None],
+    start: datetime,
+    end: datetime,
+    consumption: Iterable[tuple[datetime, float]],
+) -> dict[str, Any]:
+    """Calcule le coût d'une consommation horaire sur une période.
+
+    Conçu pour être exécuté hors de la boucle d'événements.
+    """
+    profile = aggregate_consumption(contract_type, schedule, get_color, consumption)
+    return price_consumption(power, table, profile, count_hours_per_day(start, end))
+
+
+def compare_contracts(
+    tables: dict[str, TarifTable],
+    schedules: dict[str, OffPeakSchedule],
+    powers: Iterable[str],
+    get_color: Callable[[date], str | None],
+    start: datetime,
+    end: datetime,
+    consumption: Iterable[tuple[datetime, float]],
+) -> list[dict[str, Any]]:
+    """Compare le coût d'une consommation pour chaque contrat et chaque puissance.
+
+    Les heures sont parcourues une fois par type de contrat ; chaque puissance
+    ne valorise ensuite que le profil agrégé par jour. Conçu pour être exécuté
+    hors de la boucle d'événements.
+    """
+    consumption = list(consumption)
+    powers = list(powers)
+    period_hours = count_hours_per_day(start, end)
+
+    results = []
+    for contract_type, table in tables.items():
+        profile = aggregate_consumption(contract_type, schedules[contract_type], get_color, consumption)
+        for power in powers:
+            if table.versions(power):
+                results.append(price_consumption(power, table, profile, period_hours))
+
+    # Un résultat incomplet (couleur ou tarif manquant) est classé après les résultats complets
+    results.sort(key=lambda result: (result['unpriced_energy_kwh'] > 0, result['total_cost']))
+    for rank, result in enumerate(results, start=1):
+        result['rank'] = rank
+    return results
+
+
+def price_timestamps(
+    contract_type: str,
+    power: str,
+    table: TarifTable | None,
+    schedule: OffPeakSchedule,
+    get_color: Callable[[date], tuple[str | None, float | None]],
+    timestamps: Sequence[datetime],
+) -> list[dict[str, Any]]:
+    """Prix, période et couleur applicables à chaque instant, dans l'ordre reçu.
+
+    Les instants sont parcourus triés : la version tarifaire n'est recherchée
+    qu'à chaque changement de jour et la couleur Tempo qu'à chaque changement
+    de jour de facturation.
+    """
+    results: list[dict[str, Any]] = [{}] * len(timestamps)
+    day = billing_day = version = None
+    color = probability = None
+
+    for index, when in sorted(enumerate(timestamps), key=lambda item: item[1]):
+        local = dt_util.as_local(when)
+        if local.date() != day:
+            day = local.date()
+            version = None if table is None else table.at(power, day)
+
+        if contract_type == CONTRACT_TYPE_TEMPO:
+            current_billing_day = get_tempo_billing_day(local)
+            if current_billing_day != billing_day:
+                billing_day = current_billing_day
+                color, probability = get_color(billing_day)
+
+        period = None
+        if contract_type != CONTRACT_TYPE_BASE:
+            period = 'hc' if schedule.is_off_peak(local) else 'hp'
+
+        price = None
+        if version is not None and (contract_type != CONTRACT_TYPE_TEMPO or color is not None):
+            price = version.prices.get(get_variable_price_key(contract_type, period, color))
+
+        results[index] = {
+            'time': local.isoformat(),
+            'price': price,
+            'period': period,
+            'color': color,
+            'probability': probability,
+        }
+
+    return results
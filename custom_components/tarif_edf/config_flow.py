@@ -15,18 +15,20 @@ from homeassistant.helpers.selector import SelectSelector
 from .const import (
     DOMAIN,
     DEFAULT_REFRESH_INTERVAL,
+    CONTRACT_POWERS,
     CONTRACT_TYPE_BASE,
     CONTRACT_TYPE_HPHC,
     CONTRACT_TYPE_TEMPO,
     TEMPO_OFFPEAK_HOURS
 )
+from .schedule import InvalidOffPeakHours, OffPeakSchedule
 
 _LOGGER = logging.getLogger(__name__)
 
 STEP_USER = vol.Schema(
     {
         vol.Required("contract_power", default="6"): SelectSelector({
-            "options": ['3', '6', '9', '12', '15', '18', '30', '36'],
+            "options": CONTRACT_POWERS,
             "mode": "dropdown"
         }),
         vol.Required("contract_type"): vol.In({
@@ -78,8 +80,14 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Manage the options."""
+        errors: dict[str, str] = {}
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            try:
+                OffPeakSchedule.parse(user_input.get("off_peak_hours_ranges"))
+            except InvalidOffPeakHours:
+                errors["off_peak_hours_ranges"] = "invalid_off_peak_hours"
+            else:
+                return self.async_create_entry(title="", data=user_input)
 
         config_entry = self.hass.config_entries.async_get_entry(self.config_entry_id)
 
@@ -95,4 +103,5 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     vol.Optional("off_peak_hours_ranges", default=config_entry.options.get("off_peak_hours_ranges", default_offpeak_hours)): str,
                 }
             ),
+            errors=errors,
         )
@@ -1,5 +1,7 @@
 """Constants for the Tarif EDF integration."""
 
+from datetime import timedelta
+
 from homeassistant.const import Platform
 
 DOMAIN = "tarif_edf"
@@ -8,12 +10,78 @@ CONTRACT_TYPE_BASE="base"
 CONTRACT_TYPE_HPHC="hphc"
 CONTRACT_TYPE_TEMPO="tempo"
 
+CONTRACT_POWERS=['3', '6', '9', '12', '15', '18', '30', '36']
+
 TARIF_BASE_URL="https://www.data.gouv.fr/fr/datasets/r/c13d05e5-9e55-4d03-bf7e-042a2ade7e49"
 TARIF_HPHC_URL="https://www.data.gouv.fr/fr/datasets/r/f7303b3a-93c7-4242-813d-84919034c416"
 TARIF_TEMPO_URL="https://www.data.gouv.fr/fr/datasets/r/0c3d1d36-c412-4620-8566-e5cbb4fa2b5a"
+TARIF_URLS={
+    CONTRACT_TYPE_BASE: TARIF_BASE_URL,
+    CONTRACT_TYPE_HPHC: TARIF_HPHC_URL,
+    CONTRACT_TYPE_TEMPO: TARIF_TEMPO_URL,
+}
+# Clés des prix TTC, dans l'ordre des colonnes TTC des fichiers data.gouv
+TARIF_PRICE_KEYS={
+    CONTRACT_TYPE_BASE: (
+        'base_fixe_ttc',
+        'base_variable_ttc',
+    ),
+    CONTRACT_TYPE_HPHC: (
+        'hphc_fixe_ttc',
+        'hphc_variable_hc_ttc',
+        'hphc_variable_hp_ttc',
+    ),
+    CONTRACT_TYPE_TEMPO: (
+        'tempo_fixe_ttc',
+        'tempo_variable_hc_bleu_ttc',
+        'tempo_variable_hp_bleu_ttc',
+        'tempo_variable_hc_blanc_ttc',
+        'tempo_variable_hp_blanc_ttc',
+        'tempo_variable_hc_rouge_ttc',
+        'tempo_variable_hp_rouge_ttc',
+    ),
+}
 
 TEMPO_COLOR_API_URL="https://www.api-couleur-tempo.fr/api/jourTempo"
+TEMPO_HISTORY_API_URL="https://www.api-couleur-tempo.fr/api/joursTempo"
 TEMPO_FORECAST_API_URL="https://open-dpe.fr/assets/tempo_days_lite.json"
+
+# Origine des fichiers distants (configuration YAML du domaine) : points d'accès
+# en ligne, miroir local ou réseau tenu à jour par une seule instance, ou rejeu
+# de fichiers enregistrés
+CONF_DATA_SOURCE="data_source"
+CONF_PATH="path"
+CONF_PUBLISH_PATH="publish_path"
+DATA_SOURCE_HTTP="http"
+DATA_SOURCE_MIRROR="mirror"
+DATA_SOURCE_REPLAY="replay"
+DATA_SOURCES=[DATA_SOURCE_HTTP, DATA_SOURCE_MIRROR, DATA_SOURCE_REPLAY]
+
+# Fournisseurs des couleurs Tempo, par ordre de priorité : la source de données
+# ci-dessus (api-couleur-tempo.fr ou son miroir) et le calendrier EDF. Un
+# fournisseur suivant est interrogé en parallèle si le précédent dépasse le
+# délai de relance (secondes), ou s'il échoue ou répond "indéterminé"
+CONF_TEMPO_PROVIDERS="tempo_providers"
+CONF_TEMPO_HEDGE_DELAY="tempo_hedge_delay"
+TEMPO_PROVIDER_DATA_SOURCE="data_source"
+TEMPO_PROVIDER_EDF="edf"
+TEMPO_PROVIDERS=[TEMPO_PROVIDER_DATA_SOURCE, TEMPO_PROVIDER_EDF]
+DEFAULT_TEMPO_HEDGE_DELAY=1.0
+# Les requêtes encore en cours après la première couleur définitive sont annulées.
+# Avec tempo_hedge_compare, elles disposent de ce délai (secondes) pour que leurs
+# couleurs soient comparées à celle retenue
+CONF_TEMPO_HEDGE_COMPARE="tempo_hedge_compare"
+DEFAULT_TEMPO_HEDGE_COMPARE=False
+TEMPO_HEDGE_AGREEMENT_TIMEOUT=10
+TEMPO_EDF_API_URL="https://api-commerce.edf.fr/commerce/activet/v1/calendrier-jours-effacement"
+TEMPO_EDF_STATUS={
+    "TEMPO_BLEU": 1,
+    "TEMPO_BLANC": 2,
+    "TEMPO_ROUGE": 3
+}
+TEMPO_COLORS=("bleu", "blanc", "rouge")
+# Nombre de jours de chaque couleur par saison Tempo
+TEMPO_COLOR_DAYS={"bleu": 300, "blanc": 43, "rouge": 22}
 TEMPO_COLORS_MAPPING={
     0: "indéterminé",
     1: "bleu",
@@ -27,8 +95,89 @@ TEMPO_OFFPEAK_HOURS="22:00-06:00"
 
 DEFAULT_REFRESH_INTERVAL=1
 
+# Durée minimale couverte par la chronologie des prix
+PRICE_TIMELINE_HORIZON=timedelta(hours=48)
+
+# Recherche de la fenêtre la moins chère : pas des débuts possibles et horizon maximal
+CHEAPEST_WINDOW_SLOT=timedelta(minutes=15)
+CHEAPEST_WINDOW_MAX_HORIZON=timedelta(days=7)
+
+# Nombre maximal d'instants par appel du service get_prices
+GET_PRICES_MAX_TIMESTAMPS=20000
+
+# Clés de l'état suivi par le coordinateur, en plus des champs des données :
+# chaque entité n'est notifiée que lorsqu'une des clés dont elle dépend change
+STATE_KEY_LAST_UPDATE='last_update'
+STATE_KEY_METRICS='metrics'
+STATE_KEY_TIMELINE='timeline'
+
+# Les unique_id des capteurs sont préfixés par l'identifiant de l'entrée
+UNIQUE_ID_PREFIX='tarif_edf_'
+
+# Cadence des appels réseau ; les changements de tarif sont programmés à l'heure exacte
+NETWORK_REFRESH_INTERVAL=timedelta(hours=1)
+# Cadence minimale des appels réseau lorsqu'une nouvelle tentative est programmée
+NETWORK_MIN_REFRESH_INTERVAL=timedelta(seconds=30)
+
+# Nouvelles tentatives pour une couleur Tempo indéterminée après sa publication
+# attendue : rapprochées juste après 11:00, puis de plus en plus espacées
+TEMPO_UNDETERMINED_BACKOFF_MIN=timedelta(minutes=2)
+TEMPO_UNDETERMINED_BACKOFF_MAX=timedelta(hours=1)
+# Nouvelles tentatives après une erreur réseau ou HTTP
+REQUEST_ERROR_BACKOFF_MIN=timedelta(minutes=1)
+REQUEST_ERROR_BACKOFF_MAX=timedelta(minutes=30)
+# Part d'aléa appliquée aux délais (+/- 20 %)
+REQUEST_BACKOFF_JITTER=0.2
+
+# Points d'accès distants, pour le suivi des échecs
+ENDPOINT_TARIF="tarif"
+ENDPOINT_TEMPO_DAY="jour_tempo"
+ENDPOINT_TEMPO_HISTORY="jours_tempo"
+ENDPOINT_TEMPO_FORECAST="prevision"
+ENDPOINT_TEMPO_EDF="calendrier_edf"
+
+# Caches suivis par les métriques
+CACHE_TARIF="tarif"
+CACHE_TEMPO_HISTORY="historique_tempo"
+CACHE_TEMPO_STORE="cache_tempo"
+CACHE_TEMPO_FORECAST="prevision"
+
+# Délai maximal d'une requête HTTP (secondes)
+HTTP_TIMEOUT=30
+
+# Les parts fixes des fichiers data.gouv sont annuelles
+HOURS_PER_YEAR = 365.25 * 24
+
 # Storage constants
-STORAGE_VERSION = 1
+STORAGE_VERSION = 3
 STORAGE_KEY = "tarif_edf_tempo_cache"
+# Délai de regroupement des écritures du cache Tempo (secondes)
+TEMPO_CACHE_SAVE_DELAY = 30
+# État partagé par toutes les entrées (remplace le stockage par entrée ci-dessus)
+STATE_STORAGE_VERSION = 1
+STATE_STORAGE_KEY = "tarif_edf_state"
+
+# Historique des couleurs Tempo, partagé par toutes les entrées
+TEMPO_HISTORY_STORAGE_VERSION = 1
+TEMPO_HISTORY_STORAGE_KEY = "tarif_edf_tempo_history"
+TEMPO_HISTORY_KEY = "tempo_history"
+TEMPO_HISTORY_SAVE_DELAY = 60
+
+# Clé du cache des fichiers tarifaires partagé dans hass.data[DOMAIN]
+DATASET_CACHE_KEY = "dataset_cache"
+# Clé des requêtes en cours partagées dans hass.data[DOMAIN]
+SINGLE_FLIGHT_KEY = "single_flight"
+# Clé des métriques dans hass.data[DOMAIN]
+METRICS_KEY = "metrics"
+# Clé du cache négatif des requêtes dans hass.data[DOMAIN]
+REQUEST_BACKOFF_KEY = "request_backoff"
+# Clé du moteur partagé par toutes les entrées dans hass.data[DOMAIN]
+ENGINE_KEY = "engine"
+# Clé de la source de données du domaine dans hass.data[DOMAIN]
+DATA_SOURCE_KEY = "data_source"
+# Clé du résolveur des couleurs Tempo dans hass.data[DOMAIN]
+TEMPO_RESOLVER_KEY = "tempo_resolver"
+# Clé de la configuration YAML du domaine dans hass.data[DOMAIN]
+DOMAIN_CONFIG_KEY = "config"
 
 PLATFORMS = [Platform.SENSOR]
@@ -1,390 +1,393 @@
 """Data update coordinator for the Tarif EDF integration."""
 from __future__ import annotations
 
-from datetime import timedelta, datetime, date
-import time
-import re
-from typing import Any
-import json
+from collections.abc import Mapping
+from datetime import timedelta, datetime, date, time
+from typing import TYPE_CHECKING, Any
 import logging
-import requests
-import csv
+from time import perf_counter
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import TimestampDataUpdateCoordinator
-from homeassistant.helpers.storage import Store
 from homeassistant.util import dt as dt_util
 
 from .const import (
-    DEFAULT_REFRESH_INTERVAL,
     CONTRACT_TYPE_BASE,
     CONTRACT_TYPE_HPHC,
     CONTRACT_TYPE_TEMPO,
-    TARIF_BASE_URL,
-    TARIF_HPHC_URL,
-    TARIF_TEMPO_URL,
-    TEMPO_COLOR_API_URL,
-    TEMPO_FORECAST_API_URL,
     TEMPO_COLORS_MAPPING,
     TEMPO_DAY_START_AT,
     TEMPO_TOMRROW_AVAILABLE_AT,
     TEMPO_OFFPEAK_HOURS,
-    TEMPO_FORECAST_DAYS,
-    STORAGE_VERSION,
-    STORAGE_KEY,
+    PRICE_TIMELINE_HORIZON,
+    STATE_KEY_LAST_UPDATE,
+    STATE_KEY_METRICS,
+    STATE_KEY_TIMELINE,
 )
+from .metrics import get_metrics
+from .schedule import OffPeakSchedule
+from .models import FORECAST_KEYS, ForecastDay, TarifEdfData, TarifPrices, TarifState, TempoDay
+from .tarif import TarifTable
+from .tempo import TempoHistoryStore, get_tempo_billing_day
+from .timeline import PriceSegment, PriceTimeline
 
-_LOGGER = logging.getLogger(__name__)
+if TYPE_CHECKING:
+    from .engine import TarifEdfEngine
 
-def get_remote_file(url: str):
-    return requests.get(
-        url,
-        stream=True,
-        headers={
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/51.0.2704.103 Safari/537.36"
-        },
-    )
+_LOGGER = logging.getLogger(__name__)
 
 def str_to_time(str):
     return datetime.strptime(str, '%H:%M').time()
 
-def time_in_between(now, start, end):
-    if start <= end:
-        return start <= now < end
-    else:
-        return start <= now or now < end
-
 def get_tempo_color_from_code(code):
     return TEMPO_COLORS_MAPPING[code]
 
+def get_off_peak_hours_ranges(contract_type: str, options: Mapping[str, Any]) -> str | None:
+    """Plages heures creuses d'une entrée, celles de Tempo par défaut."""
+    default_offpeak_hours = None
+    if contract_type == CONTRACT_TYPE_TEMPO:
+        default_offpeak_hours = TEMPO_OFFPEAK_HOURS
+    return options.get("off_peak_hours_ranges", default_offpeak_hours)
+
+TEMPO_DAY_START_TIME = str_to_time(TEMPO_DAY_START_AT)
+
 
 class TarifEdfDataUpdateCoordinator(TimestampDataUpdateCoordinator):
-    """Data update coordinator for the Tarif EDF integration."""
+    """Data update coordinator for the Tarif EDF integration.
+
+    Vue sur l'état partagé du moteur, commune à toutes les entrées de même
+    contrat, puissance et plages heures creuses : seuls la période HP/HC, le
+    tarif actuel, la chronologie des prix et l'état observé par les capteurs
+    lui sont propres.
+    """
 
-    config_entry: ConfigEntry
+    config_entry: ConfigEntry | None
 
     def __init__(
-        self, hass: HomeAssistant, entry: ConfigEntry
+        self, hass: HomeAssistant, engine: TarifEdfEngine, tarif: TarifState, off_peak_hours_ranges: str | None
     ) -> None:
         """Initialize the coordinator."""
+        # Les options sont validées à l'enregistrement ; on reste tolérant
+        # envers d'anciennes valeurs enregistrées avant cette validation
+        off_peak_schedule = OffPeakSchedule.parse(off_peak_hours_ranges, strict=False)
+        name = f"{tarif.contract_type} {tarif.power}kVA"
+        if off_peak_hours_ranges is not None:
+            name = f"{name} {off_peak_hours_ranges}"
         super().__init__(
             hass=hass,
             logger=_LOGGER,
-            name=entry.title,
-            update_interval=timedelta(minutes=1),
+            name=name,
+            # Les appels réseau sont programmés par le moteur partagé, pour toutes les entrées à la fois
+            update_interval=None,
         )
-        self.config_entry = entry
-        self.tempo_prices: dict[str, dict] = {}
-        self._store = Store(hass, STORAGE_VERSION, f"{STORAGE_KEY}_{entry.entry_id}")
-        self._tempo_cache_loaded = False
-        self._forecast_cache: list = []
-        self._forecast_cache_time = None
-
-    async def _async_load_tempo_cache(self) -> None:
-        """Charge le cache Tempo depuis le stockage persistant."""
-        if self._tempo_cache_loaded:
+        # Commun à plusieurs entrées : rattaché à aucune
+        self.config_entry = None
+        self.engine = engine
+        self.tarif = tarif
+        self.contract_type = tarif.contract_type
+        self.contract_power = tarif.power
+        self.off_peak_hours_ranges = off_peak_hours_ranges
+        self.off_peak_schedule = off_peak_schedule
+        self.entry_ids: set[str] = set()
+        self.next_transition: tuple[datetime, bool] | None = None
+        self.price_timeline = self._create_price_timeline()
+        # Clés d'état modifiées depuis la dernière notification, relevées là où les champs changent
+        self._changed_keys: set[str] = set()
+        self._notified_available: bool | None = None
+        self._listeners_by_key: dict[str | None, list[CALLBACK_TYPE]] = {}
+
+    @property
+    def tarif_table(self) -> TarifTable | None:
+        return self.tarif.table
+
+    @property
+    def tempo_history(self) -> TempoHistoryStore | None:
+        return self.engine.tempo_history
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE, context: Any = None) -> CALLBACK_TYPE:
+        """Enregistre une entité ; son contexte est l'ensemble des clés d'état dont elle dépend."""
+        remove_listener = super().async_add_listener(update_callback, context)
+        keys = tuple(context or (None,))
+        for key in keys:
+            self._listeners_by_key.setdefault(key, []).append(update_callback)
+
+        @callback
+        def remove() -> None:
+            remove_listener()
+            for key in keys:
+                callbacks = self._listeners_by_key[key]
+                callbacks.remove(update_callback)
+                if not callbacks:
+                    del self._listeners_by_key[key]
+
+        return remove
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Notifie uniquement les entités dont une clé a changé depuis la dernière notification.
+
+        Les entités enregistrées sans contexte sont toujours notifiées, et
+        toutes le sont lorsque la disponibilité change.
+        """
+        changed, self._changed_keys = self._changed_keys, set()
+        if self._notified_available != self.last_update_success:
+            self._notified_available = self.last_update_success
+            super().async_update_listeners()
             return
 
-        stored_data = await self._store.async_load()
-        if stored_data:
-            self.logger.info("Chargement du cache Tempo depuis le stockage persistant")
-            if self.data is None:
-                self.data = {}
-            # Restaurer les couleurs Tempo sauvegardées
-            if 'tempo_demain_date' in stored_data:
-                self.data['tempo_demain_date'] = stored_data.get('tempo_demain_date')
-                self.data['tempo_couleur_demain'] = stored_data.get('tempo_couleur_demain')
-                self.logger.info(
-                    f"Cache Tempo restauré: demain={self.data.get('tempo_couleur_demain')} "
-                    f"pour le {self.data.get('tempo_demain_date')}"
-                )
-            if 'tempo_aujourdhui_date' in stored_data:
-                self.data['tempo_aujourdhui_date'] = stored_data.get('tempo_aujourdhui_date')
-                self.data['tempo_couleur_aujourdhui'] = stored_data.get('tempo_couleur_aujourdhui')
-                self.logger.info(
-                    f"Cache Tempo restauré: aujourd'hui={self.data.get('tempo_couleur_aujourdhui')} "
-                    f"pour le {self.data.get('tempo_aujourdhui_date')}"
-                )
-        self._tempo_cache_loaded = True
-
-    async def _async_save_tempo_cache(self) -> None:
-        """Sauvegarde le cache Tempo dans le stockage persistant."""
-        if self.data is None:
+        if not changed:
             return
 
-        cache_data = {
-            'tempo_demain_date': self.data.get('tempo_demain_date'),
-            'tempo_couleur_demain': self.data.get('tempo_couleur_demain'),
-            'tempo_aujourdhui_date': self.data.get('tempo_aujourdhui_date'),
-            'tempo_couleur_aujourdhui': self.data.get('tempo_couleur_aujourdhui'),
-        }
-        await self._store.async_save(cache_data)
-        self.logger.debug(f"Cache Tempo sauvegardé: {cache_data}")
-
-    async def get_tempo_day(self, date):
-        date_str = date.strftime('%Y-%m-%d')
-        now = dt_util.now().time()
-        check_limit = str_to_time(TEMPO_TOMRROW_AVAILABLE_AT)
-
-        cached = self.tempo_prices.get(date_str)
-        if cached is not None:
-            codeJour = cached['codeJour']
-            # Use cache if color is known, or if indéterminé and before the recheck limit
-            if codeJour in [1, 2, 3] or (codeJour == 0 and now < check_limit):
-                return cached
-
-        url = f"{TEMPO_COLOR_API_URL}/{date_str}"
-        response = await self.hass.async_add_executor_job(get_remote_file, url)
-        response_json = response.json()
-
-        # Only overwrite cache if new result has a known color, or no cache exists
-        if cached is None or response_json.get('codeJour', 0) in [1, 2, 3]:
-            self.tempo_prices[date_str] = response_json
-
-        return response_json
-
-    async def get_tempo_forecast(self) -> list:
-        """Récupère les prévisions Tempo depuis open-dpe.fr (mis en cache 1h)."""
-        now = dt_util.now()
-        if self._forecast_cache and self._forecast_cache_time and \
-                (now - self._forecast_cache_time).total_seconds() < 3600:
-            return self._forecast_cache
+        # Une entité dépendant de plusieurs clés modifiées n'est notifiée qu'une fois
+        to_notify: dict[CALLBACK_TYPE, None] = dict.fromkeys(self._listeners_by_key.get(None, ()))
+        for key in changed:
+            to_notify.update(dict.fromkeys(self._listeners_by_key.get(key, ())))
+        self.logger.debug(f"Clés modifiées: {sorted(changed)}, {len(to_notify)} entité(s) notifiée(s)")
+        for update_callback in to_notify:
+            update_callback()
+
+    def _set_prices(self, prices: TarifPrices) -> None:
+        if prices != self.data.prices:
+            self.data.prices = prices
+            self._changed_keys.update(self.data.get_price_keys())
+
+    def _set_tempo_days(self, yesterday: str | None, today: TempoDay, tomorrow: TempoDay) -> None:
+        tempo = self.data.tempo
+        for key, attribute, value in (
+            ('tempo_couleur_hier', 'yesterday', yesterday),
+            ('tempo_couleur_aujourdhui', 'today', today),
+            ('tempo_couleur_demain', 'tomorrow', tomorrow),
+        ):
+            if getattr(tempo, attribute) != value:
+                setattr(tempo, attribute, value)
+                self._changed_keys.add(key)
+
+    def _set_forecast(self, forecast_data: list) -> None:
+        for keys, forecast_day, forecast in zip(FORECAST_KEYS, self.data.forecast, forecast_data):
+            updated = ForecastDay(
+                forecast.get('date', ''),
+                forecast.get('couleur', 'indéterminé'),
+                round(forecast.get('probability', 0) * 100),
+            )
+            if updated != forecast_day:
+                forecast_day.date, forecast_day.color, forecast_day.probability = \
+                    updated.date, updated.color, updated.probability
+                self._changed_keys.update(keys)
+
+    def _rebuild_price_timeline(self, now: datetime) -> None:
+        if self.price_timeline.rebuild(now):
+            self._changed_keys.add(STATE_KEY_TIMELINE)
+
+    def advance_price_timeline(self, now: datetime) -> None:
+        """Retire les segments passés de la chronologie ; son capteur suivra à la prochaine notification."""
+        if self.price_timeline.advance(now):
+            self._changed_keys.add(STATE_KEY_TIMELINE)
+
+    def _apply_shared_state(self, now: datetime) -> TarifEdfData:
+        """Reporte l'état partagé du moteur dans l'état des capteurs, sans accès réseau."""
+        if self.data is None:
+            self.data = TarifEdfData(self.contract_type, self.contract_power)
+        self.data.last_refresh_at = self.tarif.last_refresh_at
+        self._set_prices(self.tarif.prices)
+
+        if self.contract_type == CONTRACT_TYPE_TEMPO:
+            tempo = self.engine.tempo
+            self._set_tempo_days(tempo.yesterday, tempo.today, tempo.tomorrow)
+            self._set_forecast(self.engine.forecast)
+
+        # Prix ou couleurs ont pu changer : la chronologie est recalculée
+        self._rebuild_price_timeline(now)
+        self._update_current_state(now)
+        self.async_schedule_next_transition()
+        return self.data
 
+    def record_update(self, duration_ms: float, success: bool) -> None:
+        get_metrics(self.hass).record_update(self.name, duration_ms, success)
+        self._changed_keys.add(STATE_KEY_METRICS)
+        self.logger.debug(f"Mise à jour EDF de {self.name} terminée en {duration_ms:.1f} ms")
+
+    @callback
+    def async_restore(self) -> bool:
+        """Construit l'état des capteurs depuis l'état partagé restauré, sans aucun accès réseau.
+
+        Retourne False s'il n'y a rien à restaurer : la première mise à jour
+        doit alors être faite avant de créer les entités.
+        """
+        if self.data is not None:
+            # Déjà en service pour une autre entrée
+            return True
+        if self.tarif.table is None:
+            return False
+
+        self._apply_shared_state(dt_util.now())
+        self.logger.info(f"État restauré depuis le stockage persistant (tarifs du {self.tarif.last_refresh_at})")
+        return True
+
+    async def _async_update_data(self) -> TarifEdfData:
+        """Met à jour l'état partagé dont dépend ce coordinator, puis l'état de ses capteurs."""
+        started = perf_counter()
+        success = False
         try:
-            response = await self.hass.async_add_executor_job(
-                get_remote_file, TEMPO_FORECAST_API_URL
-            )
-            if response.status_code == 200:
-                forecast_data = response.json()
-                if not isinstance(forecast_data, list):
-                    self.logger.warning(
-                        f"Réponse prévisions Tempo inattendue (type={type(forecast_data).__name__})"
-                    )
-                    return []
-                self.logger.debug(f"Prévisions Tempo récupérées: {len(forecast_data)} jours")
-                self._forecast_cache = forecast_data
-                self._forecast_cache_time = now
-                return forecast_data
-            else:
-                self.logger.warning(
-                    f"Erreur lors de la récupération des prévisions Tempo: {response.status_code}"
-                )
-                return self._forecast_cache or []
-        except Exception as e:
-            self.logger.error(f"Exception lors de la récupération des prévisions Tempo: {e}")
-            return self._forecast_cache or []
-
-    async def _async_update_data(self) -> dict[Platform, dict[str, Any]]:
-        """Get the latest data from Tarif EDF and updates the state."""
-        data = self.config_entry.data
-        previous_data = None if self.data is None else self.data.copy()
-
-        # Charger le cache Tempo depuis le stockage persistant au premier démarrage
-        if data['contract_type'] == CONTRACT_TYPE_TEMPO:
-            await self._async_load_tempo_cache()
-
-        if previous_data is None:
-            # Préserver les données du cache si elles existent
-            cached_tempo_demain_date = self.data.get('tempo_demain_date') if self.data else None
-            cached_tempo_couleur_demain = self.data.get('tempo_couleur_demain') if self.data else None
-            cached_tempo_aujourdhui_date = self.data.get('tempo_aujourdhui_date') if self.data else None
-            cached_tempo_couleur_aujourdhui = self.data.get('tempo_couleur_aujourdhui') if self.data else None
-
-            self.data = {
-                "contract_power": data['contract_power'],
-                "contract_type": data['contract_type'],
-                "last_refresh_at": None,
-                "tarif_actuel_ttc": None
-            }
-
-            # Restaurer les données du cache
-            if cached_tempo_demain_date:
-                self.data['tempo_demain_date'] = cached_tempo_demain_date
-                self.data['tempo_couleur_demain'] = cached_tempo_couleur_demain
-            if cached_tempo_aujourdhui_date:
-                self.data['tempo_aujourdhui_date'] = cached_tempo_aujourdhui_date
-                self.data['tempo_couleur_aujourdhui'] = cached_tempo_couleur_aujourdhui
-
-        fresh_data_limit = dt_util.now() - timedelta(days=self.config_entry.options.get("refresh_interval", DEFAULT_REFRESH_INTERVAL))
-
-        tarif_needs_update = self.data['last_refresh_at'] is None or self.data['last_refresh_at'] < fresh_data_limit
-
-        self.logger.info('EDF tarif_needs_update '+('yes' if tarif_needs_update else 'no'))
-
-        if tarif_needs_update:
-            if data['contract_type'] == CONTRACT_TYPE_BASE:
-                url = TARIF_BASE_URL
-            elif data['contract_type'] == CONTRACT_TYPE_HPHC:
-                    url = TARIF_HPHC_URL
-            elif data['contract_type'] == CONTRACT_TYPE_TEMPO:
-                    url = TARIF_TEMPO_URL
-
-            response = await self.hass.async_add_executor_job(get_remote_file, url)
-            parsed_content = csv.reader(response.content.decode('utf-8').splitlines(), delimiter=';')
-            rows = list(parsed_content)
-
-            for row in rows:
-                if row[1] == '' and row[2] == data['contract_power']:
-                    if data['contract_type'] == CONTRACT_TYPE_BASE:
-                        self.data['base_fixe_ttc'] = float(row[4].replace(",", "." ))
-                        self.data['base_variable_ttc'] = float(row[6].replace(",", "." ))
-                    elif data['contract_type'] == CONTRACT_TYPE_HPHC:
-                        self.data['hphc_fixe_ttc'] = float(row[4].replace(",", "." ))
-                        self.data['hphc_variable_hc_ttc'] = float(row[6].replace(",", "." ))
-                        self.data['hphc_variable_hp_ttc'] = float(row[8].replace(",", "." ))
-                    elif data['contract_type'] == CONTRACT_TYPE_TEMPO:
-                        self.data['tempo_fixe_ttc'] = float(row[4].replace(",", "." ))
-                        self.data['tempo_variable_hc_bleu_ttc'] = float(row[6].replace(",", "." ))
-                        self.data['tempo_variable_hp_bleu_ttc'] = float(row[8].replace(",", "." ))
-                        self.data['tempo_variable_hc_blanc_ttc'] = float(row[10].replace(",", "." ))
-                        self.data['tempo_variable_hp_blanc_ttc'] = float(row[12].replace(",", "." ))
-                        self.data['tempo_variable_hc_rouge_ttc'] = float(row[14].replace(",", "." ))
-                        self.data['tempo_variable_hp_rouge_ttc'] = float(row[16].replace(",", "." ))
-
-                    self.data['last_refresh_at'] = dt_util.now()
-
-                    break
-            response.close
-
-        if data['contract_type'] == CONTRACT_TYPE_TEMPO:
-            today = dt_util.now().date()
-            yesterday = today - timedelta(days=1)
-            tomorrow = today + timedelta(days=1)
-            today_str = today.strftime('%Y-%m-%d')
-
-            try:
-                tempo_yesterday = await self.get_tempo_day(yesterday)
-                tempo_today = await self.get_tempo_day(today)
-                tempo_tomorrow = await self.get_tempo_day(tomorrow)
-            except Exception as e:
-                self.logger.error(f"Erreur lors de la récupération des couleurs Tempo: {e}")
-                tempo_yesterday = {'codeJour': 0}
-                tempo_today = {'codeJour': 0}
-                tempo_tomorrow = {'codeJour': 0}
-
-            yesterday_color = get_tempo_color_from_code(tempo_yesterday['codeJour'])
-            today_color = get_tempo_color_from_code(tempo_today['codeJour'])
-            tomorrow_color = get_tempo_color_from_code(tempo_tomorrow['codeJour'])
-            tomorrow_str = tomorrow.strftime('%Y-%m-%d')
-
-            # Si la couleur d'aujourd'hui est indéterminée, essayer de la résoudre
-            # depuis les caches (couleur de demain de la veille, ou couleur déjà résolue)
-            if today_color == "indéterminé":
-                # D'abord vérifier si on a déjà résolu la couleur d'aujourd'hui
-                if self.data.get('tempo_aujourdhui_date') == today_str:
-                    cached_today_color = self.data.get('tempo_couleur_aujourdhui')
-                    if cached_today_color and cached_today_color != "indéterminé":
-                        self.logger.info(f"Réutilisation de la couleur d'aujourd'hui déjà résolue: {cached_today_color}")
-                        today_color = cached_today_color
-                # Sinon vérifier la couleur de demain connue la veille
-                elif self.data.get('tempo_demain_date') == today_str:
-                    previous_tomorrow_color = self.data.get('tempo_couleur_demain')
-                    if previous_tomorrow_color and previous_tomorrow_color != "indéterminé":
-                        self.logger.info(f"Réutilisation de la couleur de demain connue la veille: {previous_tomorrow_color}")
-                        today_color = previous_tomorrow_color
-
-            # Si la couleur de demain est indéterminée mais qu'on l'avait déjà
-            # récupérée et qu'elle est valide, on réutilise cette valeur du cache
-            if tomorrow_color == "indéterminé" and self.data.get('tempo_demain_date') == tomorrow_str:
-                cached_tomorrow_color = self.data.get('tempo_couleur_demain')
-                if cached_tomorrow_color and cached_tomorrow_color != "indéterminé":
-                    self.logger.info(f"Réutilisation de la couleur de demain déjà connue: {cached_tomorrow_color}")
-                    tomorrow_color = cached_tomorrow_color
-
-            self.data['tempo_couleur_hier'] = yesterday_color if yesterday_color != "indéterminé" else None
-            # Ne stocker que les couleurs réelles (pas "indéterminé") pour que les capteurs
-            # soient "indisponibles" plutôt que d'afficher une valeur incorrecte
-            self.data['tempo_couleur_aujourdhui'] = today_color if today_color != "indéterminé" else None
-            # Sauvegarder la couleur résolue d'aujourd'hui pour les mises à jour suivantes
-            self.data['tempo_aujourdhui_date'] = today_str
-            self.data['tempo_couleur_demain'] = tomorrow_color if tomorrow_color != "indéterminé" else None
-            # Stocker la date de demain pour pouvoir la réutiliser après minuit
-            self.data['tempo_demain_date'] = tomorrow_str
-
-            # Sauvegarder le cache Tempo sur disque pour survivre aux redémarrages
-            save_cache = False
-            if tomorrow_color != "indéterminé":
-                save_cache = True
-            if today_color != "indéterminé":
-                save_cache = True
-            if save_cache:
-                await self._async_save_tempo_cache()
-            else:
-                self.logger.debug("Cache Tempo non sauvegardé: couleurs indéterminées")
+            errors = await self.engine.async_update_shared_state([self])
+            if self in errors:
+                raise errors[self]
+            data = self._apply_shared_state(dt_util.now())
+            success = True
+            self._changed_keys.add(STATE_KEY_LAST_UPDATE)
+            return data
+        finally:
+            self.record_update((perf_counter() - started) * 1000, success)
+
+    @callback
+    def async_set_shared_state_updated(self, now: datetime, shared_ms: float, error: Exception | None) -> None:
+        """Applique une tournée d'appels réseau faite par le moteur pour tous les coordinators à la fois.
+
+        `shared_ms` est la durée de cette tournée, commune à tous.
+        """
+        started = perf_counter()
+        if error is not None:
+            if self.last_update_success:
+                self.logger.error(f"Erreur lors de la mise à jour de {self.name}: {error}")
+            self.record_update(shared_ms, False)
+            self.async_set_update_error(error)
+            # L'échéance passée doit être remplacée
+            self.async_schedule_next_transition()
+            return
 
-            if dt_util.now().time() >= str_to_time(TEMPO_DAY_START_AT):
+        data = self._apply_shared_state(now)
+        self.last_update_success_time = dt_util.utcnow()
+        self._changed_keys.add(STATE_KEY_LAST_UPDATE)
+        self.record_update(shared_ms + (perf_counter() - started) * 1000, True)
+        self.async_set_updated_data(data)
+
+    def _create_price_timeline(self, horizon: timedelta = PRICE_TIMELINE_HORIZON) -> PriceTimeline:
+        extra_changes = []
+        if self.contract_type == CONTRACT_TYPE_TEMPO:
+            extra_changes.append(TEMPO_DAY_START_TIME)
+        return PriceTimeline(self.off_peak_schedule, self.get_price_at, horizon, extra_changes)
+
+    def get_price_segments(self, now: datetime, until: datetime) -> list[PriceSegment]:
+        """Segments de prix couvrant `now` à `until`, tirés de la chronologie partagée si elle suffit."""
+        self.advance_price_timeline(now)
+        segments = self.price_timeline.segments
+        if segments and segments[-1].end >= until:
+            return segments
+        timeline = self._create_price_timeline(until - now)
+        timeline.rebuild(now)
+        return timeline.segments
+
+    def get_variable_price(self, day: date, period: str | None, color: str | None) -> float | None:
+        """Prix TTC du kWh à une date pour une période et une couleur données."""
+        if self.tarif.table is None:
+            return None
+        return self.tarif.table.price_at(self.contract_power, day, period, color)
+
+    def _update_current_state(self, now: datetime) -> None:
+        """Recalcule la couleur Tempo active et le tarif actuel, sans accès réseau."""
+        self.advance_price_timeline(now)
+
+        tempo = self.data.tempo
+        previous_color, previous_price = tempo.current, self.data.current_price
+        self._compute_current_state(now)
+        if tempo.current != previous_color:
+            self._changed_keys.update(('tempo_couleur', 'tempo_variable_hp_ttc', 'tempo_variable_hc_ttc'))
+        if self.data.current_price != previous_price:
+            self._changed_keys.add('tarif_actuel_ttc')
+
+    def _compute_current_state(self, now: datetime) -> None:
+        contract_type = self.contract_type
+        color = None
+        if contract_type == CONTRACT_TYPE_TEMPO:
+            tempo = self.data.tempo
+            if now.time() >= TEMPO_DAY_START_TIME:
                 self.logger.info("Using today's tempo prices")
-                current_color = today_color
+                color = tempo.today.color
             else:
                 self.logger.info("Using yesterday's tempo prices")
-                current_color = yesterday_color
-
-            if current_color != "indéterminé":
-                self.data['tempo_couleur'] = current_color
-                self.data['tempo_variable_hp_ttc'] = self.data[f"tempo_variable_hp_{current_color}_ttc"]
-                self.data['tempo_variable_hc_ttc'] = self.data[f"tempo_variable_hc_{current_color}_ttc"]
-                self.data['last_refresh_at'] = dt_util.now()
-            else:
-                # Couleur inconnue : vider les clés pour éviter d'afficher des données périmées
-                self.data['tempo_couleur'] = None
-                self.data['tempo_variable_hp_ttc'] = None
-                self.data['tempo_variable_hc_ttc'] = None
-
-            # Initialiser les clés de prévision avec des valeurs par défaut
-            # pour garantir que les capteurs sont toujours disponibles
-            for i in range(TEMPO_FORECAST_DAYS):
-                day_num = i + 1
-                if f'tempo_prevision_j{day_num}_couleur' not in self.data:
-                    self.data[f'tempo_prevision_j{day_num}_couleur'] = 'indéterminé'
-                    self.data[f'tempo_prevision_j{day_num}_probabilite'] = 0
-                    self.data[f'tempo_prevision_j{day_num}_date'] = ''
-
-            # Récupérer les prévisions Tempo (J+1 à J+9)
-            try:
-                forecast_data = await self.get_tempo_forecast()
-                if forecast_data:
-                    for i, forecast in enumerate(forecast_data[:TEMPO_FORECAST_DAYS]):
-                        day_num = i + 1
-                        self.data[f'tempo_prevision_j{day_num}_couleur'] = forecast.get('couleur', 'indéterminé')
-                        self.data[f'tempo_prevision_j{day_num}_probabilite'] = round(forecast.get('probability', 0) * 100)
-                        self.data[f'tempo_prevision_j{day_num}_date'] = forecast.get('date', '')
-                    self.logger.info(f"Prévisions Tempo mises à jour pour {len(forecast_data)} jours")
-                else:
-                    self.logger.warning("Aucune donnée de prévision Tempo récupérée")
-            except Exception as e:
-                self.logger.error(f"Erreur lors du traitement des prévisions Tempo: {e}")
-
-        default_offpeak_hours = None
-        if data['contract_type'] == CONTRACT_TYPE_TEMPO:
-            default_offpeak_hours = TEMPO_OFFPEAK_HOURS
-        off_peak_hours_ranges = self.config_entry.options.get("off_peak_hours_ranges", default_offpeak_hours)
-
-        if data['contract_type'] == CONTRACT_TYPE_BASE:
-            self.data['tarif_actuel_ttc'] = self.data['base_variable_ttc']
-        elif data['contract_type'] in [CONTRACT_TYPE_HPHC, CONTRACT_TYPE_TEMPO] and off_peak_hours_ranges is not None:
-            contract_type_key = 'hphc' if data['contract_type'] == CONTRACT_TYPE_HPHC else 'tempo'
-            tarif_actuel = self.data.get(contract_type_key+'_variable_hp_ttc')
-            if tarif_actuel is None:
-                # Couleur indéterminée ou données tarifaires pas encore chargées
-                return self.data
-            now = dt_util.now().time()
-            for hour_range in off_peak_hours_ranges.split(','):
-                if not re.match(r'([0-1]?[0-9]|2[0-3]):[0-5][0-9]-([0-1]?[0-9]|2[0-3]):[0-5][0-9]', hour_range):
-                    continue
+                color = tempo.yesterday
 
-                hours = hour_range.split('-')
-                start_at = str_to_time(hours[0])
-                end_at = str_to_time(hours[1])
+            # Couleur inconnue : pas de couleur active plutôt qu'une donnée périmée
+            if color is not None and self.data.prices.get('hp', color) is None:
+                color = None
+            tempo.current = color
 
-                if time_in_between(now, start_at, end_at):
-                    tarif_actuel = self.data[contract_type_key+'_variable_hc_ttc']
-                    break
-
-            self.data['tarif_actuel_ttc'] = tarif_actuel
-
-        self.logger.info('EDF Tarif')
-        self.logger.info(self.data)
-
-        return self.data
+        if contract_type == CONTRACT_TYPE_BASE:
+            self.data.current_price = self.data.prices.get()
+        elif contract_type in [CONTRACT_TYPE_HPHC, CONTRACT_TYPE_TEMPO] and self.off_peak_hours_ranges is not None:
+            if self.data.prices.get('hp', color) is None:
+                # Couleur indéterminée ou données tarifaires pas encore chargées
+                return
+            period = 'hc' if self.off_peak_schedule.is_off_peak(now) else 'hp'
+            self.data.current_price = self.data.prices.get(period, color)
+
+    def get_tempo_color(self, day: date) -> tuple[str | None, float | None]:
+        """Couleur Tempo d'un jour : publiée, sinon prévue avec sa probabilité."""
+        return self.engine.get_tempo_color(day)
+
+    def get_price_at(self, when: datetime) -> dict[str, Any]:
+        """Prix TTC du kWh applicable à un instant quelconque, passé ou futur.
+
+        La version tarifaire est retrouvée par date de validité, la couleur
+        dans l'historique Tempo ou, à défaut, dans les prévisions (avec leur
+        probabilité) ; la période HP/HC suit les plages configurées.
+        """
+        contract_type = self.contract_type
+        when = dt_util.as_local(when)
+
+        period = None
+        if contract_type != CONTRACT_TYPE_BASE:
+            period = 'hc' if self.off_peak_schedule.is_off_peak(when) else 'hp'
+
+        color = probability = None
+        if contract_type == CONTRACT_TYPE_TEMPO:
+            color, probability = self.get_tempo_color(get_tempo_billing_day(when))
+
+        price = None
+        if self.tarif.table is not None and (contract_type != CONTRACT_TYPE_TEMPO or color is not None):
+            price = self.tarif.table.price_at(self.contract_power, when.date(), period, color)
+
+        return {'price': price, 'period': period, 'color': color, 'probability': probability}
+
+    def _get_next_transition(self, now: datetime) -> tuple[datetime, bool] | None:
+        """Prochain instant où le tarif change, et s'il nécessite un appel réseau."""
+        contract_type = self.contract_type
+        transitions: list[tuple[time, bool]] = []
+
+        next_transition = None
+        if contract_type in [CONTRACT_TYPE_HPHC, CONTRACT_TYPE_TEMPO]:
+            next_change = self.off_peak_schedule.next_change(now)
+            if next_change is not None:
+                next_transition = (next_change, False)
+
+        if contract_type == CONTRACT_TYPE_TEMPO:
+            transitions.append((TEMPO_DAY_START_TIME, False))
+            # Changement de jour et publication de la couleur de demain
+            transitions.append((time(0, 0), True))
+            transitions.append((str_to_time(TEMPO_TOMRROW_AVAILABLE_AT), True))
+
+        for at, needs_refresh in transitions:
+            when = datetime.combine(now.date(), at, tzinfo=now.tzinfo)
+            if when <= now:
+                when = datetime.combine(now.date() + timedelta(days=1), at, tzinfo=now.tzinfo)
+            if next_transition is None or when < next_transition[0] \
+                    or (when == next_transition[0] and needs_refresh):
+                next_transition = (when, needs_refresh)
+
+        return next_transition
+
+    @callback
+    def async_schedule_next_transition(self) -> None:
+        """Retient le prochain changement de tarif ; le moteur partagé programme le rappel."""
+        self.next_transition = self._get_next_transition(dt_util.now())
+        if self.next_transition is not None:
+            self.logger.debug(f"Prochain changement de tarif programmé à {self.next_transition[0]}")
+        self.engine.async_schedule()
+
+    @callback
+    def async_handle_transition(self, now: datetime) -> None:
+        """Changement de tarif sans appel réseau : basculement HP/HC ou début du jour Tempo."""
+        self._update_current_state(now)
+        self.async_set_updated_data(self.data)
+        self.async_schedule_next_transition()
@@ -0,0 +1,99 @@
+"""Shared tariff dataset cache for the Tarif EDF integration."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import hashlib
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import CACHE_TARIF, DOMAIN, DATASET_CACHE_KEY, ENDPOINT_TARIF
+from .metrics import get_metrics
+from .sources import get_data_source
+from .tarif import TarifTable, parse_tarif_table
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedDataset:
+    """Fichier tarifaire téléchargé, son index et son état de validation HTTP."""
+
+    contract_type: str
+    table: TarifTable | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    digest: str | None = None
+    fetched_at: datetime | None = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class TarifDatasetCache:
+    """Cache des fichiers tarifaires partagé par toutes les entrées.
+
+    Chaque fichier n'est téléchargée qu'une seule fois à la fois, revalidée avec
+    ETag / Last-Modified, et la table indexée est conservée en mémoire. Un
+    fichier dont l'empreinte n'a pas changé n'est pas analysé à nouveau.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the cache."""
+        self.hass = hass
+        self._datasets: dict[str, CachedDataset] = {}
+
+    async def async_get_table(self, contract_type: str, max_age: timedelta) -> TarifTable:
+        """Retourne la table d'un type de contrat, revalidée si plus vieille que `max_age`."""
+        dataset = self._datasets.get(contract_type)
+        if dataset is None:
+            dataset = self._datasets[contract_type] = CachedDataset(contract_type)
+
+        async with dataset.lock:
+            now = dt_util.now()
+            hit = dataset.table is not None and dataset.fetched_at is not None \
+                and now - dataset.fetched_at < max_age
+            get_metrics(self.hass).record_cache(CACHE_TARIF, hit)
+            if hit:
+                _LOGGER.debug(f"Jeu de données servi depuis le cache: {contract_type}")
+                return dataset.table
+
+            headers = {}
+            if dataset.table is not None:
+                if dataset.etag:
+                    headers['If-None-Match'] = dataset.etag
+                if dataset.last_modified:
+                    headers['If-Modified-Since'] = dataset.last_modified
+
+            response = await get_data_source(self.hass).async_get(ENDPOINT_TARIF, contract_type, headers)
+            if response.status == 304 and dataset.table is not None:
+                _LOGGER.debug(f"Jeu de données inchangé (304): {contract_type}")
+                dataset.fetched_at = now
+                return dataset.table
+
+            response.raise_for_status()
+            dataset.etag = response.headers.get('ETag')
+            dataset.last_modified = response.headers.get('Last-Modified')
+            dataset.fetched_at = now
+
+            digest = hashlib.sha256(response.content).hexdigest()
+            if digest == dataset.digest and dataset.table is not None:
+                _LOGGER.debug(f"Jeu de données identique, analyse ignorée: {contract_type}")
+                return dataset.table
+
+            dataset.table = await self.hass.async_add_executor_job(
+                parse_tarif_table, contract_type, response.content
+            )
+            dataset.digest = digest
+            _LOGGER.debug(f"Jeu de données téléchargé et indexé: {contract_type}")
+
+            return dataset.table
+
+
+def get_dataset_cache(hass: HomeAssistant) -> TarifDatasetCache:
+    """Retourne le cache de jeux de données du domaine, en le créant si besoin."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATASET_CACHE_KEY not in domain_data:
+        domain_data[DATASET_CACHE_KEY] = TarifDatasetCache(hass)
+    return domain_data[DATASET_CACHE_KEY]
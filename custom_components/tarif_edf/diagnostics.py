@@ -0,0 +1,44 @@
+"""Diagnostics support for the Tarif EDF integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .metrics import get_metrics
+from .resolver import get_tempo_resolver
+from .sources import get_data_source
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    return {
+        "entry": {
+            "data": dict(entry.data),
+            "options": dict(entry.options),
+        },
+        "coordinator": {
+            "name": coordinator.name,
+            "entries": sorted(coordinator.entry_ids),
+            "last_update_success": coordinator.last_update_success,
+            "last_update_success_time": coordinator.last_update_success_time,
+            "next_transition": None if coordinator.next_transition is None else coordinator.next_transition[0],
+            "off_peak_schedule": coordinator.off_peak_schedule.as_string(),
+            "data": coordinator.data.as_dict(),
+        },
+        "engine": {
+            "coordinators": len(coordinator.engine.coordinators),
+            "entries": len(coordinator.engine.entries),
+            "tarifs": len(coordinator.engine.tarifs),
+            "next_network_refresh": coordinator.engine.next_network_refresh,
+        },
+        "data_source": get_data_source(hass).as_dict(),
+        "tempo_resolver": get_tempo_resolver(hass).as_dict(),
+        "metrics": get_metrics(hass).as_dict(),
+    }
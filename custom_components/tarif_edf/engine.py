@@ -0,0 +1,625 @@
+"""Shared engine driving every Tarif EDF config entry."""
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, timedelta
+import importlib
+import logging
+from time import perf_counter
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CACHE_TEMPO_FORECAST,
+    CACHE_TEMPO_HISTORY,
+    CACHE_TEMPO_STORE,
+    CONTRACT_TYPE_TEMPO,
+    DEFAULT_REFRESH_INTERVAL,
+    DOMAIN,
+    ENDPOINT_TEMPO_DAY,
+    ENDPOINT_TEMPO_FORECAST,
+    ENGINE_KEY,
+    NETWORK_MIN_REFRESH_INTERVAL,
+    NETWORK_REFRESH_INTERVAL,
+    REQUEST_ERROR_BACKOFF_MAX,
+    REQUEST_ERROR_BACKOFF_MIN,
+    TEMPO_CACHE_SAVE_DELAY,
+    TEMPO_COLORS,
+    TEMPO_COLORS_MAPPING,
+    TEMPO_TOMRROW_AVAILABLE_AT,
+    TEMPO_UNDETERMINED_BACKOFF_MAX,
+    TEMPO_UNDETERMINED_BACKOFF_MIN,
+)
+from .coordinator import TarifEdfDataUpdateCoordinator, get_off_peak_hours_ranges, get_tempo_color_from_code
+from .metrics import get_metrics
+from .models import TarifPrices, TarifState, TempoColors, TempoDay
+from .schedule import OffPeakSchedule
+from .storage import TarifEdfStateStore, TarifEdfStore
+from .tempo import TempoHistoryStore, async_get_tempo_history
+
+_LOGGER = logging.getLogger(__name__)
+
+TEMPO_TOMORROW_AVAILABLE_TIME = datetime.strptime(TEMPO_TOMRROW_AVAILABLE_AT, '%H:%M').time()
+# Nombre de coordinators traités avant de rendre la main à la boucle d'événements
+ENGINE_BATCH_SIZE = 20
+# Code réseau et analyse des fichiers, chargés au premier appel réseau
+NETWORK_MODULES = ('api', 'dataset', 'resolver', 'sources')
+
+
+GroupKey = tuple[str, str, str | None]
+
+
+def import_network_modules() -> None:
+    """Importe le code réseau ; exécuté dans l'executor, comme les imports de Home Assistant."""
+    for module in NETWORK_MODULES:
+        importlib.import_module(f"{__package__}.{module}")
+
+
+def get_stored_tempo_day(stored_day: dict[str, Any] | None) -> TempoDay:
+    """Relit une couleur Tempo enregistrée ({date, couleur})."""
+    stored_day = stored_day or {}
+    if not stored_day.get('date'):
+        return TempoDay()
+    return TempoDay(date.fromisoformat(stored_day['date']), stored_day.get('couleur'))
+
+
+class TarifEdfEngine:
+    """Moteur partagé par toutes les entrées du domaine.
+
+    Les couleurs Tempo, les prévisions et les tarifs de chaque couple (type de
+    contrat, puissance) sont résolus et enregistrés une seule fois pour toutes
+    les entrées. Les entrées de même contrat, puissance et plages heures
+    creuses partagent un même coordinator : ce qui dépend des plages (période
+    HP/HC, chronologie des prix) n'est calculé qu'une fois par plage. Un
+    unique rappel, programmé à la plus proche échéance des coordinators,
+    remplace les minuteries de chaque entrée.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the engine."""
+        self.hass = hass
+        self.coordinators: dict[GroupKey, TarifEdfDataUpdateCoordinator] = {}
+        self.entries: dict[str, GroupKey] = {}
+        self.refresh_intervals: dict[str, timedelta] = {}
+        self.tarifs: dict[tuple[str, str], TarifState] = {}
+        self.tempo_history: TempoHistoryStore | None = None
+        # Couleurs d'hier, d'aujourd'hui et de demain ; la couleur active reste propre à chaque coordinator
+        self.tempo = TempoColors()
+        self.forecast: list = []
+        self.forecast_fetched_at: datetime | None = None
+        self.next_network_refresh: datetime | None = None
+        self._tempo_valid_until: datetime | None = None
+        self._tempo_lock = asyncio.Lock()
+        self._forecast_lock = asyncio.Lock()
+        self._run_lock = asyncio.Lock()
+        self._acquire_lock = asyncio.Lock()
+        self._import_lock = asyncio.Lock()
+        self._network_modules_loaded = False
+        self._store = TarifEdfStateStore(hass)
+        self._store_loaded = False
+        self._stored_tarifs: dict[str, dict[str, Any]] = {}
+        self._persisted: dict[str, Any] | None = None
+        self._store_save_pending = False
+        self._unsub_wake: CALLBACK_TYPE | None = None
+        self._reschedule_pending = False
+
+    async def async_acquire(self, entry: ConfigEntry) -> TarifEdfDataUpdateCoordinator:
+        """Rattache une entrée au coordinator de son contrat, sa puissance et ses plages heures creuses.
+
+        Le coordinator et les tarifs sont créés à la première entrée qui en a
+        besoin, depuis l'état enregistré s'il existe.
+        """
+        contract_type = entry.data['contract_type']
+        power = entry.data['contract_power']
+        async with self._acquire_lock:
+            await self._async_load_store(entry)
+
+            tarif = self.tarifs.get((contract_type, power))
+            if tarif is None:
+                stored = self._stored_tarifs.get(f"{contract_type}/{power}")
+                if stored:
+                    tarif = TarifState.from_dict(contract_type, power, stored)
+                else:
+                    tarif = TarifState(contract_type, power)
+                self.tarifs[(contract_type, power)] = tarif
+
+            if contract_type == CONTRACT_TYPE_TEMPO and self.tempo_history is None:
+                # Historique lu sur disque ; hier, aujourd'hui et demain sont recalculés
+                # pour le cas où l'état enregistré date d'un autre jour
+                self.tempo_history = await async_get_tempo_history(self.hass)
+                self._restore_tempo_days(dt_util.now())
+
+        off_peak_hours_ranges = get_off_peak_hours_ranges(contract_type, entry.options)
+        schedule = OffPeakSchedule.parse(off_peak_hours_ranges, strict=False)
+        # Les plages sont comparées sous leur forme normalisée
+        key = (contract_type, power, None if off_peak_hours_ranges is None else schedule.as_string())
+        coordinator = self.coordinators.get(key)
+        if coordinator is None:
+            coordinator = self.coordinators[key] = TarifEdfDataUpdateCoordinator(
+                self.hass, self, tarif, off_peak_hours_ranges
+            )
+        coordinator.entry_ids.add(entry.entry_id)
+        self.entries[entry.entry_id] = key
+        self.refresh_intervals[entry.entry_id] = timedelta(
+            days=entry.options.get("refresh_interval", DEFAULT_REFRESH_INTERVAL)
+        )
+        self.async_schedule()
+        return coordinator
+
+    @callback
+    def async_release(self, entry_id: str) -> None:
+        """Détache une entrée ; un coordinator ou des tarifs qui ne servent plus sont abandonnés."""
+        key = self.entries.pop(entry_id, None)
+        self.refresh_intervals.pop(entry_id, None)
+        if key is None:
+            return
+        coordinator = self.coordinators[key]
+        coordinator.entry_ids.discard(entry_id)
+        if not coordinator.entry_ids:
+            del self.coordinators[key]
+            coordinator.next_transition = None
+        contract_type, power, _ = key
+        if not any(other[:2] == (contract_type, power) for other in self.coordinators):
+            self.tarifs.pop((contract_type, power), None)
+            self._stored_tarifs.pop(f"{contract_type}/{power}", None)
+        self.async_schedule()
+
+    def get_refresh_interval(self) -> timedelta:
+        """Ancienneté maximale des tarifs : la plus courte demandée par les entrées."""
+        return min(self.refresh_intervals.values(), default=timedelta(days=DEFAULT_REFRESH_INTERVAL))
+
+    async def _async_load_store(self, entry: ConfigEntry) -> None:
+        """Charge l'état partagé enregistré ; à défaut, reprend l'ancien stockage de l'entrée."""
+        if self._store_loaded:
+            return
+
+        stored_data = await self._store.async_load()
+        if not stored_data:
+            stored_data = await self._async_migrate_entry_store(entry)
+        if stored_data:
+            _LOGGER.info("Chargement de l'état partagé depuis le stockage persistant")
+            stored_tempo = stored_data.get('tempo') or {}
+            self.tempo.today = get_stored_tempo_day(stored_tempo.get('aujourdhui'))
+            self.tempo.tomorrow = get_stored_tempo_day(stored_tempo.get('demain'))
+            if stored_data.get('forecast_fetched_at'):
+                self.forecast = stored_data.get('forecast') or []
+                self.forecast_fetched_at = dt_util.parse_datetime(stored_data['forecast_fetched_at'])
+            self._stored_tarifs = dict(stored_data.get('tarifs') or {})
+        self._persisted = self._get_store_data()
+        self._store_loaded = True
+
+    async def _async_migrate_entry_store(self, entry: ConfigEntry) -> dict[str, Any] | None:
+        """Convertit l'ancien stockage par entrée (cache Tempo et dernier état) en état partagé."""
+        stored_data = await TarifEdfStore(self.hass, entry.entry_id).async_load()
+        if not stored_data:
+            return None
+
+        _LOGGER.info(f"Reprise du stockage de l'entrée {entry.entry_id} dans l'état partagé")
+        snapshot = stored_data.get('snapshot') or {}
+        data = {
+            'tempo': {'aujourdhui': stored_data.get('aujourdhui'), 'demain': stored_data.get('demain')},
+            'forecast': snapshot.get('forecast') or [],
+            'forecast_fetched_at': snapshot.get('forecast_fetched_at'),
+            'tarifs': {},
+        }
+        if snapshot.get('versions') and snapshot.get('data'):
+            key = f"{entry.data['contract_type']}/{entry.data['contract_power']}"
+            data['tarifs'][key] = {
+                'last_refresh_at': snapshot['data'].get('last_refresh_at'),
+                'versions': snapshot['versions'],
+            }
+        return data
+
+    def _get_store_data(self) -> dict[str, Any]:
+        """État partagé sérialisable : couleurs Tempo, prévisions et tarifs de chaque contrat et puissance."""
+        tarifs = dict(self._stored_tarifs)
+        for (contract_type, power), tarif in self.tarifs.items():
+            if tarif.table is not None:
+                tarifs[f"{contract_type}/{power}"] = tarif.as_dict()
+        return {
+            'tempo': {
+                key: {
+                    'date': None if tempo_day.day is None else tempo_day.day.isoformat(),
+                    'couleur': tempo_day.color,
+                }
+                for key, tempo_day in (('aujourdhui', self.tempo.today), ('demain', self.tempo.tomorrow))
+            },
+            'forecast': self.forecast,
+            'forecast_fetched_at': None if self.forecast_fetched_at is None else self.forecast_fetched_at.isoformat(),
+            'tarifs': tarifs,
+        }
+
+    @callback
+    def _schedule_store_save(self) -> None:
+        """Programme la sauvegarde de l'état partagé, uniquement s'il a changé."""
+        data = self._get_store_data()
+        if data == self._persisted:
+            return
+
+        self._persisted = data
+        self._store_save_pending = True
+        # Les écritures rapprochées sont regroupées en une seule
+        self._store.async_delay_save(self._data_to_save, TEMPO_CACHE_SAVE_DELAY)
+
+    def _data_to_save(self) -> dict[str, Any]:
+        self._store_save_pending = False
+        return self._persisted
+
+    async def async_flush_store(self) -> None:
+        """Écrit immédiatement une sauvegarde en attente (déchargement d'une entrée)."""
+        if self._store_save_pending:
+            await self._store.async_save(self._data_to_save())
+
+    def _restore_tempo_days(self, now: datetime) -> None:
+        published = []
+        for offset in (-1, 0, 1):
+            day = now.date() + timedelta(days=offset)
+            color, probability = self.get_tempo_color(day)
+            published.append((day, color if probability is None else None))
+        (_, yesterday), today, tomorrow = published
+        self.tempo.yesterday = yesterday
+        self.tempo.today = TempoDay(*today)
+        self.tempo.tomorrow = TempoDay(*tomorrow)
+
+    def get_tempo_color(self, day: date) -> tuple[str | None, float | None]:
+        """Couleur Tempo d'un jour : publiée, sinon prévue avec sa probabilité."""
+        if self.tempo_history is not None:
+            code = self.tempo_history.get(day)
+            if code:
+                return get_tempo_color_from_code(code), None
+
+        # Couleurs restaurées depuis le stockage persistant, absentes de l'historique
+        color = self.tempo.today.color_on(day) or self.tempo.tomorrow.color_on(day)
+        if color is not None:
+            return color, None
+
+        day_str = day.strftime('%Y-%m-%d')
+
+        for forecast in self.forecast:
+            if forecast.get('date') == day_str and forecast.get('couleur') in TEMPO_COLORS:
+                return forecast['couleur'], forecast.get('probability')
+
+        return None, None
+
+    async def async_load_network_modules(self) -> None:
+        """Charge le code réseau hors de la boucle d'événements, avant le premier appel réseau.
+
+        Les imports locaux qui suivent ne font plus que relire les modules déjà chargés.
+        """
+        async with self._import_lock:
+            if not self._network_modules_loaded:
+                await self.hass.async_add_executor_job(import_network_modules)
+                self._network_modules_loaded = True
+
+    async def async_update_shared_state(
+        self, coordinators: list[TarifEdfDataUpdateCoordinator]
+    ) -> dict[TarifEdfDataUpdateCoordinator, Exception]:
+        """Met à jour, une seule fois, l'état partagé dont dépendent ces coordinators.
+
+        Les tarifs de chaque couple (type de contrat, puissance) sont mis à
+        jour en parallèle ; les couleurs et prévisions Tempo ne le sont que si
+        un coordinator Tempo en dépend. Retourne l'erreur de chaque
+        coordinator dont l'état n'a pas pu être mis à jour.
+        """
+        await self.async_load_network_modules()
+        tarifs = list({
+            (coordinator.contract_type, coordinator.contract_power): coordinator.tarif
+            for coordinator in coordinators
+        }.values())
+        results = await asyncio.gather(
+            *(self._async_update_tarif(tarif) for tarif in tarifs), return_exceptions=True
+        )
+        errors_by_tarif = {
+            (tarif.contract_type, tarif.power): result
+            for tarif, result in zip(tarifs, results)
+            if isinstance(result, Exception)
+        }
+
+        tempo_error = None
+        if any(coordinator.contract_type == CONTRACT_TYPE_TEMPO for coordinator in coordinators):
+            try:
+                if self.tempo_history is None:
+                    self.tempo_history = await async_get_tempo_history(self.hass)
+                # Couleurs résolues une seule fois pour tous les coordinators Tempo
+                await self.async_get_tempo()
+
+                # Récupérer les prévisions Tempo (J+1 à J+9)
+                forecast_data = await self.async_get_forecast()
+                if forecast_data:
+                    _LOGGER.info(f"Prévisions Tempo mises à jour pour {len(forecast_data)} jours")
+                else:
+                    _LOGGER.warning("Aucune donnée de prévision Tempo récupérée")
+            except Exception as err:
+                tempo_error = err
+
+        # Sauvegarder l'état partagé sur disque pour survivre aux redémarrages
+        self._schedule_store_save()
+
+        errors = {}
+        for coordinator in coordinators:
+            error = errors_by_tarif.get((coordinator.contract_type, coordinator.contract_power))
+            if error is None and coordinator.contract_type == CONTRACT_TYPE_TEMPO:
+                error = tempo_error
+            if error is not None:
+                errors[coordinator] = error
+        return errors
+
+    async def _async_update_tarif(self, tarif: TarifState) -> None:
+        refresh_interval = self.get_refresh_interval()
+        fresh_data_limit = dt_util.now() - refresh_interval
+        tarif_needs_update = tarif.last_refresh_at is None or tarif.last_refresh_at < fresh_data_limit
+
+        _LOGGER.info(f"EDF tarif_needs_update {tarif.contract_type} {tarif.power}kVA "
+                     + ('yes' if tarif_needs_update else 'no'))
+        if not tarif_needs_update:
+            return
+
+        from .dataset import get_dataset_cache
+
+        table = await get_dataset_cache(self.hass).async_get_table(tarif.contract_type, refresh_interval)
+        version = table.current(tarif.power)
+        tarif.table = table
+        if version is not None:
+            # Prix partagés par toutes les entrées de même contrat et puissance
+            tarif.prices = TarifPrices.from_dict(tarif.contract_type, version.prices)
+            tarif.last_refresh_at = dt_util.now()
+
+    async def async_get_tempo(self) -> TempoColors:
+        """Couleurs Tempo d'hier, d'aujourd'hui et de demain, résolues une fois pour toutes les entrées.
+
+        Le résultat est réutilisé jusqu'au prochain appel réseau programmé.
+        """
+        async with self._tempo_lock:
+            now = dt_util.now()
+            if self._tempo_valid_until is not None and now < self._tempo_valid_until \
+                    and self.tempo.today.day == now.date():
+                return self.tempo
+
+            await self._async_update_tempo(now)
+            self._tempo_valid_until = self.next_network_refresh = now + self._get_network_refresh_interval(now)
+            self.async_schedule()
+            return self.tempo
+
+    async def _async_update_tempo(self, now: datetime) -> None:
+        today = now.date()
+        yesterday = today - timedelta(days=1)
+        tomorrow = today + timedelta(days=1)
+
+        # Premier démarrage : récupérer en bloc les couleurs des saisons courante et précédente
+        history = await async_get_tempo_history(self.hass)
+        await history.async_backfill()
+
+        # Les trois jours sont demandés en parallèle ; l'échec de l'un n'affecte pas les autres
+        days = (yesterday, today, tomorrow)
+        results = await asyncio.gather(
+            *(self.async_get_tempo_day(history, day) for day in days), return_exceptions=True
+        )
+        for day, result in zip(days, results):
+            if isinstance(result, BaseException):
+                _LOGGER.error(f"Erreur lors de la récupération de la couleur Tempo du {day}: {result}")
+        # Ne garder que les couleurs réelles (pas "indéterminé") pour que les capteurs
+        # soient "indisponibles" plutôt que d'afficher une valeur incorrecte
+        codes = [0 if isinstance(result, BaseException) else result.get('codeJour', 0) for result in results]
+        yesterday_color, today_color, tomorrow_color = (
+            TEMPO_COLORS_MAPPING[code] if code in [1, 2, 3] else None
+            for code in codes
+        )
+
+        tempo = self.tempo
+        # Si la couleur d'aujourd'hui est indéterminée, essayer de la résoudre
+        # depuis les caches (couleur déjà résolue, ou couleur de demain de la veille)
+        if today_color is None:
+            today_color = tempo.today.color_on(today) or tempo.tomorrow.color_on(today)
+            if today_color is not None:
+                _LOGGER.info(f"Réutilisation de la couleur d'aujourd'hui déjà connue: {today_color}")
+
+        # Si la couleur de demain est indéterminée mais qu'on l'avait déjà
+        # récupérée, on réutilise cette valeur du cache
+        if tomorrow_color is None:
+            tomorrow_color = tempo.tomorrow.color_on(tomorrow)
+            if tomorrow_color is not None:
+                _LOGGER.info(f"Réutilisation de la couleur de demain déjà connue: {tomorrow_color}")
+
+        metrics = get_metrics(self.hass)
+        if codes[1] == 0:
+            metrics.record_cache(CACHE_TEMPO_STORE, today_color is not None)
+        if codes[2] == 0:
+            metrics.record_cache(CACHE_TEMPO_STORE, tomorrow_color is not None)
+
+        tempo.yesterday = yesterday_color
+        # Les dates sont conservées pour réutiliser ces couleurs après minuit
+        tempo.today = TempoDay(today, today_color)
+        tempo.tomorrow = TempoDay(tomorrow, tomorrow_color)
+
+    async def async_get_tempo_day(self, history: TempoHistoryStore, day: date) -> dict[str, Any]:
+        from .api import get_request_backoff
+        from .resolver import get_tempo_resolver
+
+        date_str = day.strftime('%Y-%m-%d')
+
+        # Couleur déjà connue dans l'historique : aucune requête
+        code = history.get(day)
+        get_metrics(self.hass).record_cache(CACHE_TEMPO_HISTORY, code != 0)
+        if code:
+            return {'dateJour': date_str, 'codeJour': code}
+
+        now = dt_util.now()
+        backoff = get_request_backoff(self.hass)
+        if not backoff.is_allowed(ENDPOINT_TEMPO_DAY, date_str, now):
+            # Couleur indéterminée ou en échec récemment : on attend la prochaine tentative
+            return {'dateJour': date_str, 'codeJour': 0}
+
+        # Premier fournisseur à donner une couleur définitive, les autres en relance
+        try:
+            code = await get_tempo_resolver(self.hass).async_resolve(day)
+        except Exception:
+            backoff.defer(ENDPOINT_TEMPO_DAY, date_str, now, REQUEST_ERROR_BACKOFF_MIN, REQUEST_ERROR_BACKOFF_MAX)
+            raise
+
+        if code in [1, 2, 3]:
+            history.set(day, code)
+            backoff.reset(ENDPOINT_TEMPO_DAY, date_str)
+            return {'dateJour': date_str, 'codeJour': code}
+
+        # La couleur d'un jour est publiée la veille à TEMPO_TOMRROW_AVAILABLE_AT
+        published_at = datetime.combine(day - timedelta(days=1), TEMPO_TOMORROW_AVAILABLE_TIME, tzinfo=now.tzinfo)
+        if now < published_at:
+            backoff.defer_until(ENDPOINT_TEMPO_DAY, date_str, published_at)
+        else:
+            retry_at = backoff.defer(
+                ENDPOINT_TEMPO_DAY, date_str, now, TEMPO_UNDETERMINED_BACKOFF_MIN, TEMPO_UNDETERMINED_BACKOFF_MAX
+            )
+            _LOGGER.debug(f"Couleur Tempo du {date_str} indéterminée, nouvelle tentative à {retry_at}")
+
+        return {'dateJour': date_str, 'codeJour': 0}
+
+    async def async_get_forecast(self) -> list:
+        """Récupère les prévisions Tempo depuis open-dpe.fr (mis en cache 1h, pour toutes les entrées)."""
+        async with self._forecast_lock:
+            now = dt_util.now()
+            hit = bool(self.forecast) and self.forecast_fetched_at is not None and \
+                (now - self.forecast_fetched_at).total_seconds() < 3600
+            get_metrics(self.hass).record_cache(CACHE_TEMPO_FORECAST, hit)
+            if hit:
+                return self.forecast
+
+            from .sources import async_get_shared
+
+            try:
+                response = await async_get_shared(self.hass, ENDPOINT_TEMPO_FORECAST)
+                if response.status == 200:
+                    forecast_data = response.json()
+                    if not isinstance(forecast_data, list):
+                        _LOGGER.warning(
+                            f"Réponse prévisions Tempo inattendue (type={type(forecast_data).__name__})"
+                        )
+                        return []
+                    _LOGGER.debug(f"Prévisions Tempo récupérées: {len(forecast_data)} jours")
+                    self.forecast = forecast_data
+                    self.forecast_fetched_at = now
+                    return forecast_data
+                else:
+                    _LOGGER.warning(
+                        f"Erreur lors de la récupération des prévisions Tempo: {response.status}"
+                    )
+                    return self.forecast or []
+            except Exception as e:
+                _LOGGER.error(f"Exception lors de la récupération des prévisions Tempo: {e}")
+                return self.forecast or []
+
+    def _get_network_refresh_interval(self, now: datetime) -> timedelta:
+        """Cadence des appels réseau, commune à toutes les entrées."""
+        interval = NETWORK_REFRESH_INTERVAL
+        if not any(coordinator.contract_type == CONTRACT_TYPE_TEMPO for coordinator in self.coordinators.values()):
+            return interval
+        if not self._network_modules_loaded:
+            # Aucun appel réseau n'a encore été fait : aucune nouvelle tentative n'est programmée
+            return interval
+
+        from .api import get_request_backoff
+
+        # Se réveiller pour la prochaine tentative programmée sur une couleur manquante
+        backoff = get_request_backoff(self.hass)
+        tempo = self.tempo
+        for offset, color in ((-1, tempo.yesterday), (0, tempo.today.color), (1, tempo.tomorrow.color)):
+            if color is not None:
+                continue
+            day = now.date() + timedelta(days=offset)
+            retry_at = backoff.retry_at(ENDPOINT_TEMPO_DAY, day.strftime('%Y-%m-%d'))
+            if retry_at is not None:
+                interval = min(interval, max(retry_at - now, NETWORK_MIN_REFRESH_INTERVAL))
+        return interval
+
+    @callback
+    def async_schedule(self) -> None:
+        """Reprogramme le rappel du moteur ; les demandes rapprochées sont regroupées."""
+        if self._reschedule_pending:
+            return
+        self._reschedule_pending = True
+        self.hass.loop.call_soon(self._async_reschedule)
+
+    @callback
+    def _async_reschedule(self) -> None:
+        self._reschedule_pending = False
+        if self._unsub_wake is not None:
+            self._unsub_wake()
+            self._unsub_wake = None
+        if not self.coordinators:
+            return
+
+        now = dt_util.now()
+        if self.next_network_refresh is None:
+            self.next_network_refresh = now + self._get_network_refresh_interval(now)
+        wake = self.next_network_refresh
+        for coordinator in self.coordinators.values():
+            if coordinator.next_transition is not None:
+                wake = min(wake, coordinator.next_transition[0])
+
+        _LOGGER.debug(f"Prochaine échéance du moteur à {wake} ({len(self.coordinators)} entrée(s))")
+        self._unsub_wake = async_track_point_in_time(self.hass, self._handle_wake, wake)
+
+    @callback
+    def _handle_wake(self, point_in_time: datetime) -> None:
+        self._unsub_wake = None
+        self.hass.async_create_background_task(
+            self.async_run(dt_util.as_local(point_in_time)), f"{DOMAIN} engine"
+        )
+
+    @callback
+    def async_request_refresh(self) -> None:
+        """Avance la prochaine tournée d'appels réseau à maintenant (démarrage depuis l'état enregistré)."""
+        self._tempo_valid_until = None
+        self.next_network_refresh = dt_util.now()
+        self.async_schedule()
+
+    async def _async_refresh(self, coordinators: list[TarifEdfDataUpdateCoordinator], now: datetime) -> None:
+        """Met à jour l'état partagé une seule fois, puis le diffuse à chaque coordinator."""
+        started = perf_counter()
+        errors = await self.async_update_shared_state(coordinators)
+        shared_ms = (perf_counter() - started) * 1000
+        for index, coordinator in enumerate(coordinators, start=1):
+            coordinator.async_set_shared_state_updated(now, shared_ms, errors.get(coordinator))
+            if index % ENGINE_BATCH_SIZE == 0:
+                await asyncio.sleep(0)
+
+    async def async_run(self, now: datetime) -> None:
+        """Traite les échéances atteintes à `now`.
+
+        Si une échéance demande un appel réseau, l'état partagé est mis à
+        jour une fois pour tous les coordinators concernés, qui ne font
+        ensuite que l'appliquer. Les autres changements de tarif sont
+        appliqués sans accès réseau. La boucle d'événements est rendue
+        régulièrement.
+        """
+        async with self._run_lock:
+            network_due = self.next_network_refresh is not None and now >= self.next_network_refresh
+            to_refresh = []
+            for index, coordinator in enumerate(list(self.coordinators.values()), start=1):
+                transition = coordinator.next_transition
+                due = transition is not None and transition[0] <= now
+                if network_due or (due and transition[1]):
+                    to_refresh.append(coordinator)
+                elif due:
+                    coordinator.async_handle_transition(now)
+                if index % ENGINE_BATCH_SIZE == 0:
+                    await asyncio.sleep(0)
+
+            if to_refresh:
+                # Nouvelle tournée d'appels réseau : l'état partagé est résolu à nouveau
+                self._tempo_valid_until = None
+                self.next_network_refresh = None
+                await self._async_refresh(to_refresh, now)
+
+            self.async_schedule()
+
+
+def get_engine(hass: HomeAssistant) -> TarifEdfEngine:
+    """Retourne le moteur du domaine, en le créant si besoin."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if ENGINE_KEY not in domain_data:
+        domain_data[ENGINE_KEY] = TarifEdfEngine(hass)
+    return domain_data[ENGINE_KEY]
@@ -0,0 +1,154 @@
+"""Runtime metrics for the Tarif EDF integration."""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, METRICS_KEY
+
+
+@dataclass
+class EndpointMetrics:
+    """Compteurs d'un point d'accès distant."""
+
+    requests: int = 0
+    errors: int = 0
+    not_modified: int = 0
+    last_status: int | None = None
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data['mean_ms'] = round(self.total_ms / self.requests, 1) if self.requests else None
+        data['total_ms'] = round(self.total_ms, 1)
+        data['max_ms'] = round(self.max_ms, 1)
+        return data
+
+
+@dataclass
+class CacheMetrics:
+    """Succès et échecs d'un cache."""
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float | None:
+        total = self.hits + self.misses
+        return round(self.hits / total, 3) if total else None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {'hits': self.hits, 'misses': self.misses, 'hit_ratio': self.hit_ratio}
+
+
+@dataclass
+class ProviderMetrics:
+    """Réponses d'un fournisseur de couleurs Tempo.
+
+    `hedged` compte les requêtes lancées parce qu'un fournisseur précédent
+    dépassait le délai de relance ; `agreements` et `disagreements` comparent
+    ses couleurs à celle retenue, y compris lorsqu'il répond après le
+    gagnant avec `tempo_hedge_compare` ; `cancelled` compte les requêtes
+    annulées après la victoire d'un autre fournisseur ou faute de réponse
+    dans le délai de comparaison.
+    """
+
+    requests: int = 0
+    hedged: int = 0
+    wins: int = 0
+    definitive: int = 0
+    undetermined: int = 0
+    errors: int = 0
+    cancelled: int = 0
+    agreements: int = 0
+    disagreements: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        answered = self.definitive + self.undetermined + self.errors
+        data['mean_ms'] = round(self.total_ms / answered, 1) if answered else None
+        data['total_ms'] = round(self.total_ms, 1)
+        data['max_ms'] = round(self.max_ms, 1)
+        return data
+
+
+@dataclass
+class UpdateMetrics:
+    """Durées des mises à jour d'une entrée."""
+
+    count: int = 0
+    failures: int = 0
+    last_ms: float | None = None
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'count': self.count,
+            'failures': self.failures,
+            'last_ms': None if self.last_ms is None else round(self.last_ms, 1),
+            'mean_ms': round(self.total_ms / self.count, 1) if self.count else None,
+            'max_ms': round(self.max_ms, 1),
+        }
+
+
+class TarifEdfMetrics:
+    """Compteurs partagés par toutes les entrées : requêtes, caches et mises à jour."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.endpoints: dict[str, EndpointMetrics] = {}
+        self.caches: dict[str, CacheMetrics] = {}
+        self.providers: dict[str, ProviderMetrics] = {}
+        self.updates: dict[str, UpdateMetrics] = {}
+
+    def record_request(self, endpoint: str, duration_ms: float, status: int | None) -> None:
+        metrics = self.endpoints.setdefault(endpoint, EndpointMetrics())
+        metrics.requests += 1
+        metrics.total_ms += duration_ms
+        metrics.max_ms = max(metrics.max_ms, duration_ms)
+        metrics.last_status = status
+        if status is None or status >= 400:
+            metrics.errors += 1
+        elif status == 304:
+            metrics.not_modified += 1
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        metrics = self.caches.setdefault(cache, CacheMetrics())
+        if hit:
+            metrics.hits += 1
+        else:
+            metrics.misses += 1
+
+    def provider(self, name: str) -> ProviderMetrics:
+        return self.providers.setdefault(name, ProviderMetrics())
+
+    def record_update(self, name: str, duration_ms: float, success: bool) -> None:
+        metrics = self.updates.setdefault(name, UpdateMetrics())
+        metrics.count += 1
+        metrics.last_ms = duration_ms
+        metrics.total_ms += duration_ms
+        metrics.max_ms = max(metrics.max_ms, duration_ms)
+        if not success:
+            metrics.failures += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'endpoints': {name: metrics.as_dict() for name, metrics in self.endpoints.items()},
+            'caches': {name: metrics.as_dict() for name, metrics in self.caches.items()},
+            'providers': {name: metrics.as_dict() for name, metrics in self.providers.items()},
+            'updates': {name: metrics.as_dict() for name, metrics in self.updates.items()},
+        }
+
+
+def get_metrics(hass: HomeAssistant) -> TarifEdfMetrics:
+    """Retourne les compteurs du domaine, en les créant si besoin."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if METRICS_KEY not in domain_data:
+        domain_data[METRICS_KEY] = TarifEdfMetrics()
+    return domain_data[METRICS_KEY]
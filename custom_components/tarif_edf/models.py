@@ -0,0 +1,188 @@
+"""Data model for the Tarif EDF integration."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONTRACT_TYPE_BASE,
+    CONTRACT_TYPE_TEMPO,
+    TEMPO_COLORS,
+    TEMPO_FORECAST_DAYS,
+)
+from .tarif import TarifTable, TarifVersion, get_variable_price_key
+
+
+# Clés à plat (couleur, probabilité, date) de chaque jour de prévision
+FORECAST_KEYS = tuple(
+    (f'tempo_prevision_j{number}_couleur', f'tempo_prevision_j{number}_probabilite', f'tempo_prevision_j{number}_date')
+    for number in range(1, TEMPO_FORECAST_DAYS + 1)
+)
+
+
+def get_price_indexes(contract_type: str) -> list[tuple[str | None, str | None]]:
+    """Couples (période, couleur) tarifés pour un type de contrat."""
+    periods = (None,) if contract_type == CONTRACT_TYPE_BASE else ('hc', 'hp')
+    colors = TEMPO_COLORS if contract_type == CONTRACT_TYPE_TEMPO else (None,)
+    return [(period, color) for color in colors for period in periods]
+
+
+@dataclass(slots=True)
+class TarifPrices:
+    """Prix TTC en vigueur, le prix du kWh étant indexé par période et couleur."""
+
+    subscription: float | None = None
+    variable: dict[tuple[str | None, str | None], float] = field(default_factory=dict)
+
+    def get(self, period: str | None = None, color: str | None = None) -> float | None:
+        return self.variable.get((period, color))
+
+    @classmethod
+    def from_dict(cls, contract_type: str, prices: dict[str, Any]) -> TarifPrices:
+        """Construit l'index depuis les clés des fichiers data.gouv (`tempo_variable_hp_bleu_ttc`...)."""
+        variable = {}
+        for period, color in get_price_indexes(contract_type):
+            price = prices.get(get_variable_price_key(contract_type, period, color))
+            if price is not None:
+                variable[(period, color)] = price
+        return cls(prices.get(f"{contract_type}_fixe_ttc"), variable)
+
+    def as_dict(self, contract_type: str) -> dict[str, float | None]:
+        prices = {f"{contract_type}_fixe_ttc": self.subscription}
+        for period, color in get_price_indexes(contract_type):
+            prices[get_variable_price_key(contract_type, period, color)] = self.get(period, color)
+        return prices
+
+
+@dataclass(slots=True)
+class TarifState:
+    """Tarifs d'un couple (type de contrat, puissance), partagés par toutes les entrées correspondantes."""
+
+    contract_type: str
+    power: str
+    table: TarifTable | None = None
+    prices: TarifPrices = field(default_factory=TarifPrices)
+    last_refresh_at: datetime | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Forme sérialisable : versions de la puissance et date de mise à jour."""
+        return {
+            'last_refresh_at': None if self.last_refresh_at is None else self.last_refresh_at.isoformat(),
+            'versions': [] if self.table is None else [
+                {
+                    'start': version.start.isoformat(),
+                    'end': None if version.end is None else version.end.isoformat(),
+                    'prices': version.prices,
+                }
+                for version in self.table.versions(self.power)
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, contract_type: str, power: str, data: dict[str, Any]) -> TarifState:
+        """Relit la forme produite par `as_dict` ; les prix sont ceux de la version en vigueur."""
+        state = cls(contract_type, power)
+        if data.get('last_refresh_at'):
+            state.last_refresh_at = dt_util.parse_datetime(data['last_refresh_at'])
+        if data.get('versions'):
+            state.table = TarifTable(contract_type, [
+                TarifVersion(
+                    power,
+                    date.fromisoformat(version['start']),
+                    None if version['end'] is None else date.fromisoformat(version['end']),
+                    version['prices'],
+                )
+                for version in data['versions']
+            ])
+            version = state.table.current(power)
+            if version is not None:
+                state.prices = TarifPrices.from_dict(contract_type, version.prices)
+        return state
+
+
+@dataclass(slots=True)
+class TempoDay:
+    """Couleur Tempo connue pour un jour donné."""
+
+    day: date | None = None
+    color: str | None = None
+
+    def color_on(self, day: date) -> str | None:
+        return self.color if self.day == day else None
+
+
+@dataclass(slots=True)
+class TempoColors:
+    """Couleurs Tempo d'hier, d'aujourd'hui et de demain, et couleur facturée en ce moment."""
+
+    yesterday: str | None = None
+    today: TempoDay = field(default_factory=TempoDay)
+    tomorrow: TempoDay = field(default_factory=TempoDay)
+    current: str | None = None
+
+
+@dataclass(slots=True)
+class ForecastDay:
+    """Couleur Tempo prévue pour un jour, avec sa probabilité en pourcentage."""
+
+    date: str = ''
+    color: str = 'indéterminé'
+    probability: int = 0
+
+
+@dataclass(slots=True)
+class TarifEdfData:
+    """État observé par les capteurs : prix en vigueur, couleurs Tempo et prévisions."""
+
+    contract_type: str
+    contract_power: str
+    last_refresh_at: datetime | None = None
+    prices: TarifPrices = field(default_factory=TarifPrices)
+    tempo: TempoColors = field(default_factory=TempoColors)
+    forecast: tuple[ForecastDay, ...] = field(
+        default_factory=lambda: tuple(ForecastDay() for _ in range(TEMPO_FORECAST_DAYS))
+    )
+    current_price: float | None = None
+
+    def get_current_tempo_price(self, period: str) -> float | None:
+        """Prix du kWh de la couleur actuellement facturée."""
+        if self.tempo.current is None:
+            return None
+        return self.prices.get(period, self.tempo.current)
+
+    def get_price_keys(self) -> list[str]:
+        """Clés à plat dont la valeur dépend des prix en vigueur."""
+        keys = list(self.prices.as_dict(self.contract_type))
+        if self.contract_type == CONTRACT_TYPE_TEMPO:
+            keys.extend(('tempo_variable_hp_ttc', 'tempo_variable_hc_ttc'))
+        return keys
+
+    def as_dict(self) -> dict[str, Any]:
+        """Forme à plat et sérialisable, utilisée par les diagnostics."""
+        data: dict[str, Any] = {
+            'contract_power': self.contract_power,
+            'contract_type': self.contract_type,
+            'last_refresh_at': None if self.last_refresh_at is None else self.last_refresh_at.isoformat(),
+            'tarif_actuel_ttc': self.current_price,
+        }
+        if self.prices.variable:
+            data.update(self.prices.as_dict(self.contract_type))
+        if self.contract_type == CONTRACT_TYPE_TEMPO:
+            data.update({
+                'tempo_couleur': self.tempo.current,
+                'tempo_variable_hp_ttc': self.get_current_tempo_price('hp'),
+                'tempo_variable_hc_ttc': self.get_current_tempo_price('hc'),
+                'tempo_couleur_hier': self.tempo.yesterday,
+                'tempo_couleur_aujourdhui': self.tempo.today.color,
+                'tempo_aujourdhui_date': None if self.tempo.today.day is None else self.tempo.today.day.isoformat(),
+                'tempo_couleur_demain': self.tempo.tomorrow.color,
+                'tempo_demain_date': None if self.tempo.tomorrow.day is None else self.tempo.tomorrow.day.isoformat(),
+            })
+            for (color_key, probability_key, date_key), forecast in zip(FORECAST_KEYS, self.forecast):
+                data[color_key] = forecast.color
+                data[probability_key] = forecast.probability
+                data[date_key] = forecast.date
+        return data
@@ -0,0 +1,172 @@
+"""Cheapest time window search for the Tarif EDF integration."""
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from .const import CONTRACT_TYPE_TEMPO, TEMPO_COLOR_DAYS
+from .timeline import PriceSegment
+
+
+def get_color_weights(color: str | None, probability: float | None) -> dict[str, float]:
+    """Probabilité de chaque couleur Tempo pour un jour.
+
+    Une couleur publiée est certaine. Pour une couleur prévue, la probabilité
+    restante est répartie entre les autres couleurs au prorata de leur nombre
+    de jours par saison ; sans prévision, toute la saison sert de référence.
+    """
+    if color is not None and probability is None:
+        return {color: 1.0}
+
+    total_days = sum(days for other, days in TEMPO_COLOR_DAYS.items() if other != color)
+    remaining = 1.0 if color is None else 1.0 - probability
+    weights = {
+        other: remaining * days / total_days
+        for other, days in TEMPO_COLOR_DAYS.items() if other != color
+    }
+    if color is not None:
+        weights[color] = probability
+    return weights
+
+
+def get_expected_price(
+    contract_type: str,
+    segment: PriceSegment,
+    price_of: Callable[[date, str | None, str], float | None],
+) -> float | None:
+    """Prix moyen attendu d'un segment, pondéré par les probabilités de couleur."""
+    if contract_type != CONTRACT_TYPE_TEMPO or (segment.color is not None and segment.probability is None):
+        return segment.price
+
+    expected = 0.0
+    day = segment.start.date()
+    for color, weight in get_color_weights(segment.color, segment.probability).items():
+        price = price_of(day, segment.period, color)
+        if price is None:
+            return None
+        expected += weight * price
+    return expected
+
+
+def get_slot_prices(
+    segments: Sequence[PriceSegment],
+    segment_prices: Sequence[float | None],
+    start: datetime,
+    slot: timedelta,
+    count: int,
+) -> list[float | None]:
+    """Prix de chaque créneau de durée `slot` à partir de `start`, en un seul parcours."""
+    prices: list[float | None] = []
+    index = 0
+    slot_start = start
+    for _ in range(count):
+        while index < len(segments) and segments[index].end <= slot_start:
+            index += 1
+        if index == len(segments) or segments[index].start > slot_start:
+            prices.append(None)
+        else:
+            prices.append(segment_prices[index])
+        slot_start += slot
+    return prices
+
+
+def expand_power_profile(power_profile: Sequence[float], slots: int) -> list[tuple[int, int, float]]:
+    """Découpe la durée en paliers de puissance constante : (décalage, longueur, kW).
+
+    Les valeurs du profil se partagent la durée à parts égales ; les paliers
+    consécutifs de même puissance sont fusionnés.
+    """
+    steps: list[tuple[int, int, float]] = []
+    count = len(power_profile)
+    for position, power in enumerate(power_profile):
+        offset = position * slots // count
+        length = (position + 1) * slots // count - offset
+        if not length:
+            continue
+        if steps and steps[-1][2] == power:
+            steps[-1] = (steps[-1][0], steps[-1][1] + length, power)
+        else:
+            steps.append((offset, length, power))
+    return steps
+
+
+def find_cheapest_window(
+    prices: Sequence[float | None],
+    slot_hours: float,
+    power_profile: Sequence[float],
+    window_slots: int,
+) -> tuple[int, float] | None:
+    """Indice du premier créneau de la fenêtre la moins chère et son coût.
+
+    Les sommes glissantes sont tirées de sommes préfixes : chaque position est
+    évaluée en temps constant par palier du profil de puissance, soit un
+    parcours linéaire pour une puissance constante. Les fenêtres contenant un
+    créneau sans prix sont ignorées.
+    """
+    if window_slots <= 0 or window_slots > len(prices):
+        return None
+
+    price_sums = [0.0]
+    missing_counts = [0]
+    for price in prices:
+        price_sums.append(price_sums[-1] + (price or 0.0))
+        missing_counts.append(missing_counts[-1] + (price is None))
+
+    steps = expand_power_profile(power_profile, window_slots)
+    best: tuple[int, float] | None = None
+    for first in range(len(prices) - window_slots + 1):
+        last = first + window_slots
+        if missing_counts[last] != missing_counts[first]:
+            continue
+        cost = 0.0
+        for offset, length, power in steps:
+            cost += power * (price_sums[first + offset + length] - price_sums[first + offset])
+        cost *= slot_hours
+        if best is None or cost < best[1]:
+            best = (first, cost)
+    return best
+
+
+def plan_cheapest_window(
+    contract_type: str,
+    segments: Sequence[PriceSegment],
+    price_of: Callable[[date, str | None, str], float | None],
+    now: datetime,
+    deadline: datetime,
+    duration: timedelta,
+    power_profile: Sequence[float],
+    slot: timedelta,
+) -> dict[str, Any] | None:
+    """Cherche le début de fenêtre le moins cher, se terminant avant `deadline`."""
+    # Les débuts possibles sont alignés sur la grille des créneaux
+    slot_seconds = int(slot.total_seconds())
+    start = now.replace(second=0, microsecond=0)
+    start += timedelta(seconds=-(start.minute * 60) % slot_seconds)
+    window_slots = -(-int(duration.total_seconds()) // slot_seconds)
+    count = int((deadline - start).total_seconds()) // slot_seconds
+
+    segment_prices = [get_expected_price(contract_type, segment, price_of) for segment in segments]
+    prices = get_slot_prices(segments, segment_prices, start, slot, count)
+    best = find_cheapest_window(prices, slot_seconds / 3600, power_profile, window_slots)
+    if best is None:
+        return None
+
+    first, cost = best
+    window_start = start + first * slot
+    window_end = window_start + window_slots * slot
+    energy = sum(power * length for _, length, power in expand_power_profile(power_profile, window_slots))
+    energy *= slot_seconds / 3600
+    certain = all(
+        segment.probability is None and (segment.color is not None or contract_type != CONTRACT_TYPE_TEMPO)
+        for segment in segments
+        if segment.end > window_start and segment.start < window_end
+    )
+    return {
+        'start': window_start.isoformat(),
+        'end': window_end.isoformat(),
+        'energy_kwh': round(energy, 3),
+        'cost': round(cost, 4),
+        'average_price': round(cost / energy, 5) if energy else None,
+        'certain': certain,
+    }
@@ -0,0 +1,14 @@
+"""Recorder platform for the Tarif EDF integration."""
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant, callback
+
+
+@callback
+def exclude_attributes(hass: HomeAssistant) -> set[str]:
+    """Exclude attributes from being recorded in the database.
+
+    `_unrecorded_attributes` n'est pris en compte qu'à partir de Home Assistant
+    2024.1 : cette plateforme couvre les versions antérieures.
+    """
+    return {'timeline'}
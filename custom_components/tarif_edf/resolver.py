@@ -0,0 +1,300 @@
+"""Hedged Tempo color resolution across several providers."""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import asyncio
+from datetime import date
+import json
+import logging
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .api import SingleFlight, async_fetch
+from .const import (
+    CONF_TEMPO_HEDGE_COMPARE,
+    CONF_TEMPO_HEDGE_DELAY,
+    CONF_TEMPO_PROVIDERS,
+    DEFAULT_TEMPO_HEDGE_COMPARE,
+    DEFAULT_TEMPO_HEDGE_DELAY,
+    DOMAIN,
+    DOMAIN_CONFIG_KEY,
+    ENDPOINT_TEMPO_DAY,
+    ENDPOINT_TEMPO_EDF,
+    SINGLE_FLIGHT_KEY,
+    TEMPO_EDF_API_URL,
+    TEMPO_EDF_STATUS,
+    TEMPO_HEDGE_AGREEMENT_TIMEOUT,
+    TEMPO_PROVIDER_DATA_SOURCE,
+    TEMPO_PROVIDER_EDF,
+    TEMPO_RESOLVER_KEY,
+)
+from .metrics import get_metrics
+from .sources import get_data_source
+from .tempo import get_tempo_season, get_tempo_season_name
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TempoColorProvider(ABC):
+    """Fournisseur de la couleur d'un jour Tempo : code 1 à 3, ou 0 si elle n'est pas encore publiée."""
+
+    name: str
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the provider."""
+        self.hass = hass
+
+    @abstractmethod
+    async def async_get_code(self, day: date) -> int:
+        """Code de la couleur du jour `day`."""
+
+
+class DataSourceTempoProvider(TempoColorProvider):
+    """api-couleur-tempo.fr, via la source de données du domaine (en ligne, miroir ou rejeu)."""
+
+    name = TEMPO_PROVIDER_DATA_SOURCE
+
+    async def async_get_code(self, day: date) -> int:
+        response = await get_data_source(self.hass).async_get(ENDPOINT_TEMPO_DAY, day.strftime('%Y-%m-%d'))
+        response.raise_for_status()
+        return response.json().get('codeJour', 0)
+
+
+class EdfTempoProvider(TempoColorProvider):
+    """Calendrier des jours Tempo publié par EDF, toujours interrogé en ligne."""
+
+    name = TEMPO_PROVIDER_EDF
+
+    async def async_get_code(self, day: date) -> int:
+        date_str = day.strftime('%Y-%m-%d')
+        url = (
+            f"{TEMPO_EDF_API_URL}?option=TEMPO&dateApplicationBorneInf={date_str}"
+            f"&dateApplicationBorneSup={date_str}&identifiantConsommateur=src"
+        )
+        response = await async_fetch(self.hass, ENDPOINT_TEMPO_EDF, url)
+        response.raise_for_status()
+        content = response.json().get('content') or {}
+        for option in content.get('options') or []:
+            for calendar_day in option.get('calendrier') or []:
+                if calendar_day.get('dateApplication') == date_str:
+                    return TEMPO_EDF_STATUS.get(calendar_day.get('statut'), 0)
+        return 0
+
+
+TEMPO_PROVIDER_CLASSES: dict[str, type[TempoColorProvider]] = {
+    TEMPO_PROVIDER_DATA_SOURCE: DataSourceTempoProvider,
+    TEMPO_PROVIDER_EDF: EdfTempoProvider,
+}
+
+
+def _discard_result(task: asyncio.Future) -> None:
+    # Une requête abandonnée peut encore échouer : son erreur n'intéresse personne
+    if not task.cancelled():
+        task.exception()
+
+
+class TempoColorResolver:
+    """Résout la couleur d'un jour Tempo auprès de plusieurs fournisseurs.
+
+    Les fournisseurs sont interrogés par ordre de priorité. Le suivant est
+    lancé en parallèle dès que les requêtes en cours dépassent `hedge_delay`,
+    ou dès qu'aucune ne peut plus aboutir (erreur ou couleur indéterminée).
+    La première couleur définitive l'emporte : la latence et l'heure de prise
+    en compte d'une publication sont celles du fournisseur le plus rapide, et
+    les requêtes restantes sont annulées. Avec `compare_late_answers`, elles
+    terminent plutôt en arrière-plan, dans la limite de
+    `TEMPO_HEDGE_AGREEMENT_TIMEOUT`, pour comparer leurs couleurs à celle
+    retenue.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        providers: list[TempoColorProvider],
+        hedge_delay: float,
+        compare_late_answers: bool = DEFAULT_TEMPO_HEDGE_COMPARE,
+    ) -> None:
+        """Initialize the resolver."""
+        self.hass = hass
+        self.providers = providers
+        self.hedge_delay = hedge_delay
+        self.compare_late_answers = compare_late_answers
+
+    async def async_resolve(self, day: date) -> int:
+        """Code de la couleur du jour `day` ; une seule résolution par jour est en cours à la fois."""
+        domain_data = self.hass.data.setdefault(DOMAIN, {})
+        if SINGLE_FLIGHT_KEY not in domain_data:
+            domain_data[SINGLE_FLIGHT_KEY] = SingleFlight()
+        return await domain_data[SINGLE_FLIGHT_KEY].async_run(
+            f"{TEMPO_RESOLVER_KEY}/{day}", lambda: self._async_resolve(day)
+        )
+
+    async def _async_resolve(self, day: date) -> int:
+        metrics = get_metrics(self.hass)
+        waiting = list(self.providers)
+        pending: dict[asyncio.Future, tuple[TempoColorProvider, float]] = {}
+
+        def _launch(hedged: bool) -> None:
+            provider = waiting.pop(0)
+            provider_metrics = metrics.provider(provider.name)
+            provider_metrics.requests += 1
+            if hedged:
+                provider_metrics.hedged += 1
+                _LOGGER.debug(f"Couleur Tempo du {day}: relance auprès de {provider.name}")
+            task = asyncio.ensure_future(provider.async_get_code(day))
+            pending[task] = (provider, time.perf_counter())
+
+        answers: list[tuple[TempoColorProvider, int]] = []
+        error = None
+        undetermined = False
+        try:
+            _launch(False)
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if waiting else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Délai de relance dépassé : le fournisseur suivant est interrogé en parallèle
+                    _launch(True)
+                    continue
+
+                # Plusieurs réponses d'un même tour sont examinées par ordre de priorité
+                for task in sorted(done, key=lambda task: self.providers.index(pending[task][0])):
+                    provider, started = pending.pop(task)
+                    try:
+                        code = self._record_result(day, provider, started, task)
+                    except Exception as e:
+                        error = e
+                        continue
+                    if code in (1, 2, 3):
+                        answers.append((provider, code))
+                    else:
+                        undetermined = True
+
+                if answers:
+                    break
+                if not pending and waiting:
+                    _launch(False)
+        finally:
+            if answers and pending and self.compare_late_answers:
+                # Les requêtes restantes ne retardent pas la réponse : elles terminent en
+                # arrière-plan, indépendamment de l'appelant, pour être comparées au gagnant
+                self.hass.async_create_background_task(
+                    self._async_compare_late_answers(day, pending, *answers[0]),
+                    f"{DOMAIN} tempo hedges {day}",
+                )
+            else:
+                self._cancel_requests(pending)
+
+        if not answers:
+            if error is not None and not undetermined:
+                raise error
+            return 0
+
+        winner, code = answers[0]
+        metrics.provider(winner.name).wins += 1
+        for provider, other in answers[1:]:
+            self._record_comparison(day, winner, code, provider, other)
+
+        if winner.name != TEMPO_PROVIDER_DATA_SOURCE:
+            # Le miroir éventuellement alimenté par cette instance doit aussi connaître cette couleur
+            date_str = day.strftime('%Y-%m-%d')
+            content = json.dumps({
+                'dateJour': date_str,
+                'codeJour': code,
+                'periode': get_tempo_season_name(get_tempo_season(day)),
+            }).encode()
+            await get_data_source(self.hass).async_publish(ENDPOINT_TEMPO_DAY, date_str, content)
+
+        return code
+
+    def _record_result(self, day: date, provider: TempoColorProvider, started: float, task: asyncio.Future) -> int:
+        """Compte la réponse d'un fournisseur et retourne son code ; son erreur éventuelle est relevée."""
+        provider_metrics = get_metrics(self.hass).provider(provider.name)
+        duration_ms = (time.perf_counter() - started) * 1000
+        provider_metrics.total_ms += duration_ms
+        provider_metrics.max_ms = max(provider_metrics.max_ms, duration_ms)
+        try:
+            code = task.result()
+        except Exception as e:
+            provider_metrics.errors += 1
+            _LOGGER.debug(f"Couleur Tempo du {day}: échec de {provider.name}: {e}")
+            raise
+        if code in (1, 2, 3):
+            provider_metrics.definitive += 1
+        else:
+            provider_metrics.undetermined += 1
+        return code
+
+    def _cancel_requests(self, pending: dict[asyncio.Future, tuple[TempoColorProvider, float]]) -> None:
+        metrics = get_metrics(self.hass)
+        for task, (provider, _) in pending.items():
+            task.cancel()
+            task.add_done_callback(_discard_result)
+            metrics.provider(provider.name).cancelled += 1
+
+    def _record_comparison(
+        self, day: date, winner: TempoColorProvider, code: int, provider: TempoColorProvider, other: int
+    ) -> None:
+        provider_metrics = get_metrics(self.hass).provider(provider.name)
+        if other == code:
+            provider_metrics.agreements += 1
+        else:
+            provider_metrics.disagreements += 1
+            _LOGGER.warning(
+                f"Couleur Tempo du {day}: {provider.name} annonce {other}, {winner.name} annonce {code}"
+            )
+
+    async def _async_compare_late_answers(
+        self,
+        day: date,
+        pending: dict[asyncio.Future, tuple[TempoColorProvider, float]],
+        winner: TempoColorProvider,
+        code: int,
+    ) -> None:
+        """Attend les requêtes restées en cours après la victoire de `winner` et compare leurs couleurs à la sienne."""
+        try:
+            await asyncio.wait(pending, timeout=TEMPO_HEDGE_AGREEMENT_TIMEOUT)
+        finally:
+            late = {task: request for task, request in pending.items() if not task.done()}
+            for task, (provider, started) in pending.items():
+                if task in late:
+                    continue
+                try:
+                    other = self._record_result(day, provider, started, task)
+                except Exception:
+                    continue
+                if other in (1, 2, 3):
+                    self._record_comparison(day, winner, code, provider, other)
+            self._cancel_requests(late)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "providers": [provider.name for provider in self.providers],
+            "hedge_delay": self.hedge_delay,
+            "compare_late_answers": self.compare_late_answers,
+            "agreement_timeout": TEMPO_HEDGE_AGREEMENT_TIMEOUT if self.compare_late_answers else None,
+        }
+
+
+def create_tempo_resolver(hass: HomeAssistant, config: dict[str, Any]) -> TempoColorResolver:
+    """Crée le résolveur décrit par la configuration YAML du domaine."""
+    names = config.get(CONF_TEMPO_PROVIDERS) or [TEMPO_PROVIDER_DATA_SOURCE]
+    return TempoColorResolver(
+        hass,
+        [TEMPO_PROVIDER_CLASSES[name](hass) for name in names],
+        config.get(CONF_TEMPO_HEDGE_DELAY, DEFAULT_TEMPO_HEDGE_DELAY),
+        config.get(CONF_TEMPO_HEDGE_COMPARE, DEFAULT_TEMPO_HEDGE_COMPARE),
+    )
+
+
+def get_tempo_resolver(hass: HomeAssistant) -> TempoColorResolver:
+    """Retourne le résolveur du domaine, créé au premier usage depuis la configuration YAML."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if TEMPO_RESOLVER_KEY not in domain_data:
+        domain_data[TEMPO_RESOLVER_KEY] = create_tempo_resolver(hass, domain_data.get(DOMAIN_CONFIG_KEY, {}))
+    return domain_data[TEMPO_RESOLVER_KEY]
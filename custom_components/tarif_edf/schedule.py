@@ -0,0 +1,128 @@
+"""Off-peak hours schedule for the Tarif EDF integration."""
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+from functools import cached_property
+import re
+
+OFF_PEAK_RANGE_PATTERN = re.compile(r'^([0-1]?[0-9]|2[0-3]):([0-5][0-9])-([0-1]?[0-9]|2[0-3]):([0-5][0-9])$')
+MINUTES_PER_DAY = 24 * 60
+
+
+class InvalidOffPeakHours(ValueError):
+    """Error to indicate an off-peak hours range is malformed."""
+
+
+class OffPeakSchedule:
+    """Plages d'heures creuses compilées en intervalles triés et fusionnés.
+
+    Les plages sont exprimées en minutes depuis minuit, celles qui traversent
+    minuit sont coupées en deux, puis triées et fusionnées. `boundaries`
+    contient l'alternance des débuts et fins, ce qui permet de répondre par
+    recherche dichotomique à « est-ce l'heure creuse ? » et « quand a lieu
+    le prochain changement HP/HC ? ».
+    """
+
+    def __init__(self, intervals: list[tuple[int, int]]) -> None:
+        """Initialize the schedule from [start, end) minute intervals within a day."""
+        merged: list[list[int]] = []
+        for start, end in sorted(intervals):
+            if start >= end:
+                continue
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        self.intervals: tuple[tuple[int, int], ...] = tuple((start, end) for start, end in merged)
+        self.boundaries: tuple[int, ...] = tuple(minute for interval in self.intervals for minute in interval)
+
+        # Minutes de la journée où le tarif bascule ; minuit n'en fait partie
+        # que si la période creuse n'est pas continue de part et d'autre
+        changes = {minute % MINUTES_PER_DAY for minute in self.boundaries}
+        if 0 in self.boundaries and MINUTES_PER_DAY in self.boundaries:
+            changes.discard(0)
+        self.changes: tuple[int, ...] = tuple(sorted(changes))
+
+    @classmethod
+    def parse(cls, off_peak_hours_ranges: str | None, strict: bool = True) -> OffPeakSchedule:
+        """Compile une chaîne `HH:MM-HH:MM,HH:MM-HH:MM,...`.
+
+        En mode strict une plage invalide lève `InvalidOffPeakHours`, sinon elle est ignorée.
+        """
+        intervals: list[tuple[int, int]] = []
+        for hour_range in (off_peak_hours_ranges or '').split(','):
+            hour_range = hour_range.strip()
+            if hour_range == '':
+                continue
+            match = OFF_PEAK_RANGE_PATTERN.match(hour_range)
+            if match is None:
+                if strict:
+                    raise InvalidOffPeakHours(f"Plage horaire invalide: {hour_range}")
+                continue
+
+            start_hour, start_minute, end_hour, end_minute = (int(value) for value in match.groups())
+            start = start_hour * 60 + start_minute
+            end = end_hour * 60 + end_minute
+            if start == end:
+                if strict:
+                    raise InvalidOffPeakHours(f"Plage horaire vide: {hour_range}")
+                continue
+            if start < end:
+                intervals.append((start, end))
+            else:
+                # La plage traverse minuit
+                intervals.append((start, MINUTES_PER_DAY))
+                intervals.append((0, end))
+
+        return cls(intervals)
+
+    @cached_property
+    def hourly_off_peak_fractions(self) -> tuple[float, ...]:
+        """Part de chaque heure de la journée (0-23) passée en heure creuse."""
+        fractions = []
+        for hour in range(24):
+            hour_start, hour_end = hour * 60, (hour + 1) * 60
+            overlap = sum(
+                max(0, min(end, hour_end) - max(start, hour_start))
+                for start, end in self.intervals
+            )
+            fractions.append(overlap / 60)
+        return tuple(fractions)
+
+    def __bool__(self) -> bool:
+        return bool(self.intervals)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, OffPeakSchedule) and self.intervals == other.intervals
+
+    def __repr__(self) -> str:
+        return f"OffPeakSchedule({self.as_string()!r})"
+
+    def as_string(self) -> str:
+        return ','.join(
+            f"{start // 60:02d}:{start % 60:02d}-{end // 60 % 24:02d}:{end % 60:02d}"
+            for start, end in self.intervals
+        )
+
+    def is_off_peak_minute(self, minute: int) -> bool:
+        """Indique si une minute de la journée (0-1439) est en heure creuse."""
+        # Un nombre impair de bornes à gauche signifie qu'on est dans un intervalle
+        return bisect_right(self.boundaries, minute) % 2 == 1
+
+    def is_off_peak(self, when: datetime | time) -> bool:
+        return self.is_off_peak_minute(when.hour * 60 + when.minute)
+
+    def next_change(self, now: datetime) -> datetime | None:
+        """Prochain basculement HP/HC strictement après `now`, ou None si le tarif ne change jamais."""
+        if not self.changes:
+            return None
+
+        index = bisect_right(self.changes, now.hour * 60 + now.minute)
+        day = now.date()
+        if index == len(self.changes):
+            index = 0
+            day += timedelta(days=1)
+        minute = self.changes[index]
+        return datetime.combine(day, time(minute // 60, minute % 60), tzinfo=now.tzinfo)
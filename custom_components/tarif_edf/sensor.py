@@ -1,17 +1,26 @@
-from homeassistant.core import HomeAssistant
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.components.sensor import (
+    SensorDeviceClass,
     SensorEntity,
 )
+from homeassistant.const import EntityCategory
 
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
 )
 
 
+from homeassistant.util import dt as dt_util
+
 from .coordinator import TarifEdfDataUpdateCoordinator
+from .models import FORECAST_KEYS, ForecastDay, TarifEdfData
+from .metrics import TarifEdfMetrics, get_metrics
 
 from .const import (
     DOMAIN,
@@ -19,8 +28,26 @@ from .const import (
     CONTRACT_TYPE_HPHC,
     CONTRACT_TYPE_TEMPO,
     TEMPO_FORECAST_DAYS,
+    STATE_KEY_LAST_UPDATE,
+    STATE_KEY_METRICS,
+    STATE_KEY_TIMELINE,
+    UNIQUE_ID_PREFIX,
 )
 
+def get_unique_id(entry_id: str, name: str) -> str:
+    return f"{UNIQUE_ID_PREFIX}{entry_id}_{name}"
+
+def get_migrated_unique_id(entry_id: str, unique_id: str) -> str | None:
+    """Identifiant d'un capteur enregistré avant le rattachement des unique_id à l'entrée."""
+    if not unique_id.startswith(UNIQUE_ID_PREFIX) or unique_id.startswith(get_unique_id(entry_id, '')):
+        return None
+    return get_unique_id(entry_id, unique_id.removeprefix(UNIQUE_ID_PREFIX))
+
+def get_last_update_duration(metrics: TarifEdfMetrics, name: str) -> float | None:
+    if name not in metrics.updates:
+        return None
+    return metrics.updates[name].as_dict()['last_ms']
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -30,63 +57,88 @@ async def async_setup_entry(
         config_entry.entry_id
     ]["coordinator"]
 
+    data: TarifEdfData = coordinator.data
+    contract = f"{data.contract_type} {data.contract_power}kVA"
+
     sensors = [
-        TarifEdfSensor(coordinator, 'contract_power', f"Puissance souscrite {coordinator.data['contract_type']} {coordinator.data['contract_power']}kVA", 'kVA'),
+        TarifEdfSensor(coordinator, config_entry.entry_id, 'contract_power', lambda data: data.contract_power, f"Puissance souscrite {contract}", 'kVA'),
+        TarifEdfLastUpdateSensor(coordinator, config_entry.entry_id, f"Dernière mise à jour {contract}"),
+        # Les compteurs de requêtes et de caches, communs à toutes les entrées, figurent dans les diagnostics
+        TarifEdfMetricSensor(coordinator, config_entry.entry_id, f"Durée de mise à jour {contract}", get_last_update_duration, 'ms'),
+        TarifEdfPriceTimelineSensor(coordinator, config_entry.entry_id, f"Prochain changement de prix {contract}"),
     ]
 
-    if coordinator.data['contract_type'] == CONTRACT_TYPE_BASE:
+    if data.contract_type == CONTRACT_TYPE_BASE:
         sensors.extend([
-            TarifEdfSensor(coordinator, 'base_variable_ttc', 'Tarif Base TTC', 'EUR/kWh'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'base_variable_ttc', lambda data: data.prices.get(), 'Tarif Base TTC', 'EUR/kWh'),
         ])
-    elif coordinator.data['contract_type'] == CONTRACT_TYPE_HPHC:
+    elif data.contract_type == CONTRACT_TYPE_HPHC:
         sensors.extend([
-            TarifEdfSensor(coordinator, 'hphc_variable_hc_ttc', 'Tarif Heures creuses TTC', 'EUR/kWh'),
-            TarifEdfSensor(coordinator, 'hphc_variable_hp_ttc', 'Tarif Heures pleines TTC', 'EUR/kWh'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'hphc_variable_hc_ttc', lambda data: data.prices.get('hc'), 'Tarif Heures creuses TTC', 'EUR/kWh'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'hphc_variable_hp_ttc', lambda data: data.prices.get('hp'), 'Tarif Heures pleines TTC', 'EUR/kWh'),
         ])
-    elif coordinator.data['contract_type'] == CONTRACT_TYPE_TEMPO:
+    elif data.contract_type == CONTRACT_TYPE_TEMPO:
         sensors.extend([
-            TarifEdfSensor(coordinator, 'tempo_couleur', 'Tarif Tempo Couleur'),
-            TarifEdfSensor(coordinator, 'tempo_couleur_hier', 'Tarif Tempo Couleur Hier'),
-            TarifEdfSensor(coordinator, 'tempo_couleur_aujourdhui', "Tarif Tempo Couleur Aujourd'hui"),
-            TarifEdfSensor(coordinator, 'tempo_couleur_demain', 'Tarif Tempo Couleur Demain'),
-            TarifEdfSensor(coordinator, 'tempo_variable_hc_ttc', 'Tarif Tempo Heures creuses TTC', 'EUR/kWh'),
-            TarifEdfSensor(coordinator, 'tempo_variable_hp_ttc', 'Tarif Tempo Heures pleines TTC', 'EUR/kWh'),
-            TarifEdfSensor(coordinator, 'tempo_variable_hc_bleu_ttc', 'Tarif Bleu Tempo Heures creuses TTC', 'EUR/kWh'),
-            TarifEdfSensor(coordinator, 'tempo_variable_hp_bleu_ttc', 'Tarif Bleu Tempo Heures pleines TTC', 'EUR/kWh'),
-            TarifEdfSensor(coordinator, 'tempo_variable_hc_rouge_ttc', 'Tarif Rouge Tempo Heures creuses TTC', 'EUR/kWh'),
-            TarifEdfSensor(coordinator, 'tempo_variable_hp_rouge_ttc', 'Tarif Rouge Tempo Heures pleines TTC', 'EUR/kWh'),
-            TarifEdfSensor(coordinator, 'tempo_variable_hc_blanc_ttc', 'Tarif Blanc Tempo Heures creuses TTC', 'EUR/kWh'),
-            TarifEdfSensor(coordinator, 'tempo_variable_hp_blanc_ttc', 'Tarif Blanc Tempo Heures pleines TTC', 'EUR/kWh'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tempo_couleur', lambda data: data.tempo.current, 'Tarif Tempo Couleur'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tempo_couleur_hier', lambda data: data.tempo.yesterday, 'Tarif Tempo Couleur Hier'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tempo_couleur_aujourdhui', lambda data: data.tempo.today.color, "Tarif Tempo Couleur Aujourd'hui"),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tempo_couleur_demain', lambda data: data.tempo.tomorrow.color, 'Tarif Tempo Couleur Demain'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tempo_variable_hc_ttc', lambda data: data.get_current_tempo_price('hc'), 'Tarif Tempo Heures creuses TTC', 'EUR/kWh'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tempo_variable_hp_ttc', lambda data: data.get_current_tempo_price('hp'), 'Tarif Tempo Heures pleines TTC', 'EUR/kWh'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tempo_variable_hc_bleu_ttc', lambda data: data.prices.get('hc', 'bleu'), 'Tarif Bleu Tempo Heures creuses TTC', 'EUR/kWh'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tempo_variable_hp_bleu_ttc', lambda data: data.prices.get('hp', 'bleu'), 'Tarif Bleu Tempo Heures pleines TTC', 'EUR/kWh'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tempo_variable_hc_rouge_ttc', lambda data: data.prices.get('hc', 'rouge'), 'Tarif Rouge Tempo Heures creuses TTC', 'EUR/kWh'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tempo_variable_hp_rouge_ttc', lambda data: data.prices.get('hp', 'rouge'), 'Tarif Rouge Tempo Heures pleines TTC', 'EUR/kWh'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tempo_variable_hc_blanc_ttc', lambda data: data.prices.get('hc', 'blanc'), 'Tarif Blanc Tempo Heures creuses TTC', 'EUR/kWh'),
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tempo_variable_hp_blanc_ttc', lambda data: data.prices.get('hp', 'blanc'), 'Tarif Blanc Tempo Heures pleines TTC', 'EUR/kWh'),
         ])
         # Capteurs de prévisions Tempo (J+1 à J+9)
         for day in range(1, TEMPO_FORECAST_DAYS + 1):
             sensors.append(
                 TarifEdfForecastSensor(
-                    coordinator,
-                    f'tempo_prevision_j{day}_couleur',
+                    coordinator, config_entry.entry_id,
                     f'Tempo Prévision J+{day}',
                     day
                 )
             )
 
-    if coordinator.data['tarif_actuel_ttc'] is not None:
+    if data.current_price is not None:
         sensors.append(
-            TarifEdfSensor(coordinator, 'tarif_actuel_ttc', f"Tarif actuel {coordinator.data['contract_type']} {coordinator.data['contract_power']}kVA TTC", 'EUR/kWh')
+            TarifEdfSensor(coordinator, config_entry.entry_id, 'tarif_actuel_ttc', lambda data: data.current_price, f"Tarif actuel {contract} TTC", 'EUR/kWh')
         )
 
     async_add_entities(sensors, False)
 
-class TarifEdfSensor(CoordinatorEntity, SensorEntity):
+class TarifEdfEntity(CoordinatorEntity, SensorEntity):
+    """Base class for Tarif EDF sensors, writing their state only when it changes.
+
+    The coordinator context is the set of state keys the sensor depends on:
+    the coordinator only notifies it when one of them changed.
+    """
+
+    _last_written_state: tuple | None = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        state = (self.available, self.native_value, self.extra_state_attributes)
+        if state == self._last_written_state:
+            return
+        self._last_written_state = state
+        self.async_write_ha_state()
+
+
+class TarifEdfSensor(TarifEdfEntity):
     """Representation of a Tarif EDF sensor."""
 
-    def __init__(self, coordinator, coordinator_key: str, name: str, unit_of_measurement: str = None) -> None:
+    def __init__(self, coordinator, entry_id: str, key: str, value_fn: Callable[[TarifEdfData], Any], name: str, unit_of_measurement: str = None) -> None:
         """Initialize the Tarif EDF sensor."""
-        super().__init__(coordinator)
-        contract_name = str.upper(self.coordinator.data['contract_type']) + " " + self.coordinator.data['contract_power'] + "kVA"
+        super().__init__(coordinator, frozenset({key}))
+        contract_name = str.upper(self.coordinator.data.contract_type) + " " + self.coordinator.data.contract_power + "kVA"
 
-        self._coordinator_key = coordinator_key
+        self._value_fn = value_fn
         self._name = name
-        self._attr_unique_id = f"tarif_edf_{self._name}"
+        self._attr_unique_id = get_unique_id(entry_id, name)
         self._attr_name = name
         self._attr_device_info = DeviceInfo(
             name=f"Tarif EDF - {contract_name}",
@@ -103,37 +155,35 @@ class TarifEdfSensor(CoordinatorEntity, SensorEntity):
     @property
     def native_value(self):
         """Return the state of the sensor."""
-        if self.coordinator.data[self._coordinator_key] is None:
+        value = self._value_fn(self.coordinator.data)
+        if value is None:
             return 'unavailable'
-        else:
-            return self.coordinator.data[self._coordinator_key]
+        return value
 
     @property
     def extra_state_attributes(self):
         """Return the state attributes."""
         return {
-            'updated_at': self.coordinator.last_update_success_time,
             'unit_of_measurement': self._attr_unit_of_measurement,
         }
 
     @property
     def available(self) -> bool:
         """Return if entity is available."""
-        return self.coordinator.last_update_success and self.coordinator.data[self._coordinator_key] is not None
+        return self.coordinator.last_update_success and self._value_fn(self.coordinator.data) is not None
 
 
-class TarifEdfForecastSensor(CoordinatorEntity, SensorEntity):
+class TarifEdfForecastSensor(TarifEdfEntity):
     """Representation of a Tempo forecast sensor with probability."""
 
-    def __init__(self, coordinator, coordinator_key: str, name: str, day_number: int) -> None:
+    def __init__(self, coordinator, entry_id: str, name: str, day_number: int) -> None:
         """Initialize the Tempo forecast sensor."""
-        super().__init__(coordinator)
-        contract_name = str.upper(self.coordinator.data['contract_type']) + " " + self.coordinator.data['contract_power'] + "kVA"
+        super().__init__(coordinator, frozenset(FORECAST_KEYS[day_number - 1]))
+        contract_name = str.upper(self.coordinator.data.contract_type) + " " + self.coordinator.data.contract_power + "kVA"
 
-        self._coordinator_key = coordinator_key
         self._day_number = day_number
         self._name = name
-        self._attr_unique_id = f"tarif_edf_{self._name}"
+        self._attr_unique_id = get_unique_id(entry_id, name)
         self._attr_name = name
         self._attr_device_info = DeviceInfo(
             name=f"Tarif EDF - {contract_name}",
@@ -145,31 +195,130 @@ class TarifEdfForecastSensor(CoordinatorEntity, SensorEntity):
             model=contract_name,
         )
 
+    @property
+    def _forecast(self) -> ForecastDay:
+        return self.coordinator.data.forecast[self._day_number - 1]
+
     @property
     def native_value(self):
         """Return the predicted color for this day."""
-        if self._coordinator_key not in self.coordinator.data or self.coordinator.data[self._coordinator_key] is None:
-            return 'indéterminé'
-        return self.coordinator.data[self._coordinator_key]
+        return self._forecast.color
 
     @property
     def extra_state_attributes(self):
         """Return the state attributes including probability and date."""
-        prob_key = f'tempo_prevision_j{self._day_number}_probabilite'
-        date_key = f'tempo_prevision_j{self._day_number}_date'
-
-        probability = self.coordinator.data.get(prob_key, 0)
-        forecast_date = self.coordinator.data.get(date_key, '')
+        forecast = self._forecast
 
         return {
-            'updated_at': self.coordinator.last_update_success_time,
-            'probabilite': probability,
-            'probabilite_pourcent': f"{probability}%",
-            'date': forecast_date,
+            'probabilite': forecast.probability,
+            'probabilite_pourcent': f"{forecast.probability}%",
+            'date': forecast.date,
             'jour': f"J+{self._day_number}",
         }
 
     @property
     def available(self) -> bool:
         """Return if entity is available."""
-        return self.coordinator.last_update_success and self._coordinator_key in self.coordinator.data
+        return self.coordinator.last_update_success
+
+
+class TarifEdfLastUpdateSensor(TarifEdfEntity):
+    """Diagnostic sensor holding the time of the last successful refresh."""
+
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, entry_id: str, name: str) -> None:
+        """Initialize the last update sensor."""
+        super().__init__(coordinator, frozenset({STATE_KEY_LAST_UPDATE}))
+        contract_name = str.upper(self.coordinator.data.contract_type) + " " + self.coordinator.data.contract_power + "kVA"
+
+        self._name = name
+        self._attr_unique_id = get_unique_id(entry_id, name)
+        self._attr_name = name
+        self._attr_device_info = DeviceInfo(
+            name=f"Tarif EDF - {contract_name}",
+            entry_type=DeviceEntryType.SERVICE,
+            identifiers={
+                (DOMAIN, f"Tarif EDF - {contract_name}")
+            },
+            manufacturer="Tarif EDF",
+            model=contract_name,
+        )
+
+    @property
+    def native_value(self):
+        """Return the time of the last successful refresh."""
+        return self.coordinator.last_update_success_time
+
+
+class TarifEdfMetricSensor(TarifEdfEntity):
+    """Diagnostic sensor exposing an integration runtime metric, disabled by default."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator, entry_id: str, name: str, value_fn: Callable[[TarifEdfMetrics, str], float | None], unit_of_measurement: str = None) -> None:
+        """Initialize the metric sensor."""
+        super().__init__(coordinator, frozenset({STATE_KEY_METRICS}))
+        contract_name = str.upper(self.coordinator.data.contract_type) + " " + self.coordinator.data.contract_power + "kVA"
+
+        self._value_fn = value_fn
+        self._name = name
+        self._attr_unique_id = get_unique_id(entry_id, name)
+        self._attr_name = name
+        self._attr_device_info = DeviceInfo(
+            name=f"Tarif EDF - {contract_name}",
+            entry_type=DeviceEntryType.SERVICE,
+            identifiers={
+                (DOMAIN, f"Tarif EDF - {contract_name}")
+            },
+            manufacturer="Tarif EDF",
+            model=contract_name,
+        )
+        if (unit_of_measurement is not None):
+            self._attr_native_unit_of_measurement = unit_of_measurement
+
+    @property
+    def native_value(self):
+        """Return the current value of the metric."""
+        return self._value_fn(get_metrics(self.hass), self.coordinator.name)
+
+
+class TarifEdfPriceTimelineSensor(TarifEdfEntity):
+    """Sensor holding the time of the next price change and the upcoming price segments."""
+
+    _attr_device_class = SensorDeviceClass.TIMESTAMP
+    # La chronologie change à chaque basculement : inutile de l'historiser (voir aussi recorder.py)
+    _unrecorded_attributes = frozenset({'timeline'})
+
+    def __init__(self, coordinator, entry_id: str, name: str) -> None:
+        """Initialize the price timeline sensor."""
+        super().__init__(coordinator, frozenset({STATE_KEY_TIMELINE}))
+        contract_name = str.upper(self.coordinator.data.contract_type) + " " + self.coordinator.data.contract_power + "kVA"
+
+        self._name = name
+        self._attr_unique_id = get_unique_id(entry_id, name)
+        self._attr_name = name
+        self._attr_device_info = DeviceInfo(
+            name=f"Tarif EDF - {contract_name}",
+            entry_type=DeviceEntryType.SERVICE,
+            identifiers={
+                (DOMAIN, f"Tarif EDF - {contract_name}")
+            },
+            manufacturer="Tarif EDF",
+            model=contract_name,
+        )
+
+    @property
+    def native_value(self):
+        """Return the end of the current price segment."""
+        segment = self.coordinator.price_timeline.current(dt_util.now())
+        return None if segment is None else segment.end
+
+    @property
+    def extra_state_attributes(self):
+        """Return the upcoming price segments."""
+        return {
+            'timeline': self.coordinator.price_timeline.as_list(),
+        }
@@ -0,0 +1,431 @@
+"""Services for the Tarif EDF integration."""
+from __future__ import annotations
+
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .billing import compare_contracts, compute_cost, price_timestamps
+from .const import (
+    CHEAPEST_WINDOW_MAX_HORIZON,
+    CHEAPEST_WINDOW_SLOT,
+    CONTRACT_POWERS,
+    CONTRACT_TYPE_BASE,
+    CONTRACT_TYPE_HPHC,
+    CONTRACT_TYPE_TEMPO,
+    DEFAULT_REFRESH_INTERVAL,
+    DOMAIN,
+    GET_PRICES_MAX_TIMESTAMPS,
+    TEMPO_OFFPEAK_HOURS,
+)
+from .coordinator import TarifEdfDataUpdateCoordinator, get_tempo_color_from_code
+from .engine import get_engine
+from .planner import plan_cheapest_window
+from .schedule import InvalidOffPeakHours, OffPeakSchedule
+from .tempo import TempoHistoryStore, async_get_tempo_history, get_tempo_billing_day, get_tempo_season_name
+
+SERVICE_COMPUTE_COST = "compute_cost"
+SERVICE_COMPARE_CONTRACTS = "compare_contracts"
+SERVICE_GET_PRICE_TIMELINE = "get_price_timeline"
+SERVICE_FIND_CHEAPEST_WINDOW = "find_cheapest_window"
+SERVICE_GET_PRICES = "get_prices"
+SERVICE_GET_TEMPO_HISTORY = "get_tempo_history"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_ENTITY_ID = "entity_id"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_OFF_PEAK_HOURS_RANGES = "off_peak_hours_ranges"
+ATTR_DURATION = "duration"
+ATTR_DEADLINE = "deadline"
+ATTR_POWER_PROFILE = "power_profile"
+ATTR_TIMESTAMPS = "timestamps"
+
+DEFAULT_COMPARISON_PERIOD = timedelta(days=365)
+
+COMPUTE_COST_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_ENTITY_ID): cv.entity_id,
+        vol.Required(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+    }
+)
+
+COMPARE_CONTRACTS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_ENTITY_ID): cv.entity_id,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_OFF_PEAK_HOURS_RANGES): cv.string,
+    }
+)
+
+GET_PRICE_TIMELINE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    }
+)
+
+FIND_CHEAPEST_WINDOW_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_DURATION): cv.positive_time_period,
+        vol.Optional(ATTR_DEADLINE): cv.datetime,
+        vol.Optional(ATTR_POWER_PROFILE, default=[1.0]): vol.All(
+            cv.ensure_list, [vol.All(vol.Coerce(float), vol.Range(min=0))], vol.Length(min=1)
+        ),
+    }
+)
+
+GET_PRICES_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Required(ATTR_TIMESTAMPS): vol.All(
+            cv.ensure_list, vol.Length(min=1, max=GET_PRICES_MAX_TIMESTAMPS), [cv.datetime]
+        ),
+    }
+)
+
+GET_TEMPO_HISTORY_SCHEMA = vol.Schema({})
+
+
+def as_aware(value: datetime) -> datetime:
+    """Interprète une date sans fuseau dans le fuseau de Home Assistant."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return value
+
+
+def get_coordinators(hass: HomeAssistant) -> dict[str, TarifEdfDataUpdateCoordinator]:
+    """Coordinators des entrées chargées, par identifiant d'entrée."""
+    return {
+        entry_id: entry_data["coordinator"]
+        for entry_id, entry_data in hass.data.get(DOMAIN, {}).items()
+        if isinstance(entry_data, dict) and "coordinator" in entry_data
+    }
+
+
+def get_coordinator(hass: HomeAssistant, call: ServiceCall) -> TarifEdfDataUpdateCoordinator:
+    """Retourne le coordinator ciblé par l'appel, implicite s'il n'y a qu'une entrée."""
+    coordinators = get_coordinators(hass)
+    entry_id = call.data.get(ATTR_CONFIG_ENTRY_ID)
+    if entry_id is not None:
+        if entry_id not in coordinators:
+            raise HomeAssistantError(f"Entrée Tarif EDF inconnue: {entry_id}")
+        return coordinators[entry_id]
+    # Des entrées de même contrat, puissance et plages partagent un coordinator
+    shared = set(coordinators.values())
+    if len(shared) != 1:
+        raise HomeAssistantError(
+            f"{len(coordinators)} entrées Tarif EDF configurées, précisez {ATTR_CONFIG_ENTRY_ID}"
+        )
+    return shared.pop()
+
+
+def get_tempo_colors(history: TempoHistoryStore, start: datetime, end: datetime) -> dict[date, str | None]:
+    """Copie des couleurs Tempo connues pour les jours de facturation de la période.
+
+    Relevée sur la boucle d'événements : le calcul, fait dans l'exécuteur, ne
+    lit pas l'historique, qui peut changer entre-temps.
+    """
+    colors: dict[date, str | None] = {}
+    day = get_tempo_billing_day(dt_util.as_local(start))
+    last_day = get_tempo_billing_day(dt_util.as_local(end))
+    while day <= last_day:
+        code = history.get(day)
+        colors[day] = get_tempo_color_from_code(code) if code else None
+        day += timedelta(days=1)
+    return colors
+
+
+async def async_get_hourly_consumption(
+    hass: HomeAssistant, statistic_id: str, start: datetime, end: datetime
+) -> list[tuple[datetime, float]]:
+    """Consommation horaire (kWh) lue en une fois dans les statistiques long terme."""
+    # Importé au premier appel : le recorder (et SQLAlchemy) n'est pas chargé
+    # au démarrage de l'intégration, ni du tout si ces services ne servent pas
+    from homeassistant.components.recorder import get_instance
+    from homeassistant.components.recorder.statistics import statistics_during_period
+
+    stats = await get_instance(hass).async_add_executor_job(
+        statistics_during_period, hass, start, end, {statistic_id}, "hour", None, {"change"}
+    )
+    consumption = []
+    for row in stats.get(statistic_id, []):
+        hour_start = row["start"]
+        if isinstance(hour_start, (int, float)):
+            hour_start = dt_util.utc_from_timestamp(hour_start)
+        consumption.append((hour_start, row.get("change") or 0.0))
+    return consumption
+
+
+async def async_compute_cost(hass: HomeAssistant, call: ServiceCall) -> dict[str, Any]:
+    """Calcule le coût de la consommation d'un compteur d'énergie sur une période."""
+    coordinator = get_coordinator(hass, call)
+    start = as_aware(call.data[ATTR_START])
+    end = as_aware(call.data.get(ATTR_END) or dt_util.now())
+    if start >= end:
+        raise HomeAssistantError("La date de début doit précéder la date de fin")
+    if coordinator.tarif_table is None:
+        raise HomeAssistantError("Les tarifs ne sont pas encore chargés")
+
+    consumption = await async_get_hourly_consumption(hass, call.data[ATTR_ENTITY_ID], start, end)
+
+    contract_type = coordinator.contract_type
+    colors = {}
+    if contract_type == CONTRACT_TYPE_TEMPO and coordinator.tempo_history is not None:
+        colors = get_tempo_colors(coordinator.tempo_history, start, end)
+
+    result = await hass.async_add_executor_job(
+        compute_cost,
+        contract_type,
+        coordinator.contract_power,
+        coordinator.tarif_table,
+        coordinator.off_peak_schedule,
+        colors.get,
+        start,
+        end,
+        consumption,
+    )
+    return {
+        ATTR_ENTITY_ID: call.data[ATTR_ENTITY_ID],
+        ATTR_START: start.isoformat(),
+        ATTR_END: end.isoformat(),
+        'hours': len(consumption),
+        **result,
+    }
+
+
+def get_comparison_off_peak_hours(hass: HomeAssistant, call: ServiceCall) -> str:
+    """Plages heures creuses à appliquer au contrat HP/HC simulé."""
+    if ATTR_OFF_PEAK_HOURS_RANGES in call.data:
+        return call.data[ATTR_OFF_PEAK_HOURS_RANGES]
+    if ATTR_CONFIG_ENTRY_ID in call.data or len(get_coordinators(hass)) == 1:
+        coordinator = get_coordinator(hass, call)
+        if coordinator.contract_type == CONTRACT_TYPE_HPHC and coordinator.off_peak_schedule:
+            return coordinator.off_peak_schedule.as_string()
+    # À défaut, les plages les plus courantes (identiques à celles de Tempo)
+    return TEMPO_OFFPEAK_HOURS
+
+
+async def async_compare_contracts(hass: HomeAssistant, call: ServiceCall) -> dict[str, Any]:
+    """Compare le coût d'une consommation passée pour chaque contrat et chaque puissance."""
+    end = as_aware(call.data.get(ATTR_END) or dt_util.now())
+    start = as_aware(call.data.get(ATTR_START) or end - DEFAULT_COMPARISON_PERIOD)
+    if start >= end:
+        raise HomeAssistantError("La date de début doit précéder la date de fin")
+
+    off_peak_hours = get_comparison_off_peak_hours(hass, call)
+    try:
+        hphc_schedule = OffPeakSchedule.parse(off_peak_hours)
+    except InvalidOffPeakHours as err:
+        raise HomeAssistantError(f"Plages heures creuses invalides: {off_peak_hours}") from err
+
+    await get_engine(hass).async_load_network_modules()
+    from .dataset import get_dataset_cache
+
+    dataset_cache = get_dataset_cache(hass)
+    max_age = timedelta(days=DEFAULT_REFRESH_INTERVAL)
+    contract_types = (CONTRACT_TYPE_BASE, CONTRACT_TYPE_HPHC, CONTRACT_TYPE_TEMPO)
+    try:
+        tables = dict(zip(contract_types, await asyncio.gather(
+            *(dataset_cache.async_get_table(contract_type, max_age) for contract_type in contract_types)
+        )))
+    except HomeAssistantError:
+        raise
+    except Exception as err:
+        raise HomeAssistantError(f"Impossible de charger les tarifs: {err}") from err
+    schedules = {
+        CONTRACT_TYPE_BASE: OffPeakSchedule.parse(None),
+        CONTRACT_TYPE_HPHC: hphc_schedule,
+        CONTRACT_TYPE_TEMPO: OffPeakSchedule.parse(TEMPO_OFFPEAK_HOURS),
+    }
+
+    history = await async_get_tempo_history(hass)
+    await history.async_backfill()
+
+    consumption = await async_get_hourly_consumption(hass, call.data[ATTR_ENTITY_ID], start, end)
+    colors = get_tempo_colors(history, start, end)
+
+    results = await hass.async_add_executor_job(
+        compare_contracts,
+        tables,
+        schedules,
+        CONTRACT_POWERS,
+        colors.get,
+        start,
+        end,
+        consumption,
+    )
+    return {
+        ATTR_ENTITY_ID: call.data[ATTR_ENTITY_ID],
+        ATTR_START: start.isoformat(),
+        ATTR_END: end.isoformat(),
+        ATTR_OFF_PEAK_HOURS_RANGES: hphc_schedule.as_string(),
+        'hours': len(consumption),
+        'results': results,
+    }
+
+
+async def async_get_price_timeline(hass: HomeAssistant, call: ServiceCall) -> dict[str, Any]:
+    """Retourne la chronologie des prix précalculée par le coordinator."""
+    coordinator = get_coordinator(hass, call)
+    now = dt_util.now()
+    coordinator.advance_price_timeline(now)
+    return {
+        'contract_type': coordinator.contract_type,
+        'contract_power': coordinator.contract_power,
+        'currency': 'EUR',
+        'timeline': coordinator.price_timeline.as_list(),
+    }
+
+
+async def async_find_cheapest_window(hass: HomeAssistant, call: ServiceCall) -> dict[str, Any]:
+    """Cherche l'heure de début la moins chère pour une consommation de durée donnée."""
+    coordinator = get_coordinator(hass, call)
+    now = dt_util.now()
+    duration = call.data[ATTR_DURATION]
+    if ATTR_DEADLINE in call.data:
+        deadline = min(as_aware(call.data[ATTR_DEADLINE]), now + CHEAPEST_WINDOW_MAX_HORIZON)
+    else:
+        deadline = now + coordinator.price_timeline.horizon
+    if deadline - now < duration:
+        raise HomeAssistantError("La durée demandée ne tient pas avant l'échéance")
+
+    window = plan_cheapest_window(
+        coordinator.contract_type,
+        coordinator.get_price_segments(now, deadline),
+        coordinator.get_variable_price,
+        now,
+        deadline,
+        duration,
+        call.data[ATTR_POWER_PROFILE],
+        CHEAPEST_WINDOW_SLOT,
+    )
+    if window is None:
+        raise HomeAssistantError("Aucune fenêtre dont le prix est connu avant l'échéance")
+
+    return {
+        ATTR_DEADLINE: deadline.isoformat(),
+        'currency': 'EUR',
+        **window,
+    }
+
+
+async def async_get_prices(hass: HomeAssistant, call: ServiceCall) -> dict[str, Any]:
+    """Prix applicables à une liste d'instants, résolus en un seul parcours."""
+    coordinator = get_coordinator(hass, call)
+    contract_type = coordinator.contract_type
+    timestamps = [as_aware(when) for when in call.data[ATTR_TIMESTAMPS]]
+
+    # Les couleurs sont relevées ici, sur la boucle d'événements : le parcours
+    # ne lit qu'une copie, pas l'état du coordinator qui peut changer entre-temps
+    colors: dict[date, tuple[str | None, float | None]] = {}
+    if contract_type == CONTRACT_TYPE_TEMPO:
+        for billing_day in {get_tempo_billing_day(dt_util.as_local(when)) for when in timestamps}:
+            colors[billing_day] = coordinator.get_tempo_color(billing_day)
+
+    # Plusieurs milliers d'instants : le parcours est fait hors de la boucle d'événements
+    prices = await hass.async_add_executor_job(
+        price_timestamps,
+        contract_type,
+        coordinator.contract_power,
+        coordinator.tarif_table,
+        coordinator.off_peak_schedule,
+        lambda day: colors.get(day, (None, None)),
+        timestamps,
+    )
+    return {
+        'currency': 'EUR',
+        'prices': prices,
+    }
+
+
+async def async_get_tempo_color_history(hass: HomeAssistant, call: ServiceCall) -> dict[str, Any]:
+    """Couleurs Tempo connues de chaque saison enregistrée, lues en mémoire sans requête."""
+    history = (await async_get_tempo_history(hass)).history
+    return {
+        'seasons': {
+            get_tempo_season_name(season): history.season_colors(season)
+            for season in history.seasons
+        },
+    }
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Tarif EDF services."""
+
+    async def _async_compute_cost(call: ServiceCall) -> dict[str, Any]:
+        return await async_compute_cost(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_COMPUTE_COST,
+        _async_compute_cost,
+        schema=COMPUTE_COST_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def _async_compare_contracts(call: ServiceCall) -> dict[str, Any]:
+        return await async_compare_contracts(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_COMPARE_CONTRACTS,
+        _async_compare_contracts,
+        schema=COMPARE_CONTRACTS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def _async_get_price_timeline(call: ServiceCall) -> dict[str, Any]:
+        return await async_get_price_timeline(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_PRICE_TIMELINE,
+        _async_get_price_timeline,
+        schema=GET_PRICE_TIMELINE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def _async_find_cheapest_window(call: ServiceCall) -> dict[str, Any]:
+        return await async_find_cheapest_window(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FIND_CHEAPEST_WINDOW,
+        _async_find_cheapest_window,
+        schema=FIND_CHEAPEST_WINDOW_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def _async_get_prices(call: ServiceCall) -> dict[str, Any]:
+        return await async_get_prices(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_PRICES,
+        _async_get_prices,
+        schema=GET_PRICES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def _async_get_tempo_history(call: ServiceCall) -> dict[str, Any]:
+        return await async_get_tempo_color_history(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_TEMPO_HISTORY,
+        _async_get_tempo_history,
+        schema=GET_TEMPO_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,282 @@
+"""Data sources for the Tarif EDF integration."""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .api import FetchResponse, SingleFlight, async_fetch
+from .const import (
+    CONF_DATA_SOURCE,
+    CONF_PATH,
+    CONF_PUBLISH_PATH,
+    DATA_SOURCE_HTTP,
+    DATA_SOURCE_KEY,
+    DATA_SOURCE_MIRROR,
+    DATA_SOURCE_REPLAY,
+    DOMAIN,
+    DOMAIN_CONFIG_KEY,
+    ENDPOINT_TARIF,
+    ENDPOINT_TEMPO_DAY,
+    ENDPOINT_TEMPO_FORECAST,
+    ENDPOINT_TEMPO_HISTORY,
+    SINGLE_FLIGHT_KEY,
+    TARIF_URLS,
+    TEMPO_COLOR_API_URL,
+    TEMPO_FORECAST_API_URL,
+    TEMPO_HISTORY_API_URL,
+)
+from .metrics import get_metrics
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def get_resource_url(endpoint: str, key: str | None) -> str:
+    """URL en ligne d'une ressource : type de contrat, jour ou saison Tempo selon le point d'accès."""
+    if endpoint == ENDPOINT_TARIF:
+        return TARIF_URLS[key]
+    if endpoint == ENDPOINT_TEMPO_DAY:
+        return f"{TEMPO_COLOR_API_URL}/{key}"
+    if endpoint == ENDPOINT_TEMPO_HISTORY:
+        return f"{TEMPO_HISTORY_API_URL}?periode={key}"
+    return TEMPO_FORECAST_API_URL
+
+
+def get_resource_path(endpoint: str, key: str | None) -> str:
+    """Chemin relatif d'une ressource dans un miroir ou un enregistrement.
+
+    tarif/<type>.csv, jour_tempo/<AAAA-MM-JJ>.json, jours_tempo/<saison>.json
+    et prevision.json.
+    """
+    if endpoint == ENDPOINT_TARIF:
+        return f"{ENDPOINT_TARIF}/{key}.csv"
+    if endpoint in (ENDPOINT_TEMPO_DAY, ENDPOINT_TEMPO_HISTORY):
+        return f"{endpoint}/{key}.json"
+    return f"{ENDPOINT_TEMPO_FORECAST}.json"
+
+
+def _read_file(path: Path) -> tuple[bytes, str] | None:
+    """Contenu d'un fichier et son ETag (date de modification et taille), ou None s'il n'existe pas."""
+    try:
+        with path.open('rb') as file:
+            stat = os.fstat(file.fileno())
+            return file.read(), f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    except FileNotFoundError:
+        return None
+
+
+def _write_file(path: Path, content: bytes) -> None:
+    """Écrit le fichier d'un coup : un lecteur du miroir ne voit jamais un fichier partiel."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.tmp")
+    temporary.write_bytes(content)
+    os.replace(temporary, path)
+
+
+class DataSource(ABC):
+    """Origine des fichiers distants de l'intégration.
+
+    Chaque ressource est désignée par son point d'accès et une clé (type de
+    contrat, jour ou saison Tempo) ; la réponse a la forme d'une réponse HTTP
+    quelle que soit son origine, avec les mêmes en-têtes conditionnels.
+    """
+
+    name: str
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the data source."""
+        self.hass = hass
+
+    @abstractmethod
+    async def async_get(
+        self, endpoint: str, key: str | None = None, headers: dict[str, str] | None = None
+    ) -> FetchResponse:
+        """Ressource `key` du point d'accès `endpoint`."""
+
+    async def async_publish(self, endpoint: str, key: str | None, content: bytes) -> None:
+        """Écrit une ressource obtenue par ailleurs dans le miroir alimenté par cette source, s'il y en a un."""
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"type": self.name}
+
+
+class HttpDataSource(DataSource):
+    """Points d'accès en ligne (data.gouv.fr, api-couleur-tempo.fr, open-dpe.fr).
+
+    Avec `publish_path`, chaque réponse complète est aussi écrite dans ce
+    répertoire : l'instance devient le point de collecte unique d'un miroir
+    que les autres instances lisent avec MirrorDataSource.
+    """
+
+    name = DATA_SOURCE_HTTP
+
+    def __init__(self, hass: HomeAssistant, publish_path: str | None = None) -> None:
+        """Initialize the live data source."""
+        super().__init__(hass)
+        self.publish_path = None if publish_path is None else Path(publish_path)
+
+    async def async_get(
+        self, endpoint: str, key: str | None = None, headers: dict[str, str] | None = None
+    ) -> FetchResponse:
+        response = await async_fetch(self.hass, endpoint, get_resource_url(endpoint, key), headers)
+        if response.status == 200:
+            await self.async_publish(endpoint, key, response.content)
+        return response
+
+    async def async_publish(self, endpoint: str, key: str | None, content: bytes) -> None:
+        if self.publish_path is None:
+            return
+        path = self.publish_path / get_resource_path(endpoint, key)
+        try:
+            await self.hass.async_add_executor_job(_write_file, path, content)
+        except OSError as e:
+            _LOGGER.warning(f"Impossible de publier {path} dans le miroir: {e}")
+
+    def as_dict(self) -> dict[str, Any]:
+        return {**super().as_dict(), "publish_path": None if self.publish_path is None else str(self.publish_path)}
+
+
+class MirrorDataSource(DataSource):
+    """Miroir tenu à jour par une autre instance : répertoire local ou partagé, ou serveur HTTP du réseau local.
+
+    Un fichier absent est servi comme une réponse 404, un fichier inchangé
+    depuis la dernière lecture comme une réponse 304.
+    """
+
+    name = DATA_SOURCE_MIRROR
+
+    def __init__(self, hass: HomeAssistant, location: str) -> None:
+        """Initialize the mirror data source."""
+        super().__init__(hass)
+        self.location = location.rstrip('/')
+        self._is_url = location.startswith(('http://', 'https://'))
+
+    async def async_get(
+        self, endpoint: str, key: str | None = None, headers: dict[str, str] | None = None
+    ) -> FetchResponse:
+        resource = get_resource_path(endpoint, key)
+        if self._is_url:
+            return await async_fetch(self.hass, endpoint, f"{self.location}/{resource}", headers)
+
+        path = Path(self.location) / resource
+        started = time.perf_counter()
+        status = None
+        try:
+            result = await self.hass.async_add_executor_job(_read_file, path)
+            if result is None:
+                status = 404
+                return FetchResponse(str(path), status, {}, b'')
+            content, etag = result
+            status = 304 if (headers or {}).get('If-None-Match') == etag else 200
+            return FetchResponse(str(path), status, {'ETag': etag}, content if status == 200 else b'')
+        finally:
+            get_metrics(self.hass).record_request(endpoint, (time.perf_counter() - started) * 1000, status)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {**super().as_dict(), "path": self.location}
+
+
+class ReplayDataSource(DataSource):
+    """Rejeu hors ligne de fichiers enregistrés, pour des essais reproductibles.
+
+    L'enregistrement suit l'organisation d'un miroir et il est lu en mémoire
+    une seule fois. Un jour Tempo sans fichier `jour_tempo/` est déduit des
+    saisons enregistrées dans `jours_tempo/`, et renvoyé indéterminé s'il n'y
+    figure pas, comme le ferait l'API avant publication.
+    """
+
+    name = DATA_SOURCE_REPLAY
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        """Initialize the replay data source."""
+        super().__init__(hass)
+        self.path = Path(path)
+        self._files: dict[str, tuple[bytes, str]] | None = None
+        self._days: dict[str, dict[str, Any]] = {}
+        self._load_lock = asyncio.Lock()
+
+    def _load(self) -> None:
+        files = {}
+        for path in sorted(self.path.rglob('*')):
+            if path.is_file() and not path.name.startswith('.'):
+                content = path.read_bytes()
+                etag = f'"{hashlib.sha256(content).hexdigest()[:16]}"'
+                files[path.relative_to(self.path).as_posix()] = (content, etag)
+
+        days = {}
+        for resource, (content, _) in files.items():
+            if resource.startswith(f"{ENDPOINT_TEMPO_HISTORY}/"):
+                season = json.loads(content)
+                if isinstance(season, dict):
+                    season = season.get('hydra:member', [])
+                days.update((day['dateJour'], day) for day in season)
+        self._files = files
+        self._days = days
+
+    async def async_get(
+        self, endpoint: str, key: str | None = None, headers: dict[str, str] | None = None
+    ) -> FetchResponse:
+        async with self._load_lock:
+            if self._files is None:
+                await self.hass.async_add_executor_job(self._load)
+
+        resource = get_resource_path(endpoint, key)
+        url = f"{self.path}/{resource}"
+        started = time.perf_counter()
+        file = self._files.get(resource)
+        if file is not None:
+            content, etag = file
+            status = 304 if (headers or {}).get('If-None-Match') == etag else 200
+            response = FetchResponse(url, status, {'ETag': etag}, content if status == 200 else b'')
+        elif endpoint == ENDPOINT_TEMPO_DAY:
+            day = self._days.get(key, {'dateJour': key, 'codeJour': 0, 'periode': ''})
+            response = FetchResponse(url, 200, {}, json.dumps(day).encode())
+        else:
+            response = FetchResponse(url, 404, {}, b'')
+        get_metrics(self.hass).record_request(endpoint, (time.perf_counter() - started) * 1000, response.status)
+        return response
+
+    def as_dict(self) -> dict[str, Any]:
+        return {**super().as_dict(), "path": str(self.path), "files": None if self._files is None else len(self._files)}
+
+
+def create_data_source(hass: HomeAssistant, config: dict[str, Any]) -> DataSource:
+    """Crée la source de données décrite par la configuration YAML du domaine."""
+    source = config.get(CONF_DATA_SOURCE, DATA_SOURCE_HTTP)
+    if source == DATA_SOURCE_MIRROR:
+        return MirrorDataSource(hass, config[CONF_PATH])
+    if source == DATA_SOURCE_REPLAY:
+        return ReplayDataSource(hass, config[CONF_PATH])
+    return HttpDataSource(hass, config.get(CONF_PUBLISH_PATH))
+
+
+def set_data_source(hass: HomeAssistant, source: DataSource) -> None:
+    hass.data.setdefault(DOMAIN, {})[DATA_SOURCE_KEY] = source
+    _LOGGER.debug(f"Source de données: {source.as_dict()}")
+
+
+def get_data_source(hass: HomeAssistant) -> DataSource:
+    """Retourne la source de données du domaine, créée au premier usage depuis la configuration YAML."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_SOURCE_KEY not in domain_data:
+        set_data_source(hass, create_data_source(hass, domain_data.get(DOMAIN_CONFIG_KEY, {})))
+    return domain_data[DATA_SOURCE_KEY]
+
+
+async def async_get_shared(hass: HomeAssistant, endpoint: str, key: str | None = None) -> FetchResponse:
+    """Comme `DataSource.async_get`, mais une seule requête par ressource est en
+    cours à la fois, quelle que soit l'entrée qui la demande."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if SINGLE_FLIGHT_KEY not in domain_data:
+        domain_data[SINGLE_FLIGHT_KEY] = SingleFlight()
+    return await domain_data[SINGLE_FLIGHT_KEY].async_run(
+        f"{endpoint}/{key}", lambda: get_data_source(hass).async_get(endpoint, key)
+    )
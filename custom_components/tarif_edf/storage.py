@@ -0,0 +1,54 @@
+"""Persistent storage for the Tarif EDF integration."""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import STATE_STORAGE_KEY, STATE_STORAGE_VERSION, STORAGE_KEY, STORAGE_VERSION
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TarifEdfStateStore(Store):
+    """Stockage de l'état partagé par toutes les entrées : cache Tempo, prévisions et tarifs par contrat et puissance."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the store."""
+        super().__init__(hass, STATE_STORAGE_VERSION, STATE_STORAGE_KEY)
+
+
+class TarifEdfStore(Store):
+    """Ancien stockage par entrée du cache Tempo et du dernier état valide.
+
+    Il n'est plus écrit : il est lu une fois pour reprendre son contenu dans
+    l'état partagé, puis supprimé avec l'entrée.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the store."""
+        super().__init__(hass, STORAGE_VERSION, f"{STORAGE_KEY}_{entry_id}")
+
+    async def _async_migrate_func(
+        self, old_major_version: int, old_minor_version: int, old_data: dict[str, Any]
+    ) -> dict[str, Any]:
+        data = old_data
+        if old_major_version < 2:
+            # v1 : clés à plat -> v2 : une entrée {date, couleur} par jour
+            data = {
+                'aujourdhui': {
+                    'date': old_data.get('tempo_aujourdhui_date'),
+                    'couleur': old_data.get('tempo_couleur_aujourdhui'),
+                },
+                'demain': {
+                    'date': old_data.get('tempo_demain_date'),
+                    'couleur': old_data.get('tempo_couleur_demain'),
+                },
+            }
+            _LOGGER.debug(f"Cache Tempo migré de la version {old_major_version} à 2")
+        if old_major_version < 3:
+            # v3 : ajout du dernier état valide, restauré au démarrage
+            data = {**data, 'snapshot': None}
+        return data
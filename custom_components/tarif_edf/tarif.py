@@ -0,0 +1,144 @@
+"""Tariff tables parsed from the data.gouv.fr CSV files."""
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from .const import CONTRACT_TYPE_BASE, CONTRACT_TYPE_HPHC, TARIF_PRICE_KEYS
+
+# Les colonnes TTC commencent à l'index 4 et alternent avec les colonnes HT
+TARIF_FIRST_TTC_COLUMN = 4
+TARIF_DATE_FORMATS = ('%d/%m/%Y', '%Y-%m-%d')
+
+
+def parse_tarif_date(value: str) -> date | None:
+    value = value.strip()
+    if value == '':
+        return None
+    for date_format in TARIF_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Date de tarif invalide: {value}")
+
+
+def get_variable_price_key(contract_type: str, period: str | None = None, color: str | None = None) -> str:
+    """Clé du prix du kWh : `base_variable_ttc`, `hphc_variable_hc_ttc`, `tempo_variable_hp_rouge_ttc`..."""
+    if contract_type == CONTRACT_TYPE_BASE:
+        return 'base_variable_ttc'
+    if contract_type == CONTRACT_TYPE_HPHC:
+        return f"hphc_variable_{period}_ttc"
+    return f"tempo_variable_{period}_{color}_ttc"
+
+
+@dataclass(frozen=True)
+class TarifVersion:
+    """Prix TTC d'une puissance souscrite sur une période de validité."""
+
+    power: str
+    start: date
+    end: date | None
+    prices: dict[str, float]
+
+    def is_valid_on(self, day: date) -> bool:
+        return self.start <= day and (self.end is None or day <= self.end)
+
+
+class TarifTable:
+    """Index des versions tarifaires d'un type de contrat, par puissance et par date."""
+
+    def __init__(self, contract_type: str, versions: Iterable[TarifVersion]) -> None:
+        """Initialize the table."""
+        self.contract_type = contract_type
+        self._versions: dict[str, list[TarifVersion]] = {}
+        self._starts: dict[str, list[date]] = {}
+        self._current: dict[str, TarifVersion] = {}
+
+        by_power: dict[str, dict[date, TarifVersion]] = {}
+        for version in versions:
+            # En cas de doublon sur une même date de début, la dernière ligne l'emporte
+            by_power.setdefault(version.power, {})[version.start] = version
+
+        for power, by_start in by_power.items():
+            ordered = [by_start[start] for start in sorted(by_start)]
+            self._versions[power] = ordered
+            self._starts[power] = [version.start for version in ordered]
+            open_ended = [version for version in ordered if version.end is None]
+            if open_ended:
+                self._current[power] = open_ended[-1]
+
+    @property
+    def powers(self) -> list[str]:
+        return sorted(self._versions, key=int)
+
+    def versions(self, power: str) -> list[TarifVersion]:
+        return self._versions.get(power, [])
+
+    def current(self, power: str) -> TarifVersion | None:
+        """Version en vigueur (sans date de fin) pour une puissance."""
+        return self._current.get(power)
+
+    def at(self, power: str, day: date) -> TarifVersion | None:
+        """Version applicable à une date donnée, par recherche dichotomique."""
+        starts = self._starts.get(power)
+        if not starts:
+            return None
+        index = bisect_right(starts, day) - 1
+        if index < 0:
+            return None
+        version = self._versions[power][index]
+        return version if version.is_valid_on(day) else None
+
+    def price_at(
+        self, power: str, day: date, period: str | None = None, color: str | None = None
+    ) -> float | None:
+        """Prix TTC du kWh en vigueur à une date, pour une période (hp/hc) et une couleur Tempo."""
+        version = self.at(power, day)
+        if version is None:
+            return None
+        return version.prices.get(get_variable_price_key(self.contract_type, period, color))
+
+
+def parse_tarif_row(contract_type: str, row: list[str]) -> TarifVersion | None:
+    """Version tarifaire d'une ligne du fichier, ou None pour une ligne d'en-tête ou incomplète."""
+    price_keys = TARIF_PRICE_KEYS[contract_type]
+    row = [value.strip() for value in row]
+    last_column = TARIF_FIRST_TTC_COLUMN + 2 * (len(price_keys) - 1)
+    if len(row) <= last_column or row[2] == '':
+        return None
+
+    try:
+        start = parse_tarif_date(row[0])
+        end = parse_tarif_date(row[1])
+        prices = {
+            key: float(row[TARIF_FIRST_TTC_COLUMN + 2 * i].replace(",", "."))
+            for i, key in enumerate(price_keys)
+        }
+    except ValueError:
+        # Ligne d'en-tête ou ligne incomplète
+        return None
+
+    if start is None:
+        return None
+
+    return TarifVersion(row[2], start, end, prices)
+
+
+def parse_tarif_table(contract_type: str, content: bytes) -> TarifTable:
+    """Analyse en un seul parcours le contenu d'un fichier tarifaire CSV (séparateur `;`).
+
+    Les fichiers ne font que quelques kilo-octets et sont déjà entièrement
+    reçus : ils sont lus ligne à ligne par `csv.reader`, sans liste
+    intermédiaire de toutes les lignes, et chaque ligne devient une version
+    de la table.
+    """
+    # Importés ici : l'analyse n'a lieu que dans l'exécuteur, jamais au démarrage
+    import csv
+    import io
+
+    rows = csv.reader(io.StringIO(content.decode('utf-8-sig')), delimiter=';')
+    versions = [version for row in rows if (version := parse_tarif_row(contract_type, row)) is not None]
+    return TarifTable(contract_type, versions)
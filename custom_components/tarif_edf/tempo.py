@@ -0,0 +1,240 @@
+"""Tempo color history for the Tarif EDF integration."""
+from __future__ import annotations
+
+import asyncio
+import base64
+from datetime import date, datetime, timedelta
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    ENDPOINT_TEMPO_HISTORY,
+    REQUEST_ERROR_BACKOFF_MAX,
+    REQUEST_ERROR_BACKOFF_MIN,
+    TEMPO_COLORS_MAPPING,
+    TEMPO_DAY_START_AT,
+    TEMPO_HISTORY_KEY,
+    TEMPO_HISTORY_SAVE_DELAY,
+    TEMPO_HISTORY_STORAGE_KEY,
+    TEMPO_HISTORY_STORAGE_VERSION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Une saison Tempo court du 1er septembre au 31 août
+TEMPO_SEASON_START_MONTH = 9
+TEMPO_SEASON_BYTES = (366 * 2 + 7) // 8
+_day_start = datetime.strptime(TEMPO_DAY_START_AT, '%H:%M')
+TEMPO_DAY_START_OFFSET = timedelta(hours=_day_start.hour, minutes=_day_start.minute)
+
+
+def get_tempo_season(day: date) -> int:
+    """Année de début de la saison Tempo contenant `day`."""
+    return day.year if day.month >= TEMPO_SEASON_START_MONTH else day.year - 1
+
+
+def get_tempo_billing_day(when: datetime) -> date:
+    """Jour Tempo dont la couleur s'applique à l'instant `when` (heure locale).
+
+    Un jour Tempo commence à TEMPO_DAY_START_AT : à 03:00 c'est encore la
+    couleur de la veille qui est facturée.
+    """
+    return (when - TEMPO_DAY_START_OFFSET).date()
+
+
+def get_tempo_season_name(season: int) -> str:
+    return f"{season}-{season + 1}"
+
+
+def _season_offset(day: date) -> tuple[int, int]:
+    season = get_tempo_season(day)
+    return season, (day - date(season, TEMPO_SEASON_START_MONTH, 1)).days
+
+
+class TempoColorHistory:
+    """Historique des couleurs Tempo, encodé sur 2 bits par jour.
+
+    Chaque saison tient dans un bytearray de 92 octets où le code de la
+    couleur (0 = inconnue, 1 = bleu, 2 = blanc, 3 = rouge) du n-ième jour
+    occupe les bits 2n et 2n+1.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty history."""
+        self._seasons: dict[int, bytearray] = {}
+
+    def get(self, day: date) -> int:
+        season, offset = _season_offset(day)
+        colors = self._seasons.get(season)
+        if colors is None:
+            return 0
+        return (colors[offset >> 2] >> ((offset & 3) << 1)) & 3
+
+    def set(self, day: date, code: int) -> bool:
+        """Enregistre la couleur d'un jour ; retourne True si elle a changé."""
+        if code not in TEMPO_COLORS_MAPPING:
+            raise ValueError(f"Code couleur Tempo invalide: {code}")
+        if self.get(day) == code:
+            return False
+        season, offset = _season_offset(day)
+        colors = self._seasons.setdefault(season, bytearray(TEMPO_SEASON_BYTES))
+        shift = (offset & 3) << 1
+        colors[offset >> 2] = (colors[offset >> 2] & ~(3 << shift) & 0xFF) | (code << shift)
+        return True
+
+    @property
+    def seasons(self) -> list[int]:
+        return sorted(self._seasons)
+
+    def missing_days(self, first_day: date, last_day: date) -> list[date]:
+        """Jours sans couleur connue entre `first_day` et `last_day` inclus."""
+        missing = []
+        day = first_day
+        while day <= last_day:
+            if not self.get(day):
+                missing.append(day)
+            day += timedelta(days=1)
+        return missing
+
+    def season_colors(self, season: int) -> dict[str, str]:
+        """Couleurs connues d'une saison, par date ISO."""
+        first_day = date(season, TEMPO_SEASON_START_MONTH, 1)
+        last_day = date(season + 1, TEMPO_SEASON_START_MONTH, 1)
+        colors = {}
+        day = first_day
+        while day < last_day:
+            code = self.get(day)
+            if code:
+                colors[day.isoformat()] = TEMPO_COLORS_MAPPING[code]
+            day += timedelta(days=1)
+        return colors
+
+    def as_dict(self) -> dict[str, str]:
+        return {
+            str(season): base64.b64encode(bytes(colors)).decode('ascii')
+            for season, colors in self._seasons.items()
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, str]) -> TempoColorHistory:
+        history = cls()
+        for season, encoded in data.items():
+            colors = bytearray(base64.b64decode(encoded))
+            colors.extend(bytes(TEMPO_SEASON_BYTES - len(colors)))
+            history._seasons[int(season)] = colors
+        return history
+
+
+class TempoHistoryStore:
+    """Historique Tempo persistant, partagé par toutes les entrées."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the store."""
+        self.hass = hass
+        self.history = TempoColorHistory()
+        self._store = Store(hass, TEMPO_HISTORY_STORAGE_VERSION, TEMPO_HISTORY_STORAGE_KEY)
+        self._backfill_lock = asyncio.Lock()
+
+    async def async_load(self) -> None:
+        stored_data = await self._store.async_load()
+        if stored_data:
+            self.history = TempoColorHistory.from_dict(stored_data.get('seasons', {}))
+            _LOGGER.debug(f"Historique Tempo chargé: saisons {self.history.seasons}")
+
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            'seasons': self.history.as_dict(),
+        }
+
+    def get(self, day: date) -> int:
+        return self.history.get(day)
+
+    def set(self, day: date, code: int) -> None:
+        if self.history.set(day, code):
+            self._store.async_delay_save(self._data_to_save, TEMPO_HISTORY_SAVE_DELAY)
+
+    async def async_backfill(self) -> None:
+        """Complète en une requête par saison les jours passés manquants des saisons courante et précédente.
+
+        Au premier démarrage toute la saison manque ; ensuite seuls les jours
+        manqués pendant un arrêt de Home Assistant, les trois jours courants
+        étant récupérés un par un.
+        """
+        # Module chargé dans l'executor par le moteur avant le premier appel réseau
+        from .api import get_request_backoff
+
+        now = dt_util.now()
+        yesterday = now.date() - timedelta(days=1)
+        current_season = get_tempo_season(now.date())
+        backoff = get_request_backoff(self.hass)
+        async with self._backfill_lock:
+            for season in (current_season - 1, current_season):
+                season_name = get_tempo_season_name(season)
+                first_day = date(season, TEMPO_SEASON_START_MONTH, 1)
+                last_day = min(date(season + 1, TEMPO_SEASON_START_MONTH, 1) - timedelta(days=1), yesterday)
+                if not self.history.missing_days(first_day, last_day):
+                    continue
+                if not backoff.is_allowed(ENDPOINT_TEMPO_HISTORY, season_name, now):
+                    continue
+                try:
+                    changed = await self._async_backfill_season(season)
+                except Exception as e:
+                    retry_at = backoff.defer(
+                        ENDPOINT_TEMPO_HISTORY, season_name, now, REQUEST_ERROR_BACKOFF_MIN, REQUEST_ERROR_BACKOFF_MAX
+                    )
+                    _LOGGER.warning(
+                        f"Impossible de récupérer l'historique Tempo {season_name}, nouvelle tentative à {retry_at}: {e}"
+                    )
+                    continue
+                if changed:
+                    self._store.async_delay_save(self._data_to_save, TEMPO_HISTORY_SAVE_DELAY)
+
+                missing = self.history.missing_days(first_day, last_day)
+                if missing:
+                    # Jours absents de la réponse : la saison est redemandée plus tard
+                    retry_at = backoff.defer(
+                        ENDPOINT_TEMPO_HISTORY, season_name, now, REQUEST_ERROR_BACKOFF_MIN, REQUEST_ERROR_BACKOFF_MAX
+                    )
+                    _LOGGER.debug(
+                        f"Historique Tempo {season_name}: {len(missing)} jours manquants, nouvelle tentative à {retry_at}"
+                    )
+                else:
+                    backoff.reset(ENDPOINT_TEMPO_HISTORY, season_name)
+
+    async def _async_backfill_season(self, season: int) -> int:
+        """Récupère les couleurs d'une saison ; retourne le nombre de jours ajoutés ou modifiés."""
+        from .sources import get_data_source
+
+        response = await get_data_source(self.hass).async_get(ENDPOINT_TEMPO_HISTORY, get_tempo_season_name(season))
+        response.raise_for_status()
+        days = response.json()
+        if isinstance(days, dict):
+            days = days.get('hydra:member', [])
+
+        count = changed = 0
+        for day in days:
+            code = day.get('codeJour', 0)
+            if code in (1, 2, 3):
+                changed += self.history.set(date.fromisoformat(day['dateJour']), code)
+                count += 1
+        _LOGGER.info(f"Historique Tempo {get_tempo_season_name(season)} récupéré: {count} jours, {changed} nouveaux")
+        return changed
+
+
+async def async_get_tempo_history(hass: HomeAssistant) -> TempoHistoryStore:
+    """Retourne l'historique Tempo du domaine, chargé depuis le disque au premier appel."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if TEMPO_HISTORY_KEY not in domain_data:
+        domain_data[TEMPO_HISTORY_KEY] = hass.async_create_task(_async_load_tempo_history(hass))
+    return await asyncio.shield(domain_data[TEMPO_HISTORY_KEY])
+
+
+async def _async_load_tempo_history(hass: HomeAssistant) -> TempoHistoryStore:
+    history = TempoHistoryStore(hass)
+    await history.async_load()
+    return history
@@ -0,0 +1,137 @@
+"""Rolling price timeline for the Tarif EDF integration."""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Any
+
+from .schedule import OffPeakSchedule
+
+
+@dataclass(frozen=True)
+class PriceSegment:
+    """Intervalle de temps pendant lequel le prix du kWh ne change pas."""
+
+    start: datetime
+    end: datetime
+    price: float | None
+    period: str | None
+    color: str | None
+    probability: float | None = None
+
+    @property
+    def key(self) -> tuple:
+        return (self.price, self.period, self.color, self.probability)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Forme compacte : les champs sans valeur sont omis."""
+        segment = {'start': self.start.isoformat(), 'end': self.end.isoformat()}
+        for name, value in zip(('price', 'period', 'color', 'probability'), self.key):
+            if value is not None:
+                segment[name] = value
+        return segment
+
+
+def iter_price_changes(start: datetime, schedule: OffPeakSchedule, extra: Iterable[time] = ()) -> Iterator[datetime]:
+    """Instants où le prix peut changer, strictement après `start`.
+
+    Ce sont les basculements HP/HC, minuit (changement de version tarifaire)
+    et les heures supplémentaires données (début du jour Tempo).
+    """
+    minutes = sorted(set(schedule.changes) | {0} | {at.hour * 60 + at.minute for at in extra})
+    day = start.date()
+    while True:
+        for minute in minutes:
+            when = datetime.combine(day, time(minute // 60, minute % 60), tzinfo=start.tzinfo)
+            if when > start:
+                yield when
+        day += timedelta(days=1)
+
+
+class PriceTimeline:
+    """Suite de segments de prix couvrant au moins `horizon` à partir de maintenant.
+
+    La chronologie est prolongée au fil du temps : seuls les segments passés
+    sont retirés et seuls les nouveaux instants sont évalués. Elle n'est
+    reconstruite entièrement que lorsque les prix ou les couleurs changent.
+    """
+
+    def __init__(
+        self,
+        schedule: OffPeakSchedule,
+        resolve: Callable[[datetime], dict[str, Any]],
+        horizon: timedelta,
+        extra_changes: Iterable[time] = (),
+    ) -> None:
+        """Initialize the timeline."""
+        self.schedule = schedule
+        self.horizon = horizon
+        self._resolve = resolve
+        self._extra_changes = tuple(extra_changes)
+        self.segments: list[PriceSegment] = []
+        self._as_list: list[dict[str, Any]] | None = None
+
+    def rebuild(self, now: datetime) -> bool:
+        """Recalcule toute la chronologie à partir de `now`.
+
+        Retourne True si la chronologie a changé.
+        """
+        previous, previous_list = self.segments, self._as_list
+        self.segments = []
+        self.advance(now)
+        if self.segments == previous:
+            # Forme sérialisable déjà calculée : elle reste valable
+            self._as_list = previous_list
+            return False
+        return True
+
+    def advance(self, now: datetime) -> bool:
+        """Retire les segments terminés et prolonge jusqu'à `now + horizon`.
+
+        Retourne True si la chronologie a changé.
+        """
+        changed = False
+        first_current = 0
+        while first_current < len(self.segments) and self.segments[first_current].end <= now:
+            first_current += 1
+        if first_current:
+            del self.segments[:first_current]
+            changed = True
+
+        until = now + self.horizon
+        start = self.segments[-1].end if self.segments else now
+        if start >= until:
+            return changed
+
+        for end in iter_price_changes(start, self.schedule, self._extra_changes):
+            price = self._resolve(start)
+            segment = PriceSegment(
+                start, end, price['price'], price['period'], price['color'], price.get('probability')
+            )
+            if self.segments and self.segments[-1].end == start and self.segments[-1].key == segment.key:
+                # Même prix que le segment précédent : on le prolonge
+                segment = PriceSegment(self.segments[-1].start, end, *segment.key)
+                self.segments[-1] = segment
+            else:
+                self.segments.append(segment)
+            changed = True
+            start = end
+            if start >= until:
+                break
+
+        if changed:
+            self._as_list = None
+        return changed
+
+    def current(self, now: datetime) -> PriceSegment | None:
+        for segment in self.segments:
+            if segment.start <= now < segment.end:
+                return segment
+        return None
+
+    def as_list(self) -> list[dict[str, Any]]:
+        """Segments sous forme sérialisable, recalculés uniquement après un changement."""
+        if self._as_list is None:
+            self._as_list = [segment.as_dict() for segment in self.segments]
+        return self._as_list
@@ -0,0 +1 @@
+"""Tests for the Tarif EDF integration."""
@@ -0,0 +1,20 @@
+"""Shared fixtures for the Tarif EDF tests."""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+TIME_ZONE = ZoneInfo("Europe/Paris")
+
+
+@pytest.fixture(autouse=True)
+def paris_time_zone() -> Iterator[None]:
+    """Les calculs se font en heure locale française, changements d'heure compris."""
+    previous = dt_util.DEFAULT_TIME_ZONE
+    dt_util.set_default_time_zone(TIME_ZONE)
+    yield
+    dt_util.set_default_time_zone(previous)
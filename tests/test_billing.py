@@ -0,0 +1,143 @@
+"""Tests of the bill computation."""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+from custom_components.tarif_edf.billing import (
+    compare_contracts,
+    compute_cost,
+    count_hours_per_day,
+    price_timestamps,
+)
+from custom_components.tarif_edf.const import HOURS_PER_YEAR
+from custom_components.tarif_edf.schedule import OffPeakSchedule
+from custom_components.tarif_edf.tarif import TarifTable, TarifVersion
+
+from .conftest import TIME_ZONE
+
+SCHEDULE = OffPeakSchedule.parse("22:00-06:00")
+
+BASE_TABLE = TarifTable('base', [
+    TarifVersion('6', date(2024, 8, 1), date(2025, 1, 31), {'base_fixe_ttc': 150.0, 'base_variable_ttc': 0.25}),
+    TarifVersion('6', date(2025, 2, 1), None, {'base_fixe_ttc': 180.0, 'base_variable_ttc': 0.20}),
+])
+HPHC_TABLE = TarifTable('hphc', [
+    TarifVersion('6', date(2024, 8, 1), None, {
+        'hphc_fixe_ttc': 160.0, 'hphc_variable_hc_ttc': 0.20, 'hphc_variable_hp_ttc': 0.27,
+    }),
+])
+TEMPO_TABLE = TarifTable('tempo', [
+    TarifVersion('6', date(2024, 8, 1), None, {
+        'tempo_fixe_ttc': 165.0,
+        'tempo_variable_hc_bleu_ttc': 0.13, 'tempo_variable_hp_bleu_ttc': 0.16,
+        'tempo_variable_hc_blanc_ttc': 0.15, 'tempo_variable_hp_blanc_ttc': 0.19,
+        'tempo_variable_hc_rouge_ttc': 0.16, 'tempo_variable_hp_rouge_ttc': 0.76,
+    }),
+])
+
+
+def at(month: int, day: int, hour: int, minute: int = 0) -> datetime:
+    return datetime(2025, month, day, hour, minute, tzinfo=TIME_ZONE)
+
+
+def hourly(start: datetime, hours: int, kwh: float = 1.0) -> list[tuple[datetime, float]]:
+    return [(start + timedelta(hours=hour), kwh) for hour in range(hours)]
+
+
+def test_count_hours_per_day_across_dst() -> None:
+    hours = count_hours_per_day(at(3, 29, 0), at(4, 1, 0))
+    assert hours == {date(2025, 3, 29): 24, date(2025, 3, 30): 23, date(2025, 3, 31): 24}
+    hours = count_hours_per_day(at(10, 26, 0), at(10, 27, 0))
+    assert hours == {date(2025, 10, 26): 25}
+
+
+def test_subscription_prorated_per_hour() -> None:
+    result = compute_cost('base', '6', BASE_TABLE, SCHEDULE, lambda day: None, at(1, 15, 0), at(1, 15, 12), [])
+    assert result['subscription_cost'] == round(12 * 150.0 / HOURS_PER_YEAR, 2)
+    assert result['variable_cost'] == 0.0
+
+
+def test_subscription_prorated_across_version_change() -> None:
+    start, end = at(1, 21, 0), at(2, 11, 0)
+    result = compute_cost('base', '6', BASE_TABLE, SCHEDULE, lambda day: None, start, end, [])
+    expected = (11 * 24 * 150.0 + 10 * 24 * 180.0) / HOURS_PER_YEAR
+    assert result['subscription_cost'] == round(expected, 2)
+
+
+def test_variable_cost_uses_version_of_each_day() -> None:
+    consumption = hourly(at(1, 31, 22), 4, 1.5)
+    result = compute_cost('base', '6', BASE_TABLE, SCHEDULE, lambda day: None, at(1, 31, 22), at(2, 1, 2), consumption)
+    assert result['energy_kwh'] == 6.0
+    assert result['variable_cost'] == round(3 * 0.25 + 3 * 0.20, 2)
+
+
+def test_hphc_splits_hour_at_off_peak_boundary() -> None:
+    schedule = OffPeakSchedule.parse("21:30-05:30")
+    consumption = hourly(at(1, 15, 21), 1, 2.0) + hourly(at(1, 16, 5), 1, 2.0)
+    result = compute_cost('hphc', '6', HPHC_TABLE, schedule, lambda day: None, at(1, 15, 21), at(1, 16, 6), consumption)
+    assert result['breakdown'] == {
+        'hc': {'energy_kwh': 2.0, 'cost': 0.4},
+        'hp': {'energy_kwh': 2.0, 'cost': 0.54},
+    }
+
+
+def test_tempo_billing_day_starts_at_six() -> None:
+    colors = {date(2025, 1, 14): 'rouge', date(2025, 1, 15): 'bleu'}
+    consumption = hourly(at(1, 15, 5), 2)
+    result = compute_cost('tempo', '6', TEMPO_TABLE, SCHEDULE, colors.get, at(1, 15, 5), at(1, 15, 7), consumption)
+    assert result['breakdown'] == {
+        'hc_rouge': {'energy_kwh': 1.0, 'cost': 0.16},
+        'hp_bleu': {'energy_kwh': 1.0, 'cost': 0.16},
+    }
+    assert result['unpriced_energy_kwh'] == 0.0
+
+
+def test_tempo_without_color_is_unpriced() -> None:
+    consumption = hourly(at(1, 15, 12), 3)
+    result = compute_cost('tempo', '6', TEMPO_TABLE, SCHEDULE, lambda day: None, at(1, 15, 12), at(1, 15, 15), consumption)
+    assert result['unpriced_energy_kwh'] == 3.0
+    assert result['unpriced_hours'] == 3
+    assert result['variable_cost'] == 0.0
+
+
+def test_consumption_before_first_version_is_unpriced() -> None:
+    consumption = hourly(datetime(2024, 7, 31, 23, 0, tzinfo=TIME_ZONE), 2)
+    result = compute_cost(
+        'base', '6', BASE_TABLE, SCHEDULE, lambda day: None,
+        datetime(2024, 7, 31, 23, 0, tzinfo=TIME_ZONE), datetime(2024, 8, 1, 1, 0, tzinfo=TIME_ZONE), consumption,
+    )
+    assert result['energy_kwh'] == 1.0
+    assert result['unpriced_energy_kwh'] == 1.0
+    assert result['unpriced_hours'] == 1
+
+
+def test_compare_contracts_ranks_complete_results_first() -> None:
+    consumption = hourly(at(1, 15, 0), 24)
+    results = compare_contracts(
+        {'base': BASE_TABLE, 'hphc': HPHC_TABLE, 'tempo': TEMPO_TABLE},
+        {'base': OffPeakSchedule.parse(None), 'hphc': SCHEDULE, 'tempo': SCHEDULE},
+        ['6', '9'],
+        lambda day: None,
+        at(1, 15, 0), at(1, 16, 0), consumption,
+    )
+    # Sans couleur, Tempo n'a que l'abonnement : le moins cher, mais incomplet
+    assert [(result['contract_type'], result['rank']) for result in results] == [('hphc', 1), ('base', 2), ('tempo', 3)]
+    assert results[-1]['total_cost'] < results[0]['total_cost']
+    assert results[-1]['unpriced_energy_kwh'] == 24.0
+
+
+def test_price_timestamps_keeps_input_order() -> None:
+    colors = {date(2025, 1, 14): ('rouge', None), date(2025, 1, 15): ('blanc', 0.7)}
+    timestamps = [at(1, 15, 6), at(1, 15, 5, 59)]
+    results = price_timestamps('tempo', '6', TEMPO_TABLE, SCHEDULE, colors.get, timestamps)
+    assert [(result['period'], result['color'], result['price'], result['probability']) for result in results] == [
+        ('hp', 'blanc', 0.19, 0.7),
+        ('hc', 'rouge', 0.16, None),
+    ]
+
+
+def test_price_timestamps_without_table() -> None:
+    results = price_timestamps('base', '6', None, SCHEDULE, lambda day: (None, None), [at(1, 15, 12)])
+    assert results == [
+        {'time': at(1, 15, 12).isoformat(), 'price': None, 'period': None, 'color': None, 'probability': None},
+    ]
@@ -0,0 +1,130 @@
+"""Tests of the cheapest window search."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import random
+
+import pytest
+
+from custom_components.tarif_edf.planner import (
+    expand_power_profile,
+    find_cheapest_window,
+    get_color_weights,
+    get_slot_prices,
+    plan_cheapest_window,
+)
+from custom_components.tarif_edf.timeline import PriceSegment
+
+from .conftest import TIME_ZONE
+
+START = datetime(2025, 1, 15, 20, 0, tzinfo=TIME_ZONE)
+
+
+def brute_force(prices, slot_hours, power_profile, window_slots):
+    """Référence : chaque fenêtre est recalculée créneau par créneau."""
+    powers = [0.0] * window_slots
+    for offset, length, power in expand_power_profile(power_profile, window_slots):
+        powers[offset:offset + length] = [power] * length
+    best = None
+    for first in range(len(prices) - window_slots + 1):
+        window = prices[first:first + window_slots]
+        if None in window:
+            continue
+        cost = slot_hours * sum(power * price for power, price in zip(powers, window))
+        if best is None or cost < best[1]:
+            best = (first, cost)
+    return best
+
+
+@pytest.mark.parametrize(
+    ("power_profile", "slots", "expected"),
+    [
+        ([2.0], 4, [(0, 4, 2.0)]),
+        ([1.0, 2.0], 3, [(0, 1, 1.0), (1, 2, 2.0)]),
+        ([1.0, 1.0, 3.0], 6, [(0, 4, 1.0), (4, 2, 3.0)]),
+        ([1.0, 2.0, 3.0], 2, [(0, 1, 2.0), (1, 1, 3.0)]),
+    ],
+)
+def test_expand_power_profile(power_profile, slots, expected) -> None:
+    assert expand_power_profile(power_profile, slots) == expected
+
+
+def test_find_cheapest_window_prefix_sums() -> None:
+    prices = [3.0, 1.0, 1.0, 5.0, 0.5, 0.5]
+    assert find_cheapest_window(prices, 0.5, [2.0], 2) == (4, pytest.approx(1.0))
+    assert find_cheapest_window(prices, 0.5, [2.0], 3) == (0, pytest.approx(5.0))
+
+
+def test_find_cheapest_window_skips_missing_prices() -> None:
+    prices = [3.0, 1.0, 1.0, 5.0, None, 0.0]
+    assert find_cheapest_window(prices, 1.0, [1.0], 2) == (1, 2.0)
+    assert find_cheapest_window(prices, 1.0, [1.0], 5) is None
+
+
+@pytest.mark.parametrize("window_slots", [0, 7])
+def test_find_cheapest_window_out_of_range(window_slots: int) -> None:
+    assert find_cheapest_window([1.0] * 6, 1.0, [1.0], window_slots) is None
+
+
+def test_find_cheapest_window_whole_range() -> None:
+    assert find_cheapest_window([1.0, 2.0, 3.0], 1.0, [1.0], 3) == (0, 6.0)
+
+
+def test_find_cheapest_window_matches_brute_force() -> None:
+    rng = random.Random(0)
+    for _ in range(200):
+        prices = [None if rng.random() < 0.1 else rng.uniform(0.1, 0.8) for _ in range(rng.randint(1, 30))]
+        window_slots = rng.randint(1, len(prices))
+        power_profile = [rng.uniform(0.5, 3.0) for _ in range(rng.randint(1, 4))]
+        expected = brute_force(prices, 0.25, power_profile, window_slots)
+        result = find_cheapest_window(prices, 0.25, power_profile, window_slots)
+        if expected is None:
+            assert result is None
+        else:
+            assert result[1] == pytest.approx(expected[1])
+
+
+def test_get_slot_prices_with_gap() -> None:
+    segments = [
+        PriceSegment(START, START + timedelta(hours=1), 0.3, 'hp', None),
+        PriceSegment(START + timedelta(hours=2), START + timedelta(hours=3), 0.2, 'hc', None),
+    ]
+    prices = get_slot_prices(segments, [0.3, 0.2], START, timedelta(minutes=30), 7)
+    assert prices == [0.3, 0.3, None, None, 0.2, 0.2, None]
+
+
+def test_get_color_weights() -> None:
+    assert get_color_weights('rouge', None) == {'rouge': 1.0}
+    weights = get_color_weights('blanc', 0.6)
+    assert weights['blanc'] == 0.6
+    assert weights['bleu'] == pytest.approx(0.4 * 300 / 322)
+    assert sum(get_color_weights(None, None).values()) == pytest.approx(1.0)
+
+
+def test_plan_cheapest_window_before_deadline() -> None:
+    segments = [
+        PriceSegment(START, START + timedelta(hours=2), 0.27, 'hp', None),
+        PriceSegment(START + timedelta(hours=2), START + timedelta(hours=10), 0.21, 'hc', None),
+    ]
+    plan = plan_cheapest_window(
+        'hphc', segments, lambda day, period, color: None,
+        START + timedelta(minutes=10), START + timedelta(hours=4),
+        timedelta(hours=1), [2.0], timedelta(minutes=30),
+    )
+    # Le début est aligné sur la grille des créneaux suivant `now`
+    assert plan == {
+        'start': (START + timedelta(hours=2)).isoformat(),
+        'end': (START + timedelta(hours=3)).isoformat(),
+        'energy_kwh': 2.0,
+        'cost': 0.42,
+        'average_price': 0.21,
+        'certain': True,
+    }
+
+
+def test_plan_cheapest_window_too_short() -> None:
+    segments = [PriceSegment(START, START + timedelta(hours=10), 0.2, None, None)]
+    assert plan_cheapest_window(
+        'base', segments, lambda day, period, color: None,
+        START, START + timedelta(minutes=30), timedelta(hours=1), [1.0], timedelta(minutes=30),
+    ) is None
@@ -0,0 +1,85 @@
+"""Tests of the off-peak hours schedule."""
+from __future__ import annotations
+
+from datetime import datetime, time
+
+import pytest
+
+from custom_components.tarif_edf.schedule import InvalidOffPeakHours, OffPeakSchedule
+
+from .conftest import TIME_ZONE
+
+
+def test_parse_splits_range_across_midnight() -> None:
+    schedule = OffPeakSchedule.parse("22:00-06:00")
+    assert schedule.intervals == ((0, 360), (1320, 1440))
+    assert schedule.changes == (360, 1320)
+    assert schedule.as_string() == "00:00-06:00,22:00-00:00"
+
+
+def test_parse_merges_overlapping_and_adjacent_ranges() -> None:
+    schedule = OffPeakSchedule.parse("12:00-14:00, 13:00-15:30,15:30-16:00,01:00-02:00")
+    assert schedule.intervals == ((60, 120), (720, 960))
+
+
+def test_midnight_is_not_a_change_when_off_peak_continues() -> None:
+    schedule = OffPeakSchedule.parse("22:00-00:00,00:00-06:00")
+    assert schedule == OffPeakSchedule.parse("22:00-06:00")
+    assert schedule.changes == (360, 1320)
+
+
+def test_midnight_is_a_change_when_off_peak_ends_there() -> None:
+    schedule = OffPeakSchedule.parse("20:00-00:00")
+    assert schedule.changes == (0, 1200)
+    assert schedule.is_off_peak_minute(1439)
+    assert not schedule.is_off_peak_minute(0)
+
+
+@pytest.mark.parametrize(
+    ("minute", "expected"),
+    [(0, True), (359, True), (360, False), (1319, False), (1320, True), (1439, True)],
+)
+def test_is_off_peak_minute_boundaries(minute: int, expected: bool) -> None:
+    assert OffPeakSchedule.parse("22:00-06:00").is_off_peak_minute(minute) is expected
+
+
+def test_is_off_peak_time() -> None:
+    schedule = OffPeakSchedule.parse("22:00-06:00")
+    assert schedule.is_off_peak(time(5, 59))
+    assert not schedule.is_off_peak(datetime(2025, 1, 15, 6, 0, tzinfo=TIME_ZONE))
+
+
+@pytest.mark.parametrize(
+    ("now", "expected"),
+    [
+        (datetime(2025, 1, 15, 5, 59), datetime(2025, 1, 15, 6, 0)),
+        (datetime(2025, 1, 15, 6, 0), datetime(2025, 1, 15, 22, 0)),
+        (datetime(2025, 1, 15, 21, 59), datetime(2025, 1, 15, 22, 0)),
+        (datetime(2025, 1, 15, 22, 0), datetime(2025, 1, 16, 6, 0)),
+        (datetime(2025, 1, 15, 23, 59), datetime(2025, 1, 16, 6, 0)),
+        (datetime(2025, 12, 31, 23, 0), datetime(2026, 1, 1, 6, 0)),
+    ],
+)
+def test_next_change_wraps_to_next_day(now: datetime, expected: datetime) -> None:
+    schedule = OffPeakSchedule.parse("22:00-06:00")
+    assert schedule.next_change(now.replace(tzinfo=TIME_ZONE)) == expected.replace(tzinfo=TIME_ZONE)
+
+
+def test_next_change_without_off_peak_hours() -> None:
+    assert OffPeakSchedule.parse(None).next_change(datetime(2025, 1, 15, 12, 0, tzinfo=TIME_ZONE)) is None
+    assert not OffPeakSchedule.parse("")
+
+
+def test_hourly_off_peak_fractions() -> None:
+    fractions = OffPeakSchedule.parse("22:30-06:15").hourly_off_peak_fractions
+    assert fractions[22] == 0.5
+    assert fractions[23] == fractions[0] == fractions[5] == 1.0
+    assert fractions[6] == 0.25
+    assert sum(fractions) == pytest.approx(7.75)
+
+
+@pytest.mark.parametrize("value", ["22:00", "24:00-06:00", "22:00-22:00", "22h-06h"])
+def test_parse_invalid(value: str) -> None:
+    with pytest.raises(InvalidOffPeakHours):
+        OffPeakSchedule.parse(value)
+    assert OffPeakSchedule.parse(f"{value},01:00-02:00", strict=False).intervals == ((60, 120),)
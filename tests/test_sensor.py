@@ -0,0 +1,37 @@
+"""Tests of the sensor unique_ids."""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.tarif_edf.sensor import (
+    TarifEdfPriceTimelineSensor,
+    get_migrated_unique_id,
+    get_unique_id,
+)
+
+
+def test_unique_id_is_scoped_to_the_entry() -> None:
+    assert get_unique_id('entry_a', 'Tarif Base TTC') != get_unique_id('entry_b', 'Tarif Base TTC')
+
+
+@pytest.mark.parametrize(
+    ("unique_id", "expected"),
+    [
+        ('tarif_edf_Tarif Base TTC', 'tarif_edf_entry_a_Tarif Base TTC'),
+        ('tarif_edf_entry_a_Tarif Base TTC', None),
+        ('autre_Tarif Base TTC', None),
+    ],
+)
+def test_migrated_unique_id(unique_id: str, expected: str | None) -> None:
+    assert get_migrated_unique_id('entry_a', unique_id) == expected
+
+
+def test_price_timeline_sensors_of_a_shared_coordinator() -> None:
+    coordinator = SimpleNamespace(data=SimpleNamespace(contract_type='hphc', contract_power='6'))
+    sensors = [
+        TarifEdfPriceTimelineSensor(coordinator, entry_id, "Prochain changement de prix hphc 6kVA")
+        for entry_id in ('entry_a', 'entry_b')
+    ]
+    assert len({sensor.unique_id for sensor in sensors}) == 2
@@ -0,0 +1,23 @@
+"""Tests of the service helpers."""
+from __future__ import annotations
+
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from custom_components.tarif_edf.services import get_tempo_colors
+
+from .conftest import TIME_ZONE
+
+CODES = {date(2025, 1, 14): 3, date(2025, 1, 15): 1}
+
+
+def test_get_tempo_colors_covers_billing_days() -> None:
+    history = SimpleNamespace(get=lambda day: CODES.get(day, 0))
+    start = datetime(2025, 1, 15, 5, 0, tzinfo=TIME_ZONE)
+    end = datetime(2025, 1, 16, 7, 0, tzinfo=TIME_ZONE)
+    # 05:00 relève encore du jour Tempo de la veille
+    assert get_tempo_colors(history, start, end) == {
+        date(2025, 1, 14): 'rouge',
+        date(2025, 1, 15): 'bleu',
+        date(2025, 1, 16): None,
+    }
@@ -0,0 +1,102 @@
+"""Tests of the tariff table lookups."""
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from custom_components.tarif_edf.tarif import TarifTable, TarifVersion, parse_tarif_table
+
+
+def make_version(start: date, end: date | None, price: float, power: str = '6') -> TarifVersion:
+    return TarifVersion(
+        power, start, end,
+        {'hphc_fixe_ttc': 150.0, 'hphc_variable_hc_ttc': price, 'hphc_variable_hp_ttc': price + 0.05},
+    )
+
+
+@pytest.fixture
+def table() -> TarifTable:
+    # Données volontairement dans le désordre, sans version le 2024-01-31
+    return TarifTable('hphc', [
+        make_version(date(2024, 2, 1), None, 0.20),
+        make_version(date(2023, 1, 1), date(2023, 7, 31), 0.10),
+        make_version(date(2023, 8, 1), date(2024, 1, 30), 0.15),
+        make_version(date(2023, 8, 1), date(2024, 1, 30), 0.12, power='9'),
+    ])
+
+
+@pytest.mark.parametrize(
+    ("day", "expected"),
+    [
+        (date(2022, 12, 31), None),
+        (date(2023, 1, 1), 0.10),
+        (date(2023, 7, 31), 0.10),
+        (date(2023, 8, 1), 0.15),
+        (date(2024, 1, 30), 0.15),
+        (date(2024, 1, 31), None),
+        (date(2024, 2, 1), 0.20),
+        (date(2030, 1, 1), 0.20),
+    ],
+)
+def test_at_version_boundaries(table: TarifTable, day: date, expected: float | None) -> None:
+    version = table.at('6', day)
+    assert (version and version.prices['hphc_variable_hc_ttc']) == expected
+
+
+def test_at_unknown_power(table: TarifTable) -> None:
+    assert table.at('36', date(2024, 6, 1)) is None
+    assert table.versions('36') == []
+
+
+def test_at_closed_power_after_last_version(table: TarifTable) -> None:
+    assert table.at('9', date(2024, 1, 30)).prices['hphc_variable_hc_ttc'] == 0.12
+    assert table.at('9', date(2024, 1, 31)) is None
+    assert table.current('9') is None
+
+
+def test_current_and_powers(table: TarifTable) -> None:
+    assert table.current('6').start == date(2024, 2, 1)
+    assert table.powers == ['6', '9']
+
+
+def test_duplicate_start_last_wins() -> None:
+    table = TarifTable('hphc', [
+        make_version(date(2024, 2, 1), None, 0.20),
+        make_version(date(2024, 2, 1), None, 0.25),
+    ])
+    assert table.versions('6') == [make_version(date(2024, 2, 1), None, 0.25)]
+
+
+@pytest.mark.parametrize(
+    ("day", "period", "expected"),
+    [
+        (date(2023, 7, 31), 'hc', 0.10),
+        (date(2023, 8, 1), 'hp', 0.15 + 0.05),
+        (date(2024, 1, 31), 'hc', None),
+    ],
+)
+def test_price_at(table: TarifTable, day: date, period: str, expected: float | None) -> None:
+    assert table.price_at('6', day, period) == expected
+
+
+def test_price_at_tempo_color() -> None:
+    prices = {'tempo_fixe_ttc': 150.0, 'tempo_variable_hp_rouge_ttc': 0.75, 'tempo_variable_hc_bleu_ttc': 0.12}
+    table = TarifTable('tempo', [TarifVersion('6', date(2024, 2, 1), None, prices)])
+    assert table.price_at('6', date(2024, 2, 1), 'hp', 'rouge') == 0.75
+    assert table.price_at('6', date(2024, 2, 1), 'hc', 'bleu') == 0.12
+    assert table.price_at('6', date(2024, 2, 1), 'hc', 'blanc') is None
+
+
+def test_parse_tarif_table() -> None:
+    content = (
+        "\ufeffDATE_DEBUT;DATE_FIN;P_SOUSCRITE;PART_FIXE_HT;PART_FIXE_TTC;PART_VARIABLE_HT;PART_VARIABLE_TTC\n"
+        "01/08/2023;31/01/2024;6;10,0;151,20;0,15;0,2276\n"
+        "2024-02-01;;6;10,0;158,16;0,17;0,2516\n"
+        "01/02/2024;;;;;;\n"
+    ).encode('utf-8')
+    table = parse_tarif_table('base', content)
+
+    assert [version.start for version in table.versions('6')] == [date(2023, 8, 1), date(2024, 2, 1)]
+    assert table.at('6', date(2024, 1, 31)).prices == {'base_fixe_ttc': 151.2, 'base_variable_ttc': 0.2276}
+    assert table.price_at('6', date(2024, 2, 1)) == 0.2516
@@ -0,0 +1,26 @@
+"""Tests of the Tempo color history."""
+from __future__ import annotations
+
+from datetime import date
+
+from custom_components.tarif_edf.tempo import TempoColorHistory
+
+
+def test_missing_days_and_season_colors() -> None:
+    history = TempoColorHistory()
+    history.set(date(2024, 9, 1), 1)
+    history.set(date(2024, 9, 3), 3)
+    history.set(date(2025, 8, 31), 2)
+
+    assert history.missing_days(date(2024, 9, 1), date(2024, 9, 4)) == [date(2024, 9, 2), date(2024, 9, 4)]
+    assert history.missing_days(date(2024, 9, 1), date(2024, 8, 31)) == []
+    assert history.seasons == [2024]
+    assert history.season_colors(2024) == {'2024-09-01': 'bleu', '2024-09-03': 'rouge', '2025-08-31': 'blanc'}
+
+
+def test_round_trip_keeps_colors() -> None:
+    history = TempoColorHistory()
+    history.set(date(2025, 1, 15), 2)
+    restored = TempoColorHistory.from_dict(history.as_dict())
+    assert restored.get(date(2025, 1, 15)) == 2
+    assert restored.get(date(2025, 1, 16)) == 0
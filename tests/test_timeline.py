@@ -0,0 +1,76 @@
+"""Tests of the rolling price timeline."""
+from __future__ import annotations
+
+from datetime import datetime, time, timedelta
+from typing import Any
+
+from custom_components.tarif_edf.schedule import OffPeakSchedule
+from custom_components.tarif_edf.timeline import PriceTimeline, iter_price_changes
+
+from .conftest import TIME_ZONE
+
+SCHEDULE = OffPeakSchedule.parse("22:00-06:00")
+NOW = datetime(2025, 1, 15, 20, 0, tzinfo=TIME_ZONE)
+
+
+def at(day: int, hour: int) -> datetime:
+    return datetime(2025, 1, day, hour, 0, tzinfo=TIME_ZONE)
+
+
+def resolve_hphc(when: datetime) -> dict[str, Any]:
+    period = 'hc' if SCHEDULE.is_off_peak(when) else 'hp'
+    return {'price': 0.21 if period == 'hc' else 0.27, 'period': period, 'color': None}
+
+
+def test_iter_price_changes_includes_midnight_and_extra() -> None:
+    changes = iter_price_changes(at(15, 20), SCHEDULE, (time(6, 0), time(11, 0)))
+    assert [next(changes) for _ in range(5)] == [at(15, 22), at(16, 0), at(16, 6), at(16, 11), at(16, 22)]
+
+
+def test_iter_price_changes_strictly_after_start() -> None:
+    assert next(iter_price_changes(at(15, 22), SCHEDULE)) == at(16, 0)
+
+
+def test_segments_merge_across_midnight() -> None:
+    timeline = PriceTimeline(SCHEDULE, resolve_hphc, timedelta(hours=12))
+    assert timeline.rebuild(NOW)
+    assert [(segment.start, segment.end, segment.period) for segment in timeline.segments] == [
+        (at(15, 20), at(15, 22), 'hp'),
+        (at(15, 22), at(16, 6), 'hc'),
+        (at(16, 6), at(16, 22), 'hp'),
+    ]
+
+
+def test_advance_drops_past_segments_and_extends() -> None:
+    timeline = PriceTimeline(SCHEDULE, resolve_hphc, timedelta(hours=12))
+    timeline.rebuild(NOW)
+    as_list = timeline.as_list()
+
+    # La chronologie couvre déjà l'horizon : rien ne change
+    assert not timeline.advance(at(15, 21))
+    assert timeline.as_list() is as_list
+
+    assert timeline.advance(at(16, 11))
+    assert timeline.segments[0].start == at(16, 6)
+    assert timeline.segments[-1].end >= at(16, 23)
+    assert timeline.current(at(16, 11)).period == 'hp'
+    assert timeline.current(at(16, 22)).period == 'hc'
+
+
+def test_rebuild_without_change_keeps_serialized_form() -> None:
+    timeline = PriceTimeline(SCHEDULE, resolve_hphc, timedelta(hours=12))
+    timeline.rebuild(NOW)
+    as_list = timeline.as_list()
+    assert not timeline.rebuild(NOW)
+    assert timeline.as_list() is as_list
+
+
+def test_base_is_one_segment() -> None:
+    timeline = PriceTimeline(
+        OffPeakSchedule.parse(None),
+        lambda when: {'price': 0.25, 'period': None, 'color': None},
+        timedelta(days=2),
+    )
+    timeline.rebuild(NOW)
+    assert len(timeline.segments) == 1
+    assert timeline.as_list() == [{'start': NOW.isoformat(), 'end': at(18, 0).isoformat(), 'price': 0.25}]